@@ -1,12 +1,19 @@
 # agent.py - 完整更新版
 
 import os
+import sys
 import json
+from pathlib import Path
 from openai import OpenAI
 from dotenv import load_dotenv
 from IPython import get_ipython
 from IPython.terminal.interactiveshell import TerminalInteractiveShell
 
+# 共享模块（模型响应缓存等）位于 Labfiles/common
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))
+from llm_cache import cached_client
+from tracing import span, traced_client, traced_tool
+
 # --- 1. 配置和初始化 ---
 
 # 加载 .env 文件中的环境变量
@@ -23,8 +30,8 @@ if not all([api_key, base_url, model_name]):
         "请确保 .env 文件中包含了 OPENAI_API_KEY, OPENAI_BASE_URL, 和 OPENAI_MODEL_NAME"
     )
 
-# 初始化 OpenAI 客户端
-client = OpenAI(api_key=api_key, base_url=base_url)
+# 初始化 OpenAI 客户端；对话调用每次都重新生成 (cache=False)，不使用响应缓存
+client = traced_client(cached_client(OpenAI(api_key=api_key, base_url=base_url)))
 
 # --- 2. 使用 IPython 作为代码执行器 (改进版) ---
 
@@ -70,6 +77,9 @@ def execute_python_code(code: str) -> str:
     except Exception as e:
         return f"执行时发生意外错误: {str(e)}"
 
+# 设置 AGENT_TRACE_FILE 时，每次代码执行都会记录一个 span
+execute_python_code = traced_tool("execute_python_code", execute_python_code)
+
 # --- 3. 为 OpenAI API 定义工具的 Schema ---
 
 tools = [
@@ -171,52 +181,55 @@ def main():
         if not user_input:
             continue
 
-        messages.append({"role": "user", "content": user_input})
+        with span("turn", agent="02-data-analysis"):
+            messages.append({"role": "user", "content": user_input})
 
-        try:
-            response = client.chat.completions.create(
-                model=model_name,
-                messages=messages,
-                tools=tools,
-                tool_choice="auto",
-            )
-            response_message = response.choices[0].message
-
-            if response_message.tool_calls:
-                messages.append(response_message)
-                for tool_call in response_message.tool_calls:
-                    if tool_call.function.name == "execute_python_code":
-                        function_args = json.loads(tool_call.function.arguments)
-                        code_to_run = function_args.get("code", "")
-                        
-                        print(f"\n[正在执行代码]:\n---\n{code_to_run}\n---")
-                        tool_output = execute_python_code(code_to_run)
-                        print(f"[代码执行结果]:\n{tool_output}\n")
-
-                        messages.append({
-                            "tool_call_id": tool_call.id,
-                            "role": "tool",
-                            "name": "execute_python_code",
-                            "content": tool_output,
-                        })
-                
-                # 获取最终响应
-                final_response = client.chat.completions.create(
+            try:
+                response = client.chat.completions.create(
                     model=model_name,
-                    messages=messages
+                    messages=messages,
+                    tools=tools,
+                    tool_choice="auto",
+                    cache=False,
                 )
-                final_answer = final_response.choices[0].message.content
-                print(f"AI 助手: {final_answer}")
-                messages.append({"role": "assistant", "content": final_answer})
-            else:
-                answer = response_message.content
-                print(f"AI 助手: {answer}")
-                messages.append({"role": "assistant", "content": answer})
+                response_message = response.choices[0].message
+
+                if response_message.tool_calls:
+                    messages.append(response_message)
+                    for tool_call in response_message.tool_calls:
+                        if tool_call.function.name == "execute_python_code":
+                            function_args = json.loads(tool_call.function.arguments)
+                            code_to_run = function_args.get("code", "")
+                        
+                            print(f"\n[正在执行代码]:\n---\n{code_to_run}\n---")
+                            tool_output = execute_python_code(code_to_run)
+                            print(f"[代码执行结果]:\n{tool_output}\n")
+
+                            messages.append({
+                                "tool_call_id": tool_call.id,
+                                "role": "tool",
+                                "name": "execute_python_code",
+                                "content": tool_output,
+                            })
+                
+                    # 获取最终响应
+                    final_response = client.chat.completions.create(
+                        model=model_name,
+                        messages=messages,
+                        cache=False,
+                    )
+                    final_answer = final_response.choices[0].message.content
+                    print(f"AI 助手: {final_answer}")
+                    messages.append({"role": "assistant", "content": final_answer})
+                else:
+                    answer = response_message.content
+                    print(f"AI 助手: {answer}")
+                    messages.append({"role": "assistant", "content": answer})
                 
-        except Exception as e:
-            error_msg = f"系统错误: {str(e)}"
-            print(f"AI 助手: {error_msg}")
-            messages.append({"role": "assistant", "content": error_msg})
+            except Exception as e:
+                error_msg = f"系统错误: {str(e)}"
+                print(f"AI 助手: {error_msg}")
+                messages.append({"role": "assistant", "content": error_msg})
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
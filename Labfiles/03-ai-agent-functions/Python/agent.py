@@ -1,17 +1,27 @@
 import os
+import sys
 import json
+from pathlib import Path
 from dotenv import load_dotenv
 from openai import OpenAI
 
 # 从我们自己的文件中导入工具函数
 from user_functions import create_support_ticket
+from slot_filling import SlotFiller
+
+# 共享模块（本地回复模板等）位于 Labfiles/common
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))
+from response_templates import finish_turn
+from llm_cache import cached_client
+from tracing import span, trace_tools, traced_client
 
 # --- 1. 初始化和配置 ---
 load_dotenv()
-client = OpenAI(
+# 对话调用每次都重新生成 (cache=False)，不使用响应缓存
+client = traced_client(cached_client(OpenAI(
     api_key=os.getenv("OPENAI_API_KEY"),
     base_url=os.getenv("OPENAI_BASE_URL")
-)
+)))
 model_name = os.getenv("OPENAI_MODEL_NAME")
 
 # --- 2. 向AI描述我们的工具 ---
@@ -40,8 +50,14 @@ tools = [
 ]
 
 # 将函数名映射到真实的Python函数对象
-available_functions = {
+# 设置 AGENT_TRACE_FILE 时，每次工具调用都会记录一个 span
+available_functions = trace_tools({
     "create_support_ticket": create_support_ticket
+})
+
+# 工具返回的确认信息已经是最终回复，直接在本地渲染，不再请求模型总结
+response_templates = {
+    "create_support_ticket": "{result}"
 }
 
 # --- 3. 定义AI代理的行为 (System Prompt) ---
@@ -60,6 +76,10 @@ Follow these rules strictly:
 def main():
     print("Support Agent is running...")
     messages = [{"role": "system", "content": system_prompt}]
+    # 在本地收集工单参数，并统计模型调用次数
+    slots = SlotFiller()
+    llm_calls = 0
+    tickets = 0
 
     while True:
         user_input = input("Enter a prompt (or type 'quit' to exit): ")
@@ -67,47 +87,67 @@ def main():
             print("\nConversation Log:\n")
             for msg in messages[1:]: # Skip system prompt for cleaner log
                 print(f"MessageRole.{msg['role'].upper()}: {msg.get('content') or 'Called function ' + (msg.get('tool_calls')[0].function.name if msg.get('tool_calls') else '') }")
+            print(f"\nLLM calls: {llm_calls}, tickets: {tickets}")
             break
 
-        messages.append({"role": "user", "content": user_input})
+        with span("turn", agent="03-support"):
+            messages.append({"role": "user", "content": user_input})
 
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=messages,
-            tools=tools,
-            tool_choice="auto"
-        )
-        response_message = response.choices[0].message
-        messages.append(response_message)
+            # 先在本地提取电子邮件和问题描述
+            slots.update(user_input)
+            question = slots.follow_up()
+            if slots.complete:
+                # 两个参数都已齐全：直接构造工具调用，省去请模型决定调用工具的一轮
+                response_message = slots.tool_call_message()
+                messages.append(response_message)
+                tool_calls = [(call["id"], call["function"]["name"], call["function"]["arguments"])
+                              for call in response_message["tool_calls"]]
+            elif question:
+                # 只缺一个参数：直接追问，不请求模型
+                print(f"Last Message: {question}")
+                messages.append({"role": "assistant", "content": question})
+                continue
+            else:
+                response = client.chat.completions.create(
+                    model=model_name,
+                    messages=messages,
+                    tools=tools,
+                    tool_choice="auto",
+                    cache=False,
+                )
+                llm_calls += 1
+                response_message = response.choices[0].message
+                messages.append(response_message)
+                tool_calls = [(call.id, call.function.name, call.function.arguments)
+                              for call in response_message.tool_calls or []]
 
-        if response_message.tool_calls:
-            for tool_call in response_message.tool_calls:
-                function_name = tool_call.function.name
-                function_to_call = available_functions[function_name]
-                function_args = json.loads(tool_call.function.arguments)
+            if tool_calls:
+                calls = []
+                for tool_call_id, function_name, arguments in tool_calls:
+                    function_to_call = available_functions[function_name]
+                    function_args = json.loads(arguments)
                 
-                function_response = function_to_call(**function_args)
+                    function_response = function_to_call(**function_args)
+                    calls.append((function_name, function_args, function_response))
                 
-                # 将工具的执行结果发回给模型
-                messages.append(
-                    {
-                        "tool_call_id": tool_call.id,
-                        "role": "tool",
-                        "name": function_name,
-                        "content": function_response,
-                    }
-                )
+                    # 将工具的执行结果发回给模型
+                    messages.append(
+                        {
+                            "tool_call_id": tool_call_id,
+                            "role": "tool",
+                            "name": function_name,
+                            "content": function_response,
+                        }
+                    )
+                tickets += 1
+                slots.reset()
 
-            # 让模型基于工具返回的结果进行总结
-            second_response = client.chat.completions.create(
-                model=model_name,
-                messages=messages
-            )
-            final_message = second_response.choices[0].message
-            print(f"Last Message: {final_message.content}")
-            messages.append(final_message)
-        else:
-            print(f"Last Message: {response_message.content}")
+                # 有回复模板时在本地渲染最终回复，否则让模型基于工具返回的结果进行总结
+                final_response, model_called = finish_turn(client, model_name, messages, calls, response_templates)
+                llm_calls += model_called
+                print(f"Last Message: {final_response}")
+            else:
+                print(f"Last Message: {response_message.content}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,107 @@
+# bench_slot_filling.py - 统计本地参数提取为每张工单节省了多少次 LLM 往返
+#
+# 用一个遵循系统指令（先问电子邮件，再问问题描述，最后调用工具）的本地假模型，
+# 分别按原流程和本地参数提取流程跑几段典型对话（包括回答追问时只给一两个词的对话），比较每张工单的模型调用次数。
+# 假模型不使用 slot_filling 的提取规则：每条用户消息都标注了它实际包含的电子邮件和问题描述，
+# 假模型按标注"理解"消息，就像真实模型一样；两种流程创建的工单都要与标注一致。
+# 用法: python bench_slot_filling.py
+
+from slot_filling import SlotFiller
+
+# 每段对话: [(用户消息, 消息中的电子邮件, 消息中的问题描述)]
+SCENARIOS = {
+    "一次给出全部信息": [("My laptop won't start. My email is alex@contoso.com", "alex@contoso.com", "laptop won't start")],
+    "先描述问题": [("My VPN keeps disconnecting every few minutes", None, "VPN keeps disconnecting"),
+                   ("alex@contoso.com", "alex@contoso.com", None)],
+    "先打招呼": [("Hi, I need some help", None, None), ("sam@contoso.com", "sam@contoso.com", None),
+                 ("Outlook keeps crashing when I open attachments", None, "Outlook keeps crashing")],
+    "先给电子邮件": [("alex@contoso.com", "alex@contoso.com", None),
+                     ("The printer on floor 3 is offline", None, "printer on floor 3 is offline")],
+    "描述含糊": [("Hello", None, None), ("I have a problem", None, None), ("kim@contoso.com", "kim@contoso.com", None),
+                 ("my screen flickers every time I plug in the docking station", None, "screen flickers")],
+    "中文": [("你好", None, None), ("我的电脑无法访问外部网站，显示dns无法解析", None, "无法访问外部网站"),
+             ("info@cloudzun.com", "info@cloudzun.com", None)],
+    "带电子邮件的问候": [("Hi, my email is alex@contoso.com, can you help me please?", "alex@contoso.com", None),
+                         ("My laptop won't start", None, "laptop won't start")],
+    "询问工单状态": [("I would like to know the status of my ticket", None, None),
+                     ("alex@contoso.com", "alex@contoso.com", None),
+                     ("My monitor shows a black screen", None, "black screen")],
+    "简短回答追问": [("alex@contoso.com", "alex@contoso.com", None), ("wifi", None, "wifi")],
+    "两次简短回答": [("sam@contoso.com", "sam@contoso.com", None), ("hmm", None, None), ("the wifi", None, "wifi")],
+}
+
+
+def fake_model(turns: list[tuple]) -> dict:
+    """按系统指令的规则回复：先要电子邮件，再要描述，齐全后调用工具。turns 是到目前为止的用户消息标注。"""
+    email = next((turn[1] for turn in reversed(turns) if turn[1]), None)
+    descriptions = [turn[0] for turn in turns if turn[2]]
+    if not email:
+        return {"role": "assistant", "content": "What is your email address?"}
+    if not descriptions:
+        return {"role": "assistant", "content": "Please describe the problem."}
+    return {"role": "assistant", "content": None,
+            "tool_calls": [{"id": "call_1", "arguments": {"email": email, "description": "\n".join(descriptions)}}]}
+
+
+def run_baseline(turns: list[tuple]) -> tuple[int, dict | None]:
+    """原流程：每条用户消息都请求一次模型，调用工具后再请求一次总结。返回 (模型调用次数, 工单参数)。"""
+    seen, calls = [], 0
+    for turn in turns:
+        seen.append(turn)
+        reply = fake_model(seen)
+        calls += 1
+        if reply.get("tool_calls"):
+            calls += 1
+            return calls, reply["tool_calls"][0]["arguments"]
+    return calls, None
+
+
+def run_fast_path(turns: list[tuple]) -> tuple[int, dict | None]:
+    """本地参数提取流程，与 agent.py 的主循环相同。"""
+    seen, calls, slots = [], 0, SlotFiller()
+    for turn in turns:
+        seen.append(turn)
+        slots.update(turn[0])
+        question = slots.follow_up()
+        if slots.complete:
+            calls += 1
+            return calls, slots.arguments()
+        if question:
+            continue
+        reply = fake_model(seen)
+        calls += 1
+        if reply.get("tool_calls"):
+            calls += 1
+            return calls, reply["tool_calls"][0]["arguments"]
+    return calls, None
+
+
+def check_ticket(label: str, flow: str, turns: list[tuple], arguments: dict | None):
+    """工单必须创建，且电子邮件和问题描述与对话标注一致（不能在用户描述问题之前就创建工单）。"""
+    assert arguments, f"{label}: {flow}没有创建工单"
+    email = next(turn[1] for turn in reversed(turns) if turn[1])
+    assert arguments["email"] == email, f"{label}: {flow}的电子邮件是 {arguments['email']!r}"
+    for turn in turns:
+        if turn[2]:
+            assert turn[2].lower() in arguments["description"].lower(), \
+                f"{label}: {flow}的问题描述 {arguments['description']!r} 缺少 {turn[2]!r}"
+
+
+def main():
+    print(f"{'对话':<12}{'轮数':>4}{'原流程':>8}{'本地提取':>8}{'节省':>6}")
+    total_baseline = total_fast = 0
+    for label, turns in SCENARIOS.items():
+        baseline, baseline_ticket = run_baseline(turns)
+        fast, fast_ticket = run_fast_path(turns)
+        check_ticket(label, "原流程", turns, baseline_ticket)
+        check_ticket(label, "本地提取", turns, fast_ticket)
+        total_baseline += baseline
+        total_fast += fast
+        print(f"{label:<12}{len(turns):>4}{baseline:>8}{fast:>8}{baseline - fast:>6}")
+    count = len(SCENARIOS)
+    print(f"\n平均每张工单的 LLM 调用: 原流程 {total_baseline / count:.2f} 次，本地提取 {total_fast / count:.2f} 次，"
+          f"节省 {(total_baseline - total_fast) / count:.2f} 次 ({1 - total_fast / total_baseline:.0%})")
+
+
+if __name__ == "__main__":
+    main()
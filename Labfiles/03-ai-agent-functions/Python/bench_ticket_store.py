@@ -0,0 +1,72 @@
+# 测试工单存储的写入吞吐量和查询延迟。
+# 用法: python bench_ticket_store.py [工单数量] [数据库路径]
+#   例如 python bench_ticket_store.py 1000000 /tmp/bench_tickets.db
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from ticket_store import TicketStore
+
+PROBLEMS = [
+    "无法访问外部网站，显示dns无法解析",
+    "VPN connection drops every few minutes",
+    "Outlook keeps asking for my password",
+    "Printer on floor 3 is offline",
+    "Laptop fan is very loud and the machine is slow",
+]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    db_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tempfile.mkdtemp(prefix="bench_tickets_"), "tickets.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    rng = random.Random(42)
+    emails = [f"user{i}@example.com" for i in range(max(count // 20, 1))]
+    tickets = [(rng.choice(emails), rng.choice(PROBLEMS)) for _ in range(count)]
+    store = TicketStore(db_path)
+
+    # 逐条写入：每张工单一个持久化事务，与 create_support_ticket 的路径相同
+    single = min(count, 2_000)
+    start = time.perf_counter()
+    single_ids = [store.create(email, description) for email, description in tickets[:single]]
+    seconds = time.perf_counter() - start
+    print(f"单条写入: {single:,} 张工单用时 {seconds:.2f}s，{single / seconds:,.0f} 张/秒")
+
+    # 批量写入
+    start = time.perf_counter()
+    bulk_ids = store.bulk_create(tickets[single:])
+    seconds = time.perf_counter() - start
+    print(f"批量写入: {len(bulk_ids):,} 张工单用时 {seconds:.2f}s，{len(bulk_ids) / max(seconds, 1e-9):,.0f} 张/秒")
+
+    ids = single_ids + bulk_ids
+    assert ids == sorted(ids) and len(set(ids)) == len(ids) == store.count(), "工单ID必须唯一且单调递增"
+    print(f"共 {store.count():,} 张工单，ID 从 {ids[0]} 到 {ids[-1]}，无冲突")
+
+    now = datetime.now()
+    queries = {
+        "按电子邮件查询最近工单": lambda: store.by_email(rng.choice(emails)),
+        "查询最近一分钟创建的工单": lambda: store.created_between(
+            (now - timedelta(minutes=1)).isoformat(sep=" "), (now + timedelta(hours=1)).isoformat(sep=" "), limit=100),
+        "按ID读取工单": lambda: store.get(rng.choice(ids)),
+    }
+    for label, query in queries.items():
+        timings = []
+        for _ in range(200):
+            start = time.perf_counter()
+            query()
+            timings.append(time.perf_counter() - start)
+        print(f"{label}: 中位数 {statistics.median(timings) * 1000:.3f} ms，最大 {max(timings) * 1000:.3f} ms")
+
+    store.close()
+    print(f"数据库大小: {os.path.getsize(db_path) / 1024 / 1024:,.1f} MB ({db_path})")
+
+
+if __name__ == "__main__":
+    main()
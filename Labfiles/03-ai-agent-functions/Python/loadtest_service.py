@@ -0,0 +1,71 @@
+# loadtest_service.py - 对 service.py 进行并发会话压测
+#
+# 每个虚拟用户创建一个会话，按脚本依次发送消息直到工单创建完成，然后删除会话。
+# 用法: python loadtest_service.py [并发会话数] [服务地址]
+#   例如先启动本地假模型服务器和服务:
+#     python ../../common/fake_openai_server.py 8001 300
+#     LLM_CACHE=0 OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=fake OPENAI_MODEL_NAME=fake python service.py 8080
+#     python loadtest_service.py 500 http://127.0.0.1:8080
+#   （LLM_CACHE=0 关闭响应缓存，否则脚本化的相同请求会直接命中缓存）
+
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+
+SCRIPT = [
+    "Hi, I need help with my computer.",
+    "alex{n}@contoso.com",
+    "My laptop won't start, it shows a black screen after the logo.",
+]
+
+
+async def virtual_user(http: httpx.AsyncClient, n: int, latencies: list, active: dict) -> bool:
+    response = await http.post("/sessions")
+    response.raise_for_status()
+    session_id = response.json()["session_id"]
+    active["now"] += 1
+    active["peak"] = max(active["peak"], active["now"])
+    try:
+        for text in SCRIPT:
+            start = time.perf_counter()
+            response = await http.post(f"/sessions/{session_id}/messages", json={"content": text.format(n=n)})
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+            if "ticket id" in (response.json()["reply"] or "").lower():
+                break  # 工单已创建
+        return True
+    finally:
+        active["now"] -= 1
+        await http.delete(f"/sessions/{session_id}")
+
+
+async def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    base_url = sys.argv[2] if len(sys.argv) > 2 else "http://127.0.0.1:8080"
+
+    latencies = []
+    active = {"now": 0, "peak": 0}
+    limits = httpx.Limits(max_connections=sessions, max_keepalive_connections=sessions)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as http:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(virtual_user(http, n, latencies, active) for n in range(sessions)),
+                                       return_exceptions=True)
+        elapsed = time.perf_counter() - start
+        server_stats = (await http.get("/stats")).json()
+
+    failures = [r for r in results if r is not True]
+    print(f"会话: {sessions - len(failures)}/{sessions} 完成，峰值并发会话 {active['peak']}，总耗时 {elapsed:.1f}s")
+    if failures:
+        print(f"失败示例: {failures[0]!r}")
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100)
+        print(f"每轮延迟: {len(latencies)} 轮，p50 {cuts[49] * 1000:.0f} ms，p95 {cuts[94] * 1000:.0f} ms，"
+              f"p99 {cuts[98] * 1000:.0f} ms，吞吐 {len(latencies) / elapsed:.1f} 轮/秒")
+    print(f"服务端统计: {server_stats}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,20 +1,31 @@
 # --- 1. 导入所有必要的库 ---
 import os
+import sys
 import json
-import random
-import string
+import sqlite3
+from pathlib import Path
 from dotenv import load_dotenv
 from openai import OpenAI
 from openai.types.chat import ChatCompletionMessage
 
+from slot_filling import SlotFiller
+from ticket_store import format_ticket_id, get_store
+
+# 共享模块（本地回复模板等）位于 Labfiles/common
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))
+from response_templates import finish_turn
+from llm_cache import cached_client
+from tracing import span, trace_tools, traced_client
+
 # --- 2. 加载环境变量并配置客户端 ---
 # 确保您的 .env 文件与此脚本位于同一目录
 load_dotenv()
 
-client = OpenAI(
+# 对话调用每次都重新生成 (cache=False)，不使用响应缓存
+client = traced_client(cached_client(OpenAI(
     api_key=os.getenv("OPENAI_API_KEY"),
     base_url=os.getenv("OPENAI_BASE_URL")
-)
+)))
 model_name = os.getenv("OPENAI_MODEL_NAME")
 
 # --- 3. 定义可供 AI 调用的本地“工具”函数 ---
@@ -22,23 +33,18 @@ def create_support_ticket(email: str, description: str) -> str:
     """
     根据用户提供的电子邮件和问题描述创建支持工单。
     """
-    ticket_id = ''.join(random.choices(string.hexdigits.lower(), k=6))
-    filename = f"ticket-{ticket_id}.txt"
-
-    print(f"--- [函数调用]: 正在创建工单 {ticket_id}... ---")
+    store = get_store()
+    print("--- [函数调用]: 正在创建工单... ---")
 
     try:
-        with open(filename, "w") as f:
-            f.write(f"Support ticket: {ticket_id}\n")
-            f.write(f"Submitted by: {email}\n")
-            f.write("Description:\n")
-            f.write(description)
+        ticket_id = format_ticket_id(store.create(email, description))
+        print(f"--- [函数调用]: 已创建工单 {ticket_id} ---")
         
-        return f"您的支持票已成功提交！您的票证 ID 是 **{ticket_id}**，相关细节已保存在文件 **{filename}** 中。我们的团队将会尽快与您联系。"
+        return f"您的支持票已成功提交！您的票证 ID 是 **{ticket_id}**，相关细节已保存在 **{store.db_path}** 中。我们的团队将会尽快与您联系。"
 
-    except IOError as e:
-        print(f"--- [错误]: 无法写入文件 {filename}: {e} ---")
-        return "创建支持工单文件时发生错误。"
+    except sqlite3.Error as e:
+        print(f"--- [错误]: 无法写入工单数据库 {store.db_path}: {e} ---")
+        return "创建支持工单时发生错误。"
 
 # --- 4. 配置 AI ---
 
@@ -62,11 +68,17 @@ tools = [
 ]
 
 # 4.2. 函数映射
-available_functions = {
+# 设置 AGENT_TRACE_FILE 时，每次工具调用都会记录一个 span
+available_functions = trace_tools({
     "create_support_ticket": create_support_ticket
+})
+
+# 4.3. 回复模板：工具返回的确认信息已经是最终回复，直接在本地渲染，不再请求模型总结
+response_templates = {
+    "create_support_ticket": "{result}"
 }
 
-# 4.3. 系统指令
+# 4.4. 系统指令
 system_prompt = """
 You are a helpful support agent. Your primary goal is to create a support ticket for the user 
 by calling the `create_support_ticket` function.
@@ -83,6 +95,10 @@ def main():
     """主函数，运行 AI 代理交互循环。"""
     print("Support Agent is running...")
     messages = [{"role": "system", "content": system_prompt}]
+    # 在本地收集工单参数，并统计模型调用次数
+    slots = SlotFiller()
+    llm_calls = 0
+    tickets = 0
 
     while True:
         user_input = input("Enter a prompt (or type 'quit' to exit): ")
@@ -116,47 +132,71 @@ def main():
                 
                 print(f"MessageRole.{speaker}: {content}")
             # --- END OF FIX ---
+            print(f"\nLLM 调用次数: {llm_calls}，创建工单: {tickets}")
             break
 
-        messages.append({"role": "user", "content": user_input})
-
-        try:
-            response = client.chat.completions.create(
-                model=model_name,
-                messages=messages,
-                tools=tools,
-                tool_choice="auto"
-            )
-            response_message = response.choices[0].message
-            messages.append(response_message)
-
-            if response_message.tool_calls:
-                for tool_call in response_message.tool_calls:
-                    function_name = tool_call.function.name
-                    function_to_call = available_functions[function_name]
-                    function_args = json.loads(tool_call.function.arguments)
+        with span("turn", agent="03-support"):
+            messages.append({"role": "user", "content": user_input})
+
+            # 先在本地提取电子邮件和问题描述
+            slots.update(user_input)
+            question = slots.follow_up()
+            if question:
+                # 只缺一个参数：直接追问，不请求模型
+                print(f"Last Message: {question}")
+                messages.append({"role": "assistant", "content": question})
+                continue
+
+            try:
+                if slots.complete:
+                    # 两个参数都已齐全：直接构造工具调用，省去请模型决定调用工具的一轮
+                    response_message = slots.tool_call_message()
+                    messages.append(response_message)
+                    tool_calls = [(call["id"], call["function"]["name"], call["function"]["arguments"])
+                                  for call in response_message["tool_calls"]]
+                else:
+                    response = client.chat.completions.create(
+                        model=model_name,
+                        messages=messages,
+                        tools=tools,
+                        tool_choice="auto",
+                        cache=False,
+                    )
+                    llm_calls += 1
+                    response_message = response.choices[0].message
+                    messages.append(response_message)
+                    tool_calls = [(call.id, call.function.name, call.function.arguments)
+                                  for call in response_message.tool_calls or []]
+
+                if tool_calls:
+                    calls = []
+                    for tool_call_id, function_name, arguments in tool_calls:
+                        function_to_call = available_functions[function_name]
+                        function_args = json.loads(arguments)
                     
-                    function_response = function_to_call(**function_args)
+                        function_response = function_to_call(**function_args)
+                        calls.append((function_name, function_args, function_response))
                     
-                    messages.append(
-                        {
-                            "tool_call_id": tool_call.id,
-                            "role": "tool",
-                            "name": function_name,
-                            "content": function_response,
-                        }
-                    )
-
-                second_response = client.chat.completions.create(model=model_name, messages=messages)
-                final_message = second_response.choices[0].message
-                print(f"Last Message: {final_message.content}")
-                messages.append(final_message)
-            else:
-                print(f"Last Message: {response_message.content}")
-
-        except Exception as e:
-            print(f"An error occurred: {e}")
-            break
+                        messages.append(
+                            {
+                                "tool_call_id": tool_call_id,
+                                "role": "tool",
+                                "name": function_name,
+                                "content": function_response,
+                            }
+                        )
+                    tickets += 1
+                    slots.reset()
+
+                    final_response, model_called = finish_turn(client, model_name, messages, calls, response_templates)
+                    llm_calls += model_called
+                    print(f"Last Message: {final_response}")
+                else:
+                    print(f"Last Message: {response_message.content}")
+
+            except Exception as e:
+                print(f"An error occurred: {e}")
+                break
 
 # --- 6. 运行程序 ---
 if __name__ == "__main__":
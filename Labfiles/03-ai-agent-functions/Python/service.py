@@ -0,0 +1,257 @@
+# service.py - 支持工单代理的异步 HTTP 服务模式
+#
+# agent.py 是单用户的 input() 循环；这里用 asyncio 在一个进程中同时服务大量会话。
+# 运行: python service.py [端口]
+#   POST   /sessions                       创建会话，返回 session_id
+#   POST   /sessions/{session_id}/messages 发送一条用户消息，返回代理的回复
+#   DELETE /sessions/{session_id}          结束会话
+#   GET    /stats                          会话数量和每轮延迟
+
+import asyncio
+import copy
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from openai import AsyncOpenAI
+from pydantic import BaseModel
+
+from agent import available_functions, model_name, response_templates, system_prompt, tools
+from slot_filling import SlotFiller
+
+# 共享模块（本地回复模板等）位于 Labfiles/common
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))
+from response_templates import finish_turn_async
+from llm_cache import cached_client
+from tracing import span, traced_client
+
+# --- 1. 配置 ---
+# 同时保留的会话上限；超过后淘汰最久未使用的会话
+MAX_SESSIONS = int(os.getenv("SESSION_MAX", "10000"))
+# 会话空闲超过该秒数后被淘汰
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "900"))
+# 所有会话共享的模型连接池大小
+MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "200"))
+
+# 一个异步客户端和一个连接池，供所有会话复用；对话调用不使用响应缓存 (cache=False)
+client = traced_client(cached_client(AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    base_url=os.getenv("OPENAI_BASE_URL"),
+    http_client=httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+        timeout=httpx.Timeout(60.0, connect=5.0),
+    ),
+), asynchronous=True), asynchronous=True)
+
+
+# --- 2. 会话存储 ---
+class Session:
+    """一个用户会话：自己的消息历史，以及保证同一会话内的轮次按顺序执行的锁。"""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.messages = [{"role": "system", "content": system_prompt}]
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        self.turns = 0
+        self.slots = SlotFiller()
+        self.llm_calls = 0
+
+
+class SessionStore:
+    """有上限的会话存储，按最近使用顺序排列。
+
+    会话空闲超过 idle_seconds 后被淘汰；会话数达到 max_sessions 时，创建新会话会淘汰
+    最久未使用的会话，因此内存占用有上限。正在处理一轮对话（持有锁）的会话不会被淘汰。
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, idle_seconds: float = SESSION_IDLE_SECONDS):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.sessions = OrderedDict()  # session_id -> Session，最久未使用的在前
+        self.evicted = 0
+
+    def create(self) -> Session:
+        while len(self.sessions) >= self.max_sessions:
+            victim = next((session_id for session_id, session in self.sessions.items()
+                           if not session.lock.locked()), None)
+            if victim is None:
+                break  # 所有会话都在处理中：暂时超出上限，之后由空闲淘汰收回
+            del self.sessions[victim]
+            self.evicted += 1
+        session = Session()
+        self.sessions[session.id] = session
+        return session
+
+    def get(self, session_id: str) -> Session | None:
+        session = self.sessions.get(session_id)
+        if session is not None:
+            session.last_used = time.monotonic()
+            self.sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        return self.sessions.pop(session_id, None) is not None
+
+    def evict_idle(self) -> int:
+        """淘汰所有空闲超时的会话，返回淘汰数量。"""
+        cutoff = time.monotonic() - self.idle_seconds
+        evicted = 0
+        # 按最近使用顺序排列，所以只需从头检查到第一个未超时的会话
+        while self.sessions:
+            session = next(iter(self.sessions.values()))
+            if session.last_used > cutoff or session.lock.locked():
+                break
+            self.sessions.popitem(last=False)
+            evicted += 1
+        self.evicted += evicted
+        return evicted
+
+
+store = SessionStore()
+turn_latencies = deque(maxlen=10_000)  # 最近各轮的耗时（秒）
+
+
+# --- 3. 单轮对话 ---
+async def run_turn(session: Session, user_input: str) -> str:
+    """处理一条用户消息，必要时调用工具，返回代理的最终回复。"""
+    session.messages.append({"role": "user", "content": user_input})
+
+    # 先在本地提取电子邮件和问题描述：缺一个就直接追问，齐全就直接调用工具
+    session.slots.update(user_input)
+    question = session.slots.follow_up()
+    if question:
+        session.messages.append({"role": "assistant", "content": question})
+        return question
+    if session.slots.complete:
+        response_message = session.slots.tool_call_message()
+    else:
+        response = await client.chat.completions.create(
+            model=model_name,
+            messages=session.messages,
+            tools=tools,
+            tool_choice="auto",
+            cache=False,
+        )
+        session.llm_calls += 1
+        response_message = response.choices[0].message.model_dump(exclude_none=True)
+    session.messages.append(response_message)
+
+    if not response_message.get("tool_calls"):
+        return response_message.get("content")
+
+    calls = []
+    for tool_call in response_message["tool_calls"]:
+        function_name = tool_call["function"]["name"]
+        function_to_call = available_functions[function_name]
+        function_args = json.loads(tool_call["function"]["arguments"])
+
+        # 工具函数是同步的（写数据库），放到线程中执行，不阻塞其他会话
+        function_response = await asyncio.to_thread(function_to_call, **function_args)
+        calls.append((function_name, function_args, function_response))
+
+        session.messages.append(
+            {
+                "tool_call_id": tool_call["id"],
+                "role": "tool",
+                "name": function_name,
+                "content": function_response,
+            }
+        )
+
+    session.slots.reset()
+
+    # 有回复模板时在本地渲染最终回复，否则让模型基于工具返回的结果进行总结
+    final_response, model_called = await finish_turn_async(
+        client, model_name, session.messages, calls, response_templates)
+    session.llm_calls += model_called
+    return final_response
+
+
+# --- 4. HTTP 接口 ---
+async def evict_idle_sessions():
+    while True:
+        await asyncio.sleep(min(SESSION_IDLE_SECONDS / 4, 30))
+        store.evict_idle()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    evictor = asyncio.create_task(evict_idle_sessions())
+    yield
+    evictor.cancel()
+    await client.close()
+
+
+app = FastAPI(title="Support Ticket Agent Service", lifespan=lifespan)
+
+
+class UserMessage(BaseModel):
+    content: str
+
+
+# 会话存储只在事件循环线程中访问，所以这些接口也是 async 的
+@app.post("/sessions")
+async def create_session():
+    return {"session_id": store.create().id}
+
+
+@app.post("/sessions/{session_id}/messages")
+async def post_message(session_id: str, message: UserMessage):
+    session = store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    async with session.lock:
+        start = time.perf_counter()
+        # 这一轮失败时恢复到轮前的状态，避免历史中留下没有工具结果的 tool_calls（之后每次请求模型都会返回 400）
+        message_count = len(session.messages)
+        slots = copy.deepcopy(session.slots)
+        try:
+            with span("turn", agent="03-service"):
+                reply = await run_turn(session, message.content)
+        except Exception as e:
+            del session.messages[message_count:]
+            session.slots = slots
+            print(f"--- [错误]: 会话 {session_id} 处理失败: {e} ---")
+            raise HTTPException(status_code=502, detail=f"Model request failed: {e}")
+        elapsed = time.perf_counter() - start
+        session.turns += 1
+    turn_latencies.append(elapsed)
+    return {"reply": reply, "latency_ms": round(elapsed * 1000, 1)}
+
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    if not store.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return {"deleted": session_id}
+
+
+@app.get("/stats")
+async def stats():
+    latencies = sorted(turn_latencies)
+    percentiles = {}
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100)
+        percentiles = {f"p{p}_ms": round(cuts[p - 1] * 1000, 1) for p in (50, 95, 99)}
+    return {
+        "sessions": len(store.sessions),
+        "evicted": store.evicted,
+        "active_turns": sum(1 for s in store.sessions.values() if s.lock.locked()),
+        "recent_turns": len(latencies),
+        **percentiles,
+    }
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8080
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
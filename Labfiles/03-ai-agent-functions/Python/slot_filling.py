@@ -0,0 +1,88 @@
+import json
+import re
+import uuid
+
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+# 提取描述时连同 "my email is" 之类的引导语一起去掉
+EMAIL_PHRASE_PATTERN = re.compile(
+    r"(?:\b(?:my\s+)?e-?mail(?:\s+address)?(?:\s+is|\s*[:：])\s*|(?:我的)?(?:电子)?邮箱(?:地址)?(?:是|[:：])\s*)?"
+    + EMAIL_PATTERN.pattern,
+    re.IGNORECASE,
+)
+GREETING_PATTERN = re.compile(r"^\s*(?:hi|hello|hey|你好|您好)\b[\s,，!！.。]*", re.IGNORECASE)
+# 常见的故障描述用语；必须命中其一才视为问题描述，拿不准的消息交给模型判断
+PROBLEM_PATTERN = re.compile(
+    r"\b(?:can'?t|cannot|won'?t|doesn'?t|isn'?t|not working|error\w*|fail\w*|broken|crash\w*|slow|unable|"
+    r"freez\w*|stuck|down|offline|black screen|no internet|lost|disconnect\w*|drop\w*|flicker\w*|keeps? \w+ing)\b|"
+    r"无法|不能|失败|错误|故障|崩溃|很慢|打不开|连不上|不工作",
+    re.IGNORECASE,
+)
+MIN_DESCRIPTION_CHARS = 10
+
+
+def extract_email(text: str) -> str | None:
+    emails = EMAIL_PATTERN.findall(text)
+    return emails[-1] if emails else None
+
+
+def extract_description(text: str) -> str | None:
+    """如果消息（去掉电子邮件和问候语后）像一段问题描述，则返回它。"""
+    text = GREETING_PATTERN.sub("", EMAIL_PHRASE_PATTERN.sub("", text)).strip(" \t\n,，.。")
+    if len(text) >= MIN_DESCRIPTION_CHARS and PROBLEM_PATTERN.search(text):
+        return text
+    return None
+
+
+class SlotFiller:
+    """在本地从用户消息中收集 create_support_ticket 的参数（电子邮件和问题描述）。
+
+    两个参数都齐全时，代理可以直接创建工单，不必再请模型决定调用工具；
+    只缺一个时，可以直接追问缺少的那个，而不用再请求一次模型；但每张工单只在本地追问一次，
+    如果用户的回答仍然无法在本地识别（例如只回答 "wifi"），就交给模型处理。
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.email = None
+        self.descriptions = []
+        self.asked = False
+
+    def update(self, user_input: str) -> None:
+        self.email = extract_email(user_input) or self.email
+        description = extract_description(user_input)
+        if description:
+            self.descriptions.append(description)
+
+    @property
+    def complete(self) -> bool:
+        return bool(self.email and self.descriptions)
+
+    def arguments(self) -> dict:
+        return {"email": self.email, "description": "\n".join(self.descriptions)}
+
+    def follow_up(self) -> str | None:
+        """只收集到一个参数且还没有在本地追问过时，返回追问另一个参数的问题；否则返回 None（交给模型处理）。"""
+        if self.asked:
+            return None
+        question = None
+        if self.email and not self.descriptions:
+            question = "Thanks! Please describe the technical problem you are having."
+        elif self.descriptions and not self.email:
+            question = "Sorry to hear that. What is your email address, so we can follow up on your ticket?"
+        self.asked = question is not None
+        return question
+
+    def tool_call_message(self) -> dict:
+        """构造一条与模型返回格式相同的工具调用消息，保持对话历史完整。"""
+        return {
+            "role": "assistant",
+            "content": f"Creating a support ticket for {self.email}.",
+            "tool_calls": [{
+                "id": f"call_local_{uuid.uuid4().hex[:16]}",
+                "type": "function",
+                "function": {"name": "create_support_ticket",
+                             "arguments": json.dumps(self.arguments(), ensure_ascii=False)},
+            }],
+        }
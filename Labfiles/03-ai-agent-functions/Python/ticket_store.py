@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Iterable, NamedTuple
+
+# 工单数据库的默认位置（当前目录），可通过 TICKET_DB 环境变量修改
+DEFAULT_DB_PATH = os.getenv("TICKET_DB", "tickets.db")
+# 批量插入时每个事务写入的工单数
+BATCH_SIZE = 10_000
+
+
+class Ticket(NamedTuple):
+    id: int
+    email: str
+    description: str
+    created_at: str
+
+
+def format_ticket_id(ticket_id: int) -> str:
+    """将数字工单ID格式化为展示给用户的形式，例如 T000042。"""
+    return f"T{ticket_id:06d}"
+
+
+class TicketStore:
+    """基于 SQLite (WAL 模式) 的只追加工单存储。
+
+    工单ID由 AUTOINCREMENT 主键生成，单调递增且永不复用，因此不会冲突或覆盖旧工单。
+    所有工单保存在一个数据库文件中，并按电子邮件和创建时间建立索引。
+    每次写入都是一个已提交的事务；批量插入在一个事务中写入多条工单以分摊提交开销。
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        # 工具函数可能在多个线程中被调用，所以共享一个连接并用锁串行化写入
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.db.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = FULL;
+            CREATE TABLE IF NOT EXISTS tickets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                email TEXT NOT NULL,
+                description TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS tickets_email ON tickets (email, created_at);
+            CREATE INDEX IF NOT EXISTS tickets_created_at ON tickets (created_at);
+        """)
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().isoformat(sep=" ", timespec="microseconds")
+
+    def create(self, email: str, description: str) -> int:
+        """写入一张工单并返回其ID。"""
+        with self.lock, self.db:
+            cursor = self.db.execute(
+                "INSERT INTO tickets (email, description, created_at) VALUES (?, ?, ?)",
+                (email, description, self._now()),
+            )
+        return cursor.lastrowid
+
+    def bulk_create(self, tickets: Iterable[tuple[str, str]]) -> list[int]:
+        """批量写入 (email, description) 工单，按输入顺序返回它们的ID。"""
+        ids = []
+        batch = []
+        for email, description in tickets:
+            batch.append((email, description, self._now()))
+            if len(batch) >= BATCH_SIZE:
+                ids.extend(self._insert_batch(batch))
+                batch = []
+        if batch:
+            ids.extend(self._insert_batch(batch))
+        return ids
+
+    def _insert_batch(self, batch: list[tuple[str, str, str]]) -> range:
+        with self.lock, self.db:
+            # 先取得写锁，再从 AUTOINCREMENT 序列之后连续分配ID，其他进程无法在中间插入
+            self.db.execute("BEGIN IMMEDIATE")
+            first = self._sequence() + 1
+            self.db.executemany(
+                "INSERT INTO tickets (id, email, description, created_at) VALUES (?, ?, ?, ?)",
+                [(first + i, *row) for i, row in enumerate(batch)],
+            )
+        return range(first, first + len(batch))
+
+    def _sequence(self) -> int:
+        row = self.db.execute("SELECT seq FROM sqlite_sequence WHERE name = 'tickets'").fetchone()
+        return row[0] if row else 0
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self.lock:
+            return self.db.execute(sql, params).fetchall()
+
+    def get(self, ticket_id: int) -> Ticket | None:
+        rows = self._query("SELECT * FROM tickets WHERE id = ?", (ticket_id,))
+        return Ticket(*rows[0]) if rows else None
+
+    def by_email(self, email: str, limit: int = 50) -> list[Ticket]:
+        """返回某个用户最近的工单，最新的在前。"""
+        rows = self._query("SELECT * FROM tickets WHERE email = ? ORDER BY created_at DESC LIMIT ?", (email, limit))
+        return [Ticket(*row) for row in rows]
+
+    def created_between(self, start: str, end: str, limit: int = 1000) -> list[Ticket]:
+        """返回在 [start, end) 时间段内创建的工单（ISO 格式时间字符串），最早的在前。"""
+        rows = self._query(
+            "SELECT * FROM tickets WHERE created_at >= ? AND created_at < ? ORDER BY created_at LIMIT ?",
+            (start, end, limit),
+        )
+        return [Ticket(*row) for row in rows]
+
+    def count(self) -> int:
+        return self._query("SELECT COUNT(*) FROM tickets")[0][0]
+
+    def close(self):
+        self.db.close()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_store() -> TicketStore:
+    """返回进程内共享的默认工单存储（首次使用时打开）。"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = TicketStore()
+    return _default_store
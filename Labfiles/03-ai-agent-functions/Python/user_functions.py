@@ -1,5 +1,6 @@
-import random
-import string
+import sqlite3
+
+from ticket_store import format_ticket_id, get_store
 
 def create_support_ticket(email: str, description: str) -> str:
     """
@@ -10,25 +11,19 @@ def create_support_ticket(email: str, description: str) -> str:
         description (str): 用户遇到的技术问题的详细描述。
 
     Returns:
-        str: 一条确认消息，包含新的工单ID和保存详情的文件名。
+        str: 一条确认消息，包含新的工单ID和保存工单的数据库文件。
     """
-    # 生成一个6位的随机十六进制工单ID
-    ticket_id = ''.join(random.choices(string.hexdigits.lower(), k=6))
-    filename = f"ticket-{ticket_id}.txt"
-
-    print(f"--- [函数调用]: 正在创建工单 {ticket_id}... ---")
+    store = get_store()
+    print("--- [函数调用]: 正在创建工单... ---")
 
-    # 创建工单文件并写入信息
+    # 写入工单存储；ID 由存储分配，单调递增且不会冲突
     try:
-        with open(filename, "w") as f:
-            f.write(f"Support ticket: {ticket_id}\n")
-            f.write(f"Submitted by: {email}\n")
-            f.write("Description:\n")
-            f.write(description)
-        
+        ticket_id = format_ticket_id(store.create(email, description))
+        print(f"--- [函数调用]: 已创建工单 {ticket_id} ---")
+
         # 返回成功信息给AI模型
-        return f"Your support ticket has been submitted successfully! Your ticket ID is **{ticket_id}**, and the details have been saved in the file **{filename}**. Our team will get back to you shortly."
+        return f"Your support ticket has been submitted successfully! Your ticket ID is **{ticket_id}**, and the details have been saved in **{store.db_path}**. Our team will get back to you shortly."
 
-    except IOError as e:
-        print(f"--- [错误]: 无法写入文件 {filename}: {e} ---")
-        return "There was an error creating the support ticket file."
\ No newline at end of file
+    except sqlite3.Error as e:
+        print(f"--- [错误]: 无法写入工单数据库 {store.db_path}: {e} ---")
+        return "There was an error creating the support ticket."
\ No newline at end of file
@@ -0,0 +1,60 @@
+# bench_expense_aggregation.py - 测试流式费用汇总在大文件上的吞吐量、内存占用和精确度
+# 用法: python bench_expense_aggregation.py [行数] [CSV路径]
+#   例如 python bench_expense_aggregation.py 5000000 /tmp/expenses.csv
+
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from decimal import Decimal
+
+from expense_aggregation import aggregate_expenses, render_itemized_body
+
+CATEGORIES = ["taxi", "dinner", "hotel", "flight", "lunch", "parking", "train", "conference fee", "supplies"]
+
+
+def generate_expenses(path: str, rows: int) -> int:
+    """写入 rows 行费用数据，返回按整数分计算的准确总额。"""
+    rng = random.Random(42)
+    total_cents = 0
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("date,description,amount\n")
+        for start in range(0, rows, 100_000):
+            lines = []
+            for _ in range(min(100_000, rows - start)):
+                cents = rng.randint(100, 150_000)
+                total_cents += cents
+                lines.append(f"07-Mar-2025,{rng.choice(CATEGORIES)},{cents // 100}.{cents % 100:02d}\n")
+            file.write("".join(lines))
+    return total_cents
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tempfile.mkdtemp(prefix="bench_expenses_"), "expenses.csv")
+
+    print(f"生成 {rows:,} 行费用数据: {path}")
+    total_cents = generate_expenses(path, rows)
+    size_mb = os.path.getsize(path) / 1024 / 1024
+
+    start = time.perf_counter()
+    summary = aggregate_expenses(path)
+    seconds = time.perf_counter() - start
+
+    # 内存单独测一遍：tracemalloc 会让解析慢好几倍，不能和计时放在一起
+    tracemalloc.start()
+    aggregate_expenses(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    expected = Decimal(total_cents) / 100
+    print(f"汇总 {summary.count:,} 行 ({size_mb:,.0f} MB) 用时 {seconds:.1f}s: {summary.count / seconds:,.0f} 行/秒")
+    print(f"峰值内存 {peak / 1024:,.0f} KB，{len(summary.categories)} 个类别")
+    print(f"总额 {summary.total} {'与按整数分计算的结果完全一致' if summary.total == expected else f'!= 预期 {expected}'}")
+    print("\n" + render_itemized_body(summary))
+
+
+if __name__ == "__main__":
+    main()
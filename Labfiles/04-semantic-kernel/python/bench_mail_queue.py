@@ -0,0 +1,75 @@
+# bench_mail_queue.py - 比较"每封邮件同步建立一个 SMTP 连接"和后台出站队列的发送耗时
+# 用法: python bench_mail_queue.py [邮件数] [连接建立延迟毫秒] [每封邮件的服务器延迟毫秒]
+#   连接建立延迟模拟真实 SMTP 服务器的握手（TCP/TLS/EHLO/登录）开销
+
+import smtplib
+import sys
+import time
+from email.message import EmailMessage
+
+from debug_smtp_server import DebugSMTPHandler, DebugSMTPServer
+from mail_queue import MailQueue
+
+PORT = 8025
+
+
+class SlowHandshakeHandler(DebugSMTPHandler):
+    def handle(self):
+        time.sleep(self.server.handshake)
+        super().handle()
+
+
+def send_one_per_connection(count: int):
+    """原来的做法：每封邮件在工具调用中同步连接、发送、断开。返回工具调用的平均阻塞时间。"""
+    blocked = []
+    for i in range(count):
+        start = time.perf_counter()
+        message = EmailMessage()
+        message["From"], message["To"], message["Subject"] = "bench@contoso.com", "expenses@contoso.com", f"Claim {i}"
+        message.set_content("Expense claim")
+        with smtplib.SMTP("127.0.0.1", PORT) as connection:
+            connection.send_message(message)
+        blocked.append(time.perf_counter() - start)
+    return sum(blocked) / count
+
+
+def send_queued(count: int, pool_size: int):
+    mail = MailQueue("127.0.0.1", PORT, pool_size=pool_size)
+    blocked = []
+    for i in range(count):
+        start = time.perf_counter()
+        mail.submit("expenses@contoso.com", f"Claim {i}", "Expense claim")
+        blocked.append(time.perf_counter() - start)
+    mail.close()
+    return sum(blocked) / count, mail.stats
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    handshake_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+    latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    server = DebugSMTPServer(PORT, latency_ms / 1000)
+    server.RequestHandlerClass = SlowHandshakeHandler
+    server.handshake = handshake_ms / 1000
+    server.start()
+    print(f"{count} emails, handshake {handshake_ms:.0f} ms, {latency_ms:.0f} ms per message\n")
+    print(f"{'mode':<28}{'total s':>9}{'emails/s':>10}{'blocked ms':>12}{'connections':>13}")
+
+    start = time.perf_counter()
+    blocked = send_one_per_connection(count)
+    seconds = time.perf_counter() - start
+    print(f"{'connection per email':<28}{seconds:>9.2f}{count / seconds:>10.0f}{blocked * 1000:>12.2f}{count:>13}")
+
+    for pool_size in (1, 4):
+        start = time.perf_counter()
+        blocked, stats = send_queued(count, pool_size)
+        seconds = time.perf_counter() - start
+        print(f"{f'queue, pool of {pool_size}':<28}{seconds:>9.2f}{count / seconds:>10.0f}{blocked * 1000:>12.2f}"
+              f"{stats['connections']:>13}")
+    print(f"\nserver received {server.stats['messages']} emails over {server.stats['connections']} connections")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
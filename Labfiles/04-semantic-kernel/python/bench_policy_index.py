@@ -0,0 +1,85 @@
+# bench_policy_index.py - 测试政策索引在数百个文档上的建索引、增量更新和检索性能，
+# 并比较检索结果与"把全部文档粘贴进提示词"的提示词大小
+# 用法: python bench_policy_index.py [文档数] [每个文档的段落数]
+
+import random
+import statistics
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from policy_index import DEFAULT_POLICY_PATH, PolicyIndex, format_hits, parse_docx
+
+WORDS = ("travel hotel flight meal dinner taxi approval receipt manager limit claim reimbursement vendor "
+         "conference training mileage parking client gift equipment software subscription laptop phone "
+         "international currency advance deadline audit exception").split()
+# 真实文档的词汇量大得多：用随机生成的填充词稀释上面的政策词
+FILLER = [f"term{i}" for i in range(3000)]
+QUERIES = ["taxi fare limit", "hotel per night", "dinner with client alcohol", "conference registration approval",
+           "mileage reimbursement rate", "laptop purchase exception", "receipt deadline audit"]
+
+
+def write_docx(path: Path, rng: random.Random, paragraphs: int):
+    """写一个只包含 word/document.xml 的最小 .docx。"""
+    body = [f'<w:p><w:pPr><w:pStyle w:val="Title"/></w:pPr><w:r><w:t>Policy {path.stem}</w:t></w:r></w:p>']
+    for _ in range(paragraphs):
+        text = " ".join(rng.choice(WORDS) if rng.random() < 0.2 else rng.choice(FILLER)
+                        for _ in range(rng.randint(20, 60))).capitalize() + "."
+        body.append(f"<w:p><w:r><w:t>{escape(text)}</w:t></w:r></w:p>")
+    xml = ('<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+           + "".join(body) + "</w:body></w:document>")
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", xml)
+
+
+def main():
+    documents = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    paragraphs = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    rng = random.Random(7)
+    directory = Path(tempfile.mkdtemp(prefix="bench_policy_"))
+    paths = [directory / f"policy_{i:04d}.docx" for i in range(documents)]
+    for path in paths:
+        write_docx(path, rng, paragraphs)
+    paths.append(DEFAULT_POLICY_PATH)
+
+    index = PolicyIndex(directory / "policy_index.db")
+    start = time.perf_counter()
+    index.ingest(paths)
+    full = time.perf_counter() - start
+    chunks = index.db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+    print(f"{len(paths)} documents, {chunks:,} chunks")
+    print(f"full build:            {full:.2f}s")
+
+    start = time.perf_counter()
+    unchanged = index.ingest(paths)
+    print(f"re-ingest, no changes: {(time.perf_counter() - start) * 1000:.1f} ms ({unchanged} reparsed)")
+
+    write_docx(paths[0], rng, paragraphs)
+    start = time.perf_counter()
+    changed = index.ingest(paths)
+    print(f"re-ingest, 1 changed:  {(time.perf_counter() - start) * 1000:.1f} ms ({changed} reparsed)")
+
+    timings = []
+    for _ in range(20):
+        for query in QUERIES:
+            start = time.perf_counter()
+            index.search(query, top_k=3)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f"search top-3:          p50 {statistics.median(timings) * 1000:.2f} ms, "
+          f"p95 {timings[int(len(timings) * 0.95)] * 1000:.2f} ms")
+
+    corpus = sum(len(chunk.text) for path in paths for chunk in parse_docx(path))
+    passages = statistics.mean(len(format_hits(index.search(query, top_k=3))) for query in QUERIES)
+    print(f"prompt size:           whole corpus {corpus:,} chars vs top-3 passages {passages:,.0f} chars")
+    # 几百个干扰文档中，真实政策的住宿条款仍应排在第一
+    hits = index.search("hotel per night", top_k=1)
+    assert hits and hits[0].chunk.document == DEFAULT_POLICY_PATH.name and "Accommodation" in hits[0].chunk.text, hits
+    print(f"\n'hotel per night' ->\n{format_hits(hits)}")
+
+
+if __name__ == "__main__":
+    main()
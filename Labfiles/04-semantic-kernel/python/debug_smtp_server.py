@@ -0,0 +1,77 @@
+# debug_smtp_server.py - 本地调试用的最小 SMTP 服务器，只接收邮件并打印摘要，不会真正投递
+#
+# 运行: python debug_smtp_server.py [端口] [每封邮件的延迟毫秒]
+# 然后设置 SMTP_HOST=127.0.0.1 SMTP_PORT=<端口> 运行 semantic-kernel.py。
+# 只实现了 EHLO/HELO、MAIL、RCPT、DATA、RSET、NOOP 和 QUIT，足够 smtplib 使用。
+
+import socketserver
+import sys
+import threading
+import time
+from email import message_from_bytes
+
+
+class DebugSMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.stats["connections"] += 1
+        self.reply("220 localhost debug SMTP server ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip()
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 localhost")
+            elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while (data := self.rfile.readline()) not in (b".\r\n", b".\n", b""):
+                    lines.append(data[1:] if data.startswith(b"..") else data)
+                if server.latency:
+                    time.sleep(server.latency)
+                message = message_from_bytes(b"".join(lines))
+                with server.lock:
+                    server.stats["messages"] += 1
+                    server.messages.append(message)
+                if server.verbose:
+                    print(f"Received {message['Message-ID']} to {message['To']}: {message['Subject']}")
+                self.reply("250 OK: queued")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class DebugSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port: int = 1025, latency: float = 0.0, verbose: bool = False):
+        super().__init__(("127.0.0.1", port), DebugSMTPHandler)
+        self.latency = latency
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.stats = {"connections": 0, "messages": 0}
+        self.messages = []
+
+    def start(self) -> "DebugSMTPServer":
+        """在后台线程中运行服务器。"""
+        threading.Thread(target=self.serve_forever, name="debug-smtp", daemon=True).start()
+        return self
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 1025
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 0
+    with DebugSMTPServer(port, latency_ms / 1000, verbose=True) as server:
+        print(f"Debug SMTP server listening on 127.0.0.1:{port}")
+        server.serve_forever()
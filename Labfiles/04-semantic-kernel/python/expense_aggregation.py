@@ -0,0 +1,106 @@
+import csv
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+# 邮件正文中逐条列出的最多行数；超过后只列出各类别的小计
+MAX_ITEMIZED_ROWS = 50
+# 单独统计的最多类别数；其余类别合并为 "other"，保证内存占用有上限
+MAX_CATEGORIES = 1000
+OTHER_CATEGORY = "other"
+
+
+@dataclass
+class ExpenseSummary:
+    """一个费用文件的精确汇总：总额、各类别小计，以及前若干条明细。"""
+    total: Decimal = Decimal("0")
+    count: int = 0
+    categories: dict = field(default_factory=dict)  # 类别 -> [笔数, 小计]
+    items: list = field(default_factory=list)        # 前 MAX_ITEMIZED_ROWS 条 (日期, 描述, 金额)
+    skipped: list = field(default_factory=list)      # 无法解析的行号（最多记录 MAX_ITEMIZED_ROWS 个）
+    skipped_count: int = 0
+
+    @property
+    def itemized(self) -> bool:
+        """是否每一条费用都列在了明细中。"""
+        return self.count <= MAX_ITEMIZED_ROWS
+
+
+def _parse_amount(text: str) -> Decimal | None:
+    try:
+        value = Decimal(text)
+    except InvalidOperation:
+        try:
+            value = Decimal(text.strip().lstrip("$").replace(",", ""))
+        except InvalidOperation:
+            return None
+    return value if value.is_finite() else None
+
+
+def aggregate_expenses(path: str | Path) -> ExpenseSummary:
+    """流式读取 date,description,amount 格式的 CSV，用 Decimal 精确汇总。
+
+    逐行处理，只保留汇总和前几条明细，所以数百万行的文件也只占用固定内存。
+    标题行、空行和金额无法解析的行会被跳过并计数。
+    """
+    summary = ExpenseSummary()
+    # 热循环只使用局部变量，数百万行时可明显减少属性查找的开销
+    categories, items = summary.categories, summary.items
+    total, count = Decimal("0"), 0
+    with open(path, newline="", encoding="utf-8") as file:
+        for line_number, row in enumerate(csv.reader(file), start=1):
+            if len(row) < 3:
+                continue
+            value = _parse_amount(row[2])
+            if value is None:
+                if line_number > 1:  # 第一行无法解析的是标题行
+                    summary.skipped_count += 1
+                    if len(summary.skipped) < MAX_ITEMIZED_ROWS:
+                        summary.skipped.append(line_number)
+                continue
+            total += value
+            count += 1
+            description = row[1].strip()
+            category = description.lower() or OTHER_CATEGORY
+            subtotal = categories.get(category)
+            if subtotal is None:
+                if len(categories) >= MAX_CATEGORIES:
+                    category = OTHER_CATEGORY
+                subtotal = categories.setdefault(category, [0, Decimal("0")])
+            subtotal[0] += 1
+            subtotal[1] += value
+            if count <= MAX_ITEMIZED_ROWS:
+                items.append((row[0].strip(), description, value))
+    summary.total, summary.count = total, count
+    return summary
+
+
+def _money(amount: Decimal) -> str:
+    return f"{amount.quantize(Decimal('0.01')):,}"
+
+
+def render_itemized_body(summary: ExpenseSummary) -> str:
+    """渲染邮件正文中的费用明细和总额；所有数字都来自汇总，而不是模型。"""
+    lines = []
+    if summary.itemized:
+        lines.append("Itemized expenses:")
+        lines += [f"- {date} {description}: {_money(amount)}" for date, description, amount in summary.items]
+        lines.append("")
+    # 逐条列出时，只有类别有重复才需要小计
+    if not summary.itemized or len(summary.categories) < summary.count:
+        lines.append(f"Subtotals by category ({summary.count:,} items):")
+        for category, (count, subtotal) in sorted(summary.categories.items(), key=lambda item: -item[1][1]):
+            lines.append(f"- {category}: {_money(subtotal)} ({count:,} item{'s' if count != 1 else ''})")
+        lines.append("")
+    lines.append(f"Total: {_money(summary.total)}")
+    if summary.skipped_count:
+        lines.append(f"({summary.skipped_count:,} unreadable line(s) not included, e.g. line(s) "
+                     f"{', '.join(map(str, summary.skipped[:5]))})")
+    return "\n".join(lines)
+
+
+def describe_for_model(summary: ExpenseSummary) -> str:
+    """给模型的简短摘要，让它只需围绕这些已算好的数字组织措辞。"""
+    categories = sorted(summary.categories.items(), key=lambda item: -item[1][1])[:10]
+    return (f"{summary.count:,} expenses, total {_money(summary.total)}. "
+            f"Largest categories: " + ", ".join(f"{name} {_money(subtotal)}" for name, (_, subtotal) in categories))
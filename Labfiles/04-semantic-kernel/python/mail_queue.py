@@ -0,0 +1,211 @@
+import atexit
+import os
+import queue
+import smtplib
+import threading
+import time
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+
+# 发件人地址，可通过 SMTP_SENDER 环境变量修改
+DEFAULT_SENDER = os.getenv("SMTP_SENDER", "expenses-agent@contoso.com")
+
+
+@dataclass
+class _Outgoing:
+    message: EmailMessage
+    attempts: int = 0
+    errors: list = field(default_factory=list)
+
+
+class MailQueue:
+    """后台发送邮件的出站队列。
+
+    submit() 只把邮件放入队列并立即返回消息ID，不会阻塞调用它的工具函数。
+    pool_size 个发送线程各自持有一个持久的 SMTP 连接，每次从队列取出最多 batch_size
+    封邮件，在同一个连接上依次发送，省去每封邮件的连接、EHLO 和登录开销；
+    空闲超过 idle_timeout 秒的连接会被关闭，下次需要时再重新建立。
+
+    连接断开、网络错误和 4xx 临时错误会按指数退避重试，最多 max_retries 次；
+    5xx 永久错误直接记为失败。可用 status() 查询每封邮件的状态。
+    """
+
+    def __init__(self, host: str, port: int = 25, username: str | None = None, password: str | None = None,
+                 starttls: bool = False, sender: str = DEFAULT_SENDER, pool_size: int = 2, batch_size: int = 20,
+                 max_retries: int = 3, retry_backoff: float = 1.0, idle_timeout: float = 30.0, timeout: float = 30.0):
+        self.host, self.port = host, port
+        self.username, self.password, self.starttls = username, password, starttls
+        self.sender = sender
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.stats = {"queued": 0, "sent": 0, "failed": 0, "retries": 0, "connections": 0, "batches": 0}
+        self._queue = queue.Queue()
+        self._status = {}        # 消息ID -> queued / sent / failed: <原因>
+        self._pending = 0        # 已提交但尚未发送成功或最终失败的邮件数
+        self._condition = threading.Condition()
+        self._closed = False
+        self._workers = [threading.Thread(target=self._run, name=f"smtp-{i}", daemon=True) for i in range(pool_size)]
+        for worker in self._workers:
+            worker.start()
+        atexit.register(self.close)
+
+    def submit(self, to: str, subject: str, body: str) -> str:
+        """把一封邮件放入发送队列，立即返回其消息ID。"""
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = to
+        message["Subject"] = subject
+        message["Date"] = formatdate(localtime=True)
+        message["Message-ID"] = make_msgid(domain=self.sender.rpartition("@")[2] or None)
+        message.set_content(body)
+        message_id = message["Message-ID"]
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The mail queue is closed.")
+            self._status[message_id] = "queued"
+            self._pending += 1
+            self.stats["queued"] += 1
+        self._queue.put(_Outgoing(message))
+        return message_id
+
+    def status(self, message_id: str) -> str | None:
+        with self._condition:
+            return self._status.get(message_id)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """等待已提交的邮件全部发送完成（或最终失败）；超时返回 False。"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def close(self, timeout: float | None = 60.0) -> None:
+        """发送完队列中的邮件后关闭所有连接。"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+        self.flush(timeout)
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout=5)
+
+    def _connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            connection.starttls()
+        if self.username:
+            connection.login(self.username, self.password or "")
+        with self._condition:
+            self.stats["connections"] += 1
+        return connection
+
+    def _run(self):
+        connection, last_used = None, 0.0
+        while True:
+            try:
+                item = self._queue.get(timeout=self.idle_timeout if connection else None)
+            except queue.Empty:
+                connection = self._disconnect(connection)  # 空闲太久，服务器多半也会断开
+                continue
+            if item is None:
+                self._disconnect(connection)
+                return
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:  # 关闭信号留给下一轮处理
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+
+            with self._condition:
+                self.stats["batches"] += 1
+            for outgoing in batch:
+                try:
+                    if connection is not None and time.monotonic() - last_used > self.idle_timeout:
+                        connection = self._disconnect(connection)
+                    if connection is None:
+                        connection = self._connect()
+                    connection.send_message(outgoing.message)
+                    last_used = time.monotonic()
+                    self._finish(outgoing, "sent")
+                except (smtplib.SMTPException, OSError) as e:
+                    if not isinstance(e, (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused)):
+                        connection = self._disconnect(connection, graceful=False)  # 连接状态未知，直接关闭后重建
+                    self._retry_or_fail(outgoing, e)
+                except Exception as e:
+                    # 其他错误（例如邮件本身无法序列化）只让这一封失败，不能让发送线程退出、使 flush/close 一直等待
+                    connection = self._disconnect(connection, graceful=False)
+                    outgoing.errors.append(f"{type(e).__name__}: {e}")
+                    self._finish(outgoing, f"failed: {outgoing.errors[-1]}")
+
+    def _disconnect(self, connection: smtplib.SMTP | None, graceful: bool = True) -> None:
+        if connection is not None and not graceful:
+            connection.close()
+        elif connection is not None:
+            try:
+                connection.quit()
+            except (smtplib.SMTPException, OSError):
+                connection.close()
+        return None
+
+    def _retry_or_fail(self, outgoing: _Outgoing, error: Exception):
+        outgoing.attempts += 1
+        outgoing.errors.append(f"{type(error).__name__}: {error}")
+        if _is_transient(error) and outgoing.attempts <= self.max_retries:
+            with self._condition:
+                self.stats["retries"] += 1
+            # 延迟后重新入队，等待期间发送线程继续处理其他邮件
+            timer = threading.Timer(self.retry_backoff * 2 ** (outgoing.attempts - 1), self._queue.put, (outgoing,))
+            timer.daemon = True
+            timer.start()
+        else:
+            self._finish(outgoing, f"failed: {outgoing.errors[-1]}")
+
+    def _finish(self, outgoing: _Outgoing, status: str):
+        with self._condition:
+            self._status[outgoing.message["Message-ID"]] = status
+            self.stats["sent" if status == "sent" else "failed"] += 1
+            self._pending -= 1
+            self._condition.notify_all()
+
+
+def _is_transient(error: Exception) -> bool:
+    """连接问题和 4xx 回复可以重试；5xx 回复是永久错误。"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError))
+
+
+_default_queue = None
+_default_queue_lock = threading.Lock()
+
+
+def get_mail_queue() -> MailQueue | None:
+    """返回按 SMTP_* 环境变量配置的共享出站队列；未设置 SMTP_HOST 时返回 None（只打印邮件）。"""
+    global _default_queue
+    host = os.getenv("SMTP_HOST")
+    if not host:
+        return None
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = MailQueue(
+                host,
+                port=int(os.getenv("SMTP_PORT", "25")),
+                username=os.getenv("SMTP_USERNAME"),
+                password=os.getenv("SMTP_PASSWORD"),
+                starttls=os.getenv("SMTP_STARTTLS", "0") == "1",
+                pool_size=max(1, int(os.getenv("SMTP_POOL_SIZE", "2"))),
+                batch_size=max(1, int(os.getenv("SMTP_BATCH_SIZE", "20"))),
+                max_retries=int(os.getenv("SMTP_MAX_RETRIES", "3")),
+            )
+    return _default_queue
@@ -0,0 +1,252 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+import zipfile
+from collections import Counter
+from pathlib import Path
+from typing import Iterator, NamedTuple
+from xml.etree import ElementTree
+
+# 默认索引的政策文档：实验 01 中的费用政策
+DEFAULT_POLICY_PATH = Path(__file__).resolve().parents[2] / "01-agent-fundamentals" / "Expenses_Policy.docx"
+# 默认的索引数据库，与脚本放在同一目录
+DEFAULT_INDEX_PATH = Path(__file__).resolve().parent / "policy_index.db"
+# 单个分块的最多词数；过长的段落按句子切分，避免一个分块占满提示词
+MAX_CHUNK_WORDS = 120
+# BM25 参数
+K1, B = 1.2, 0.75
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have i in is it its of on or our per such that the their this "
+    "to was were will with you your any should".split()
+)
+
+
+class PolicyChunk(NamedTuple):
+    document: str   # 文档文件名
+    heading: str    # 分块所在的标题
+    text: str
+
+
+class PolicyHit(NamedTuple):
+    score: float
+    chunk: PolicyChunk
+
+
+def tokenize(text: str) -> list[str]:
+    """小写、去掉停用词，并做最简单的复数还原（meals -> meal）。"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def _text(element) -> str:
+    parts = []
+    for node in element.iter():
+        if node.tag == f"{W}t":
+            parts.append(node.text or "")
+        elif node.tag in (f"{W}tab", f"{W}br"):
+            parts.append(" ")
+    return re.sub(r"\s+", " ", "".join(parts)).strip()
+
+
+def _sentences(text: str) -> Iterator[str]:
+    """按句子切分；超过 MAX_CHUNK_WORDS 个词的句子再按词切开。"""
+    for sentence in re.split(r"(?<=[.!?])\s+", text):
+        words = sentence.split()
+        for start in range(0, len(words), MAX_CHUNK_WORDS):
+            yield " ".join(words[start:start + MAX_CHUNK_WORDS])
+
+
+def _split_long(text: str) -> Iterator[str]:
+    """按句子把过长的段落切成不超过 MAX_CHUNK_WORDS 个词的分块。"""
+    if len(text.split()) <= MAX_CHUNK_WORDS:
+        yield text
+        return
+    chunk, words = [], 0
+    for sentence in _sentences(text):
+        length = len(sentence.split())
+        if chunk and words + length > MAX_CHUNK_WORDS:
+            yield " ".join(chunk)
+            chunk, words = [], 0
+        chunk.append(sentence)
+        words += length
+    if chunk:
+        yield " ".join(chunk)
+
+
+def parse_docx(path: str | Path) -> list[PolicyChunk]:
+    """把 .docx 解析为分块：每个正文段落一块，表格每一行一块（带上表头）。
+
+    标题和 Title/Heading 样式的段落不单独成块，而是作为后续分块的 heading。
+    只用 zipfile 和 ElementTree，不依赖 python-docx。
+    """
+    name = Path(path).name
+    with zipfile.ZipFile(path) as archive:
+        root = ElementTree.fromstring(archive.read("word/document.xml"))
+    body = root.find(f"{W}body")
+    chunks, heading = [], ""
+    for element in body if body is not None else []:
+        if element.tag == f"{W}p":
+            text = _text(element)
+            if not text:
+                continue
+            style = element.find(f"{W}pPr/{W}pStyle")
+            style = style.get(f"{W}val", "") if style is not None else ""
+            if style == "Title" or style.startswith("Heading"):
+                heading = text
+                continue
+            chunks += [PolicyChunk(name, heading, part) for part in _split_long(text)]
+        elif element.tag == f"{W}tbl":
+            rows = [[_text(cell) for cell in row.findall(f"{W}tc")] for row in element.findall(f"{W}tr")]
+            header, rows = (rows[0], rows[1:]) if len(rows) > 1 else ([], rows)
+            for cells in rows:
+                if not any(cells):
+                    continue
+                text = "; ".join(f"{label}: {cell}" if label else cell
+                                 for label, cell in zip(header + [""] * len(cells), cells) if cell)
+                chunks += [PolicyChunk(name, heading, part) for part in _split_long(text)]
+    return chunks
+
+
+class PolicyIndex:
+    """持久化在 SQLite 中的 BM25 倒排索引，覆盖一个或多个政策文档。
+
+    每个文档记录大小和修改时间，再次 ingest 时只重新解析发生变化的文档，并删除已不存在
+    的文档；未变化的文档不会被读取。倒排表按词项建立索引，查询时只读取查询词的倒排
+    列表，所以检索开销随命中的分块数增长，而不是随整个语料库增长。
+    """
+
+    def __init__(self, db_path: str | Path = DEFAULT_INDEX_PATH):
+        self.db = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.lock = threading.Lock()
+        self.db.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS documents (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL,
+                document TEXT NOT NULL,
+                heading TEXT NOT NULL,
+                text TEXT NOT NULL,
+                length INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                chunk_id INTEGER NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, chunk_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS chunks_path ON chunks (path);
+            CREATE INDEX IF NOT EXISTS postings_chunk ON postings (chunk_id);
+        """)
+
+    def ingest(self, paths) -> int:
+        """让索引与给定的文档列表一致；返回重新解析的文档数。找不到的文档会被跳过并视为已删除。"""
+        paths = {str(Path(path).resolve()) for path in paths}
+        changed = 0
+        with self.lock, self.db:
+            known = {path: (size, mtime_ns) for path, size, mtime_ns in self.db.execute("SELECT * FROM documents")}
+            for path in known.keys() - paths:
+                self._remove(path)
+            for path in sorted(paths):
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    print(f"Warning: policy document {path} not found, skipping it.")
+                    self._remove(path)
+                    continue
+                if known.get(path) == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                self._remove(path)
+                self._add(path, parse_docx(path))
+                self.db.execute("INSERT INTO documents VALUES (?, ?, ?)", (path, stat.st_size, stat.st_mtime_ns))
+                changed += 1
+        return changed
+
+    def ingest_directory(self, directory: str | Path, pattern: str = "*.docx") -> int:
+        return self.ingest(path for path in Path(directory).rglob(pattern) if not path.name.startswith("~$"))
+
+    def _remove(self, path: str):
+        self.db.execute("DELETE FROM postings WHERE chunk_id IN (SELECT id FROM chunks WHERE path = ?)", (path,))
+        self.db.execute("DELETE FROM chunks WHERE path = ?", (path,))
+        self.db.execute("DELETE FROM documents WHERE path = ?", (path,))
+
+    def _add(self, path: str, chunks: list[PolicyChunk]):
+        for chunk in chunks:
+            # 标题也参与检索，例如 "Travel" 标题下的段落
+            terms = Counter(tokenize(f"{chunk.heading} {chunk.text}"))
+            cursor = self.db.execute(
+                "INSERT INTO chunks (path, document, heading, text, length) VALUES (?, ?, ?, ?, ?)",
+                (path, chunk.document, chunk.heading, chunk.text, sum(terms.values())),
+            )
+            self.db.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                                [(term, cursor.lastrowid, tf) for term, tf in terms.items()])
+
+    def search(self, query: str, top_k: int = 3) -> list[PolicyHit]:
+        """返回与查询最相关的 top_k 个分块（BM25 打分，从高到低）。"""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self.lock:
+            total, average = self.db.execute("SELECT COUNT(*), AVG(length) FROM chunks").fetchone()
+            if not total:
+                return []
+            placeholders = ", ".join("?" * len(terms))
+            document_frequency = dict(self.db.execute(
+                f"SELECT term, COUNT(*) FROM postings WHERE term IN ({placeholders}) GROUP BY term", tuple(terms)))
+            scores = Counter()
+            for term, chunk_id, tf, length in self.db.execute(
+                    f"SELECT p.term, p.chunk_id, p.tf, c.length FROM postings p JOIN chunks c ON c.id = p.chunk_id "
+                    f"WHERE p.term IN ({placeholders})", tuple(terms)):
+                df = document_frequency[term]
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                scores[chunk_id] += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / average))
+            best = scores.most_common(top_k)
+            rows = {row[0]: row[1:] for row in self.db.execute(
+                f"SELECT id, document, heading, text FROM chunks WHERE id IN ({', '.join('?' * len(best))})",
+                [chunk_id for chunk_id, _ in best])} if best else {}
+        return [PolicyHit(round(score, 3), PolicyChunk(*rows[chunk_id])) for chunk_id, score in best]
+
+
+def format_hits(hits: list[PolicyHit]) -> str:
+    """把检索结果渲染为给模型看的简短文本。"""
+    if not hits:
+        return "No relevant policy passages found."
+    return "\n\n".join(f"[{hit.chunk.document} - {hit.chunk.heading or 'Policy'}] {hit.chunk.text}" for hit in hits)
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_policy_index() -> PolicyIndex:
+    """返回共享的政策索引，首次使用时与 POLICY_DOCS 中的文档同步。
+
+    POLICY_DOCS 可以是用 os.pathsep 分隔的 .docx 文件或目录，默认为实验 01 的费用政策。
+    """
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            index = PolicyIndex(os.getenv("POLICY_INDEX_DB") or DEFAULT_INDEX_PATH)
+            paths = []
+            for entry in filter(None, os.getenv("POLICY_DOCS", str(DEFAULT_POLICY_PATH)).split(os.pathsep)):
+                entry = Path(entry)
+                paths += sorted(entry.rglob("*.docx")) if entry.is_dir() else [entry]
+            index.ingest(path for path in paths if not path.name.startswith("~$"))
+            _default_index = index
+    return _default_index
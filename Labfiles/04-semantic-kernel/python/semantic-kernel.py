@@ -1,23 +1,50 @@
 
 import os
+import sys
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from functools import partial
 from dotenv import load_dotenv
 from openai import OpenAI
 from pathlib import Path
 
+# 共享模块（本地回复模板等）位于 Labfiles/common
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))
+from response_templates import finish_turn
+from llm_cache import cached_client
+from tracing import span, trace_tools, traced_client
+
+from expense_aggregation import aggregate_expenses, describe_for_model, render_itemized_body
+from mail_queue import get_mail_queue
+from policy_index import format_hits, get_policy_index
+
 # --- 1. 定义可供 AI 调用的本地“工具” ---
-def send_email(to: str, subject: str, body: str) -> str:
+def send_email(to: str, subject: str, body: str, itemized: str = "") -> str:
     """
-    根据提供的收件人、主题和正文内容，模拟发送一封邮件。
-    实际中这里会是真正的邮件发送代码，现在我们只打印到控制台。
+    根据提供的收件人、主题和正文内容发送一封邮件。
+    itemized 是在本地预先算好的费用明细和总额，附加在模型撰写的正文之后。
+    设置了 SMTP_HOST 时，邮件放入后台出站队列后立即返回消息ID；否则只打印到控制台。
     """
+    body = f"{body}\n\n{itemized}".strip()
     # 这个打印输出就是我们期望看到的“副作用”，与预期输出完全一致
-    print(f"\nTo: {to}")
-    print(f"Subject: {subject}")
-    print(body)
+    # 一次性打印整封邮件，批量模式下多个线程同时发送时不会交错
+    print(f"\nTo: {to}\nSubject: {subject}\n{body}")
+    mail_queue = get_mail_queue()
+    if mail_queue is not None:
+        message_id = mail_queue.submit(to, subject, body)
+        return f"Expense claim email has been queued for delivery (message ID {message_id})."
     # 将成功信息返回给 AI，以便它生成最终的回复
     return "Expense claim email has been sent successfully."
 
+def search_expense_policy(query: str, top_k: int = 3) -> str:
+    """
+    在费用政策文档的索引中检索，只返回最相关的 top_k 段政策原文，而不是整份文档。
+    """
+    return format_hits(get_policy_index().search(query, top_k=max(1, min(int(top_k), 10))))
+
 # --- 2. 将本地工具转换为 OpenAI API 能理解的格式 ---
 tools = [
     {
@@ -38,100 +65,273 @@ tools = [
                     },
                     "body": {
                         "type": "string",
-                        "description": "The main content (body) of the email. This should be a detailed summary of the expenses, including a calculated total."
+                        "description": "A short covering message for the email. The itemized expenses and the calculated total are appended automatically, so do not list any amounts."
                     }
                 },
                 "required": ["to", "subject", "body"]
             }
         }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "search_expense_policy",
+            "description": "Searches the company expense policy and returns the most relevant policy passages, such as the limit and guidelines for an expense category.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "What to look up, for example the expense categories in the claim (\"hotel taxi dinner\")."
+                    },
+                    "top_k": {
+                        "type": "integer",
+                        "description": "How many passages to return (default 3)."
+                    }
+                },
+                "required": ["query"]
+            }
+        }
     }
 ]
 
 # 创建一个从函数名到真实 Python 函数的映射
 available_functions = {
-    "send_email": send_email
+    "send_email": send_email,
+    "search_expense_policy": search_expense_policy
 }
 
-# --- 3. 主程序 ---
-def main():
-    os.system('cls' if os.name == 'nt' else 'clear')
-
-    # 加载 .env 文件并初始化 OpenAI 客户端
-    load_dotenv()
-    client = OpenAI(
-        api_key=os.getenv("OPENAI_API_KEY"),
-        base_url=os.getenv("OPENAI_BASE_URL"),
-    )
-    model_name = os.getenv("OPENAI_MODEL_NAME")
-
-    # 加载数据文件
-    try:
-        script_dir = Path(__file__).parent
-        file_path = script_dir / 'data.txt'
-        with file_path.open('r') as file:
-            data = file.read()
-    except FileNotFoundError:
-        print("Error: data.txt not found. Please make sure the file exists.")
-        return
-
-    # 获取用户初始指令
-    user_prompt = input(f"Here is the expenses data in your file:\n\n{data}\nWhat would you like me to do with it?\n\n")
+# 回复模板：邮件的收件人、主题和正文就是确认信息所需的全部细节，直接在本地渲染，不再请求模型总结
+response_templates = {
+    "send_email": "{result}\n\nTo: {to}\nSubject: {subject}\n\n{body}"
+}
 
-    # 定义系统指令
-    system_prompt = """
+# 系统指令
+system_prompt = """
 You are an AI assistant for expense claim submission. Your only goal is to use the provided tools to send an email to submit an expense claim.
 1.  Analyze the user's request and the provided data.
 2.  Your task is to call the `send_email` function.
 3.  The email **must** be sent to `expenses@contoso.com`.
 4.  The subject **must** be `Expense Claim`.
-5.  For the body, you **must** first calculate the total of all expenses. Then, create a body containing a clearly itemized list of each expense and the final total.
+5.  For the body, write only a short covering message. The itemized expenses and the exact total have already been calculated and are appended to the email automatically, so do **not** list or recalculate any amounts.
 6.  After the `send_email` function is called successfully, you **must** generate a final confirmation message for the user that summarizes the details from the function call.
+7.  You may call `search_expense_policy` with the expense categories before sending. If any category exceeds its policy limit, mention it briefly in the covering message.
 """
 
-    print("\nProcessing your request...")
+# 每份报销最多进行的工具调用轮数（例如先检索政策，再发送邮件）
+MAX_TOOL_ROUNDS = 3
+# 批量模式下每个文件使用的用户指令
+BATCH_PROMPT = "Submit an expense claim for the expenses in {name}."
+# 批量模式处理的文件类型
+BATCH_SUFFIXES = {".txt", ".csv"}
+
+
+# --- 3. 处理一份费用报销 ---
+def submit_claim(client, model_name: str, summary, user_prompt: str) -> tuple[str, list, int]:
+    """让模型为一份已汇总的费用发送报销邮件。
+
+    模型可以先检索费用政策，再发送邮件，最多 MAX_TOOL_ROUNDS 轮。
+    返回 (最终回复, 工具调用列表, 模型调用次数)。API 错误会直接抛出，由调用方处理。
+    """
+    itemized_body = render_itemized_body(summary)
+    # 设置 AGENT_TRACE_FILE 时，每次工具调用都会记录一个 span
+    functions = trace_tools({**available_functions, "send_email": partial(send_email, itemized=itemized_body)})
+    # 确认信息里也附上同样的明细；转义花括号，避免被当作模板字段
+    escaped_itemized = itemized_body.replace("{", "{{").replace("}", "}}")
+    templates = {**response_templates, "send_email": f"{response_templates['send_email']}\n\n{escaped_itemized}"}
 
     # 准备发送给 API 的消息列表
     messages = [
         {"role": "system", "content": system_prompt},
-        {"role": "user", "content": f"{user_prompt}\n\nData:\n{data}"}
+        {"role": "user", "content": f"{user_prompt}\n\nExpense summary (already calculated):\n{describe_for_model(summary)}"}
     ]
 
-    try:
-        # 第一次调用：让模型决定调用工具
+    all_calls, model_calls = [], 0
+    for _ in range(MAX_TOOL_ROUNDS):
+        # 让模型决定调用工具
         response = client.chat.completions.create(
             model=model_name,
             messages=messages,
             tools=tools,
-            tool_choice="auto"
+            tool_choice="auto",
+            # 同一份费用数据的报销请求完全相同，显式启用缓存（未指定 temperature 的调用默认不缓存）
+            cache=True,
         )
+        model_calls += 1
         response_message = response.choices[0].message
         messages.append(response_message)
 
         # 检查模型是否决定调用工具
-        if response_message.tool_calls:
-            for tool_call in response_message.tool_calls:
-                function_name = tool_call.function.name
-                function_to_call = available_functions[function_name]
-                function_args = json.loads(tool_call.function.arguments)
-                
-                function_response = function_to_call(**function_args)
-                
-                messages.append({
-                    "tool_call_id": tool_call.id,
-                    "role": "tool",
-                    "name": function_name,
-                    "content": function_response,
-                })
-
-            # 第二次调用：让模型生成最终总结
-            second_response = client.chat.completions.create(model=model_name, messages=messages)
-            final_response = second_response.choices[0].message.content
-            print(f"\n# expenses_agent:\n{final_response}\n")
-        else:
-            print(f"\n# expenses_agent:\n{response_message.content}\n")
+        if not response_message.tool_calls:
+            return response_message.content, all_calls, model_calls
+
+        calls = []
+        for tool_call in response_message.tool_calls:
+            function_name = tool_call.function.name
+            function_to_call = functions[function_name]
+            function_args = json.loads(tool_call.function.arguments)
+
+            function_response = function_to_call(**function_args)
+            calls.append((function_name, function_args, function_response))
 
+            messages.append({
+                "tool_call_id": tool_call.id,
+                "role": "tool",
+                "name": function_name,
+                "content": function_response,
+            })
+        all_calls += calls
+
+        # 检索政策后还要继续让模型发送邮件；邮件发出后即可结束
+        if any(function_name == "send_email" for function_name, _, _ in calls):
+            # 有回复模板时在本地渲染最终总结，否则进行第二次调用，让模型生成最终总结
+            final_response, model_called = finish_turn(client, model_name, messages, calls, templates)
+            return final_response, all_calls, model_calls + model_called
+
+    return "The expense claim was not sent: too many tool calls without sending the email.", all_calls, model_calls
+
+
+# --- 4. 批量模式：并发处理一个目录中的所有费用文件 ---
+@dataclass
+class ClaimResult:
+    """一个费用文件的处理结果，写入结果清单。"""
+    file: str
+    status: str = "sent"      # sent / not_sent / error
+    expenses: int = 0
+    total: str = ""
+    skipped_lines: int = 0
+    model_calls: int = 0
+    seconds: float = 0.0
+    error: str = ""
+
+
+def process_expense_file(client, model_name: str, file_path: Path) -> ClaimResult:
+    """为一个文件发送报销邮件。任何错误都只记录在这个文件的结果中，不影响其他文件。"""
+    result = ClaimResult(file=file_path.name)
+    start = time.perf_counter()
+    try:
+        summary = aggregate_expenses(file_path)
+        result.expenses, result.total, result.skipped_lines = summary.count, str(summary.total), summary.skipped_count
+        if not summary.count:
+            raise ValueError("no readable expenses in file")
+        with span("turn", agent="04-expenses", file=file_path.name):
+            _, calls, result.model_calls = submit_claim(client, model_name, summary,
+                                                        BATCH_PROMPT.format(name=file_path.name))
+        if not any(function_name == "send_email" for function_name, _, _ in calls):
+            result.status = "not_sent"
+    except Exception as e:
+        result.status, result.error = "error", f"{type(e).__name__}: {e}"
+    result.seconds = round(time.perf_counter() - start, 3)
+    return result
+
+
+def write_manifest(path: Path, manifest: dict):
+    """原子地写入结果清单，中途中断也不会留下半个文件。"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def run_batch(client, model_name: str, directory: Path, concurrency: int, manifest_path: Path) -> list[ClaimResult]:
+    """用最多 concurrency 个线程并发处理目录中的费用文件，并写入结果清单。"""
+    files = sorted(path for path in directory.iterdir() if path.is_file() and path.suffix.lower() in BATCH_SUFFIXES)
+    print(f"Processing {len(files)} expense file(s) in {directory} (concurrency {concurrency})...")
+    started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="claim") as executor:
+        results = list(executor.map(lambda path: process_expense_file(client, model_name, path), files))
+    elapsed = time.perf_counter() - start
+
+    counts = {status: sum(r.status == status for r in results) for status in ("sent", "not_sent", "error")}
+    expenses = sum(r.expenses for r in results)
+    write_manifest(manifest_path, {
+        "directory": str(directory),
+        "started_at": started_at,
+        "seconds": round(elapsed, 3),
+        "concurrency": concurrency,
+        **counts,
+        "files_per_second": round(len(results) / elapsed, 3) if elapsed else None,
+        "results": [asdict(result) for result in results],
+    })
+
+    print(f"\nProcessed {len(results)} file(s) in {elapsed:.1f}s (concurrency {concurrency}):")
+    for result in results:
+        status = f"error: {result.error}" if result.error else result.status
+        print(f"  {result.file:<30} expenses={result.expenses:<8,} total={result.total:<14} "
+              f"calls={result.model_calls} {result.seconds:6.1f}s  {status}")
+    if elapsed:
+        print(f"  {len(results) / elapsed:.2f} files/s, {expenses / elapsed:,.0f} expenses/s, "
+              f"{sum(r.model_calls for r in results)} model call(s)")
+    print(f"  sent={counts['sent']} not_sent={counts['not_sent']} error={counts['error']}; manifest: {manifest_path}")
+    return results
+
+
+def close_mail_queue():
+    """等待出站队列中的邮件发送完毕，并报告投递结果。"""
+    mail_queue = get_mail_queue()
+    if mail_queue is None:
+        return
+    print("Waiting for queued emails to be delivered...")
+    mail_queue.close()
+    stats = mail_queue.stats
+    print(f"Delivered {stats['sent']} email(s), {stats['failed']} failed, {stats['retries']} retried "
+          f"over {stats['connections']} SMTP connection(s).")
+
+
+# --- 5. 主程序 ---
+def main():
+    # 批量模式: python semantic-kernel.py --batch <目录>
+    batch_directory = None
+    if "--batch" in sys.argv[1:]:
+        index = sys.argv.index("--batch")
+        if index + 1 >= len(sys.argv):
+            print("Usage: python semantic-kernel.py --batch <directory>")
+            return
+        batch_directory = Path(sys.argv[index + 1])
+        if not batch_directory.is_dir():
+            print(f"Error: {batch_directory} is not a directory.")
+            return
+    else:
+        os.system('cls' if os.name == 'nt' else 'clear')
+
+    # 加载 .env 文件并初始化 OpenAI 客户端
+    load_dotenv()
+    # 相同的请求（例如同一份费用数据的报销）直接使用持久化缓存中的响应
+    client = traced_client(cached_client(OpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        base_url=os.getenv("OPENAI_BASE_URL"),
+    )))
+    model_name = os.getenv("OPENAI_MODEL_NAME")
+
+    if batch_directory is not None:
+        # 同一个客户端（及其连接池）在所有工作线程间共享，最多 EXPENSE_CONCURRENCY 个文件同时处理
+        concurrency = max(1, int(os.getenv("EXPENSE_CONCURRENCY", "4")))
+        manifest_path = Path(os.getenv("EXPENSE_MANIFEST") or batch_directory / "claims_manifest.json")
+        run_batch(client, model_name, batch_directory, concurrency, manifest_path)
+        close_mail_queue()
+        return
+
+    # 流式汇总数据文件：总额和明细在本地用 Decimal 精确计算，模型只需组织措辞
+    try:
+        script_dir = Path(__file__).parent
+        file_path = script_dir / 'data.txt'
+        summary = aggregate_expenses(file_path)
+    except FileNotFoundError:
+        print("Error: data.txt not found. Please make sure the file exists.")
+        return
+
+    # 获取用户初始指令
+    user_prompt = input(f"Here is the expenses data in your file:\n\n{render_itemized_body(summary)}\n\nWhat would you like me to do with it?\n\n")
+
+    print("\nProcessing your request...")
+
+    try:
+        with span("turn", agent="04-expenses"):
+            final_response, _, _ = submit_claim(client, model_name, summary, user_prompt)
+        print(f"\n# expenses_agent:\n{final_response}\n")
     except Exception as e:
         print(f"An error occurred: {e}")
+    close_mail_queue()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,6 +1,9 @@
 import asyncio
 import os
+import sys
 import textwrap
+import time
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 import shutil
@@ -13,6 +16,15 @@ from semantic_kernel.contents.chat_message_content import ChatMessageContent
 from semantic_kernel.contents.utils.author_role import AuthorRole
 from semantic_kernel.functions.kernel_function_decorator import kernel_function
 
+from chat_policy import ChatPolicy
+from log_excerpt import DEFAULT_MAX_BYTES, read_bounded
+from log_index import LogIndex
+from log_signatures import SignatureMatcher
+from log_templates import MIN_BYTES as TEMPLATE_MIN_BYTES, summarize_log
+from log_watcher import LogWatcher, ProcessedState, sync_samples
+from log_writer import BatchedLogWriter
+from rate_limiter import RateLimiter, estimate_tokens, is_rate_limit_error
+
 INCIDENT_MANAGER = "INCIDENT_MANAGER"
 INCIDENT_MANAGER_INSTRUCTIONS = """
 Analyze the given log file or the response from the devops assistant.
@@ -28,7 +40,9 @@ If none of the options resolve the issue, respond with "Escalate issue."
 
 RULES:
 - Do not perform any corrective actions yourself.
-- Read the log file on every turn.
+- Read the log file on every turn. After the first read, only the entries appended since your previous read are returned.
+- Large logs are summarized: repeated lines are shown once as a template with <*> for varying values, a count (xN) and the time span.
+- To look for specific entries, such as ERRORs for one service in the last 10 minutes, query the logs instead of reading whole files.
 - Prepend your response with this text: "INCIDENT_MANAGER > {logfilepath} | "
 - Only respond with the corrective action instructions.
 """
@@ -55,11 +69,27 @@ async def main():
     script_dir = Path(__file__).parent  # Get the directory of the script
     src_path = script_dir / "sample_logs"
     file_path = script_dir / "logs"
-    shutil.copytree(src_path, file_path, dirs_exist_ok=True)
+    # With --watch, keep running and process logs as they are added or appended to
+    watch = "--watch" in sys.argv[1:]
+    if watch:
+        state = ProcessedState(script_dir / "logs_state.json")
+        copied = sync_samples(src_path, file_path, state)
+        print(f"Copied {copied} new or changed sample log file(s)")
+    else:
+        shutil.copytree(src_path, file_path, dirs_exist_ok=True)
 
     # Get the Azure AI Agent settings
     ai_agent_settings = AzureAIAgentSettings()
 
+    # Resolving obvious incidents locally is opt-in: set SIGNATURE_MIN_CONFIDENCE (e.g. 0.8) to enable it
+    signature_confidence = os.getenv("SIGNATURE_MIN_CONFIDENCE")
+
+    # Batch the DevopsPlugin log appends of every chat through one writer
+    log_writer = BatchedLogWriter(
+        flush_interval=float(os.getenv("LOG_FLUSH_INTERVAL", "0.05")),
+        fsync_policy=os.getenv("LOG_FSYNC_POLICY", "never"),
+    )
+
     async with (
         DefaultAzureCredential(exclude_environment_credential=True, 
             exclude_managed_identity_credential=True) as creds,
@@ -67,79 +97,324 @@ async def main():
     ):
     
         # Create the incident manager agent on the Azure AI agent service
-
+        incident_agent_definition = await client.agents.create_agent(
+            model=ai_agent_settings.model_deployment_name,
+            name=INCIDENT_MANAGER,
+            instructions=INCIDENT_MANAGER_INSTRUCTIONS
+        )
 
         # Create a Semantic Kernel agent for the Azure AI incident manager agent
-
+        log_plugin = LogFilePlugin(index=LogIndex(script_dir / "log_index.db"), logs_directory=file_path,
+                                   writer=log_writer)
+        agent_incident = AzureAIAgent(
+            client=client,
+            definition=incident_agent_definition,
+            plugins=[log_plugin]
+        )
 
         # Create the devops agent on the Azure AI agent service
-
+        devops_agent_definition = await client.agents.create_agent(
+            model=ai_agent_settings.model_deployment_name,
+            name=DEVOPS_ASSISTANT,
+            instructions=DEVOPS_ASSISTANT_INSTRUCTIONS,
+        )
 
         # Create a Semantic Kernel agent for the devops Azure AI agent
-
-
-        # Add the agents to a group chat with a custom termination and selection strategy
-        
-
-         # Process log files
-        for filename in os.listdir(file_path):
-            logfile_msg = ChatMessageContent(role=AuthorRole.USER, content=f"USER > {file_path}/{filename}")
-            await asyncio.sleep(30) # Wait to reduce TPM
-            print(f"\nReady to process log file: {filename}\n")
-
-
-            # Append the current log file to the chat
-
-
+        devops_plugin = DevopsPlugin(writer=log_writer)
+        agent_devops = AzureAIAgent(
+            client=client,
+            definition=devops_agent_definition,
+            plugins=[devops_plugin]
+        )
+
+        pipeline = IncidentPipeline(
+            agent_incident=agent_incident,
+            agent_devops=agent_devops,
+            log_plugin=log_plugin,
+            devops_plugin=devops_plugin,
+            # Share one request/token budget across every agent turn of every chat
+            limiter=RateLimiter(
+                requests_per_minute=float(os.getenv("RATE_LIMIT_RPM", "30")),
+                tokens_per_minute=float(os.getenv("RATE_LIMIT_TPM", "30000")),
+            ),
+            # When enabled, apply obvious incidents directly and only send ambiguous logs to the agents
+            matcher=SignatureMatcher() if signature_confidence else None,
+            min_confidence=float(signature_confidence or "1.0"),
+            # Bound the turns per log, and stop as soon as the outcome is clear
+            policy=ChatPolicy(
+                turn_budget=int(os.getenv("LOG_TURN_BUDGET", "6")),
+                stop_on_resolution=os.getenv("LOG_STOP_ON_RESOLUTION", "1") != "0",
+            ),
+        )
+
+        # Process log files, each in its own group chat, up to LOG_CONCURRENCY at a time
+        concurrency = max(1, int(os.getenv("LOG_CONCURRENCY", "1")))
+        if watch:
+            await watch_logs(pipeline, file_path, state, log_writer, concurrency)
+            return
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def process(filename):
+            async with semaphore:
+                return await process_log_file(pipeline, file_path / filename)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(process(filename) for filename in sorted(os.listdir(file_path))))
+        print_summary(results, time.perf_counter() - start, concurrency)
+        log_writer.close()
+
+
+@dataclass
+class IncidentPipeline:
+    """The agents, plugins and shared budget used to process every log file."""
+    agent_incident: AzureAIAgent
+    agent_devops: AzureAIAgent
+    log_plugin: "LogFilePlugin"
+    devops_plugin: "DevopsPlugin"
+    limiter: RateLimiter
+    matcher: SignatureMatcher | None  # None: every log goes to the agents
+    min_confidence: float
+    policy: ChatPolicy
+
+
+@dataclass
+class LogResult:
+    """The outcome of one log file's group chat."""
+    filename: str
+    turns: int = 0
+    tokens: int = 0
+    seconds: float = 0.0
+    error: str = ""
+    resolved_by: str = "agents"
+    stopped_by: str = ""  # "no action needed", "resolved", "escalated" or "turn budget"
+
+
+def create_group_chat(agent_incident, agent_devops, policy: ChatPolicy, limiter: RateLimiter | None = None,
+                      log_tokens: int = 0):
+    # Add the agents to a group chat with a custom termination and selection strategy
+    return AgentGroupChat(
+        agents=[agent_incident, agent_devops],
+        termination_strategy=ApprovalTerminationStrategy(
+            # Both agents, so a resolved DevOps action can end the chat without a confirming turn
+            agents=[agent_incident, agent_devops],
+            maximum_iterations=policy.turn_budget,
+            automatic_reset=True,
+            policy=policy,
+        ),
+        # Each agent turn is one model call, so the selection strategy charges the budget before it
+        selection_strategy=SelectionStrategy(agents=[agent_incident, agent_devops], limiter=limiter,
+                                             log_tokens=log_tokens),
+    )
+
+
+def apply_signature_match(pipeline: IncidentPipeline, logfile: Path, log_text: str):
+    """Resolve the log locally if its signatures are unambiguous; returns the outcome or None."""
+    if pipeline.matcher is None:
+        return None
+    match = pipeline.matcher.match(log_text)
+    if match.confidence < pipeline.min_confidence:
+        return None
+    if match.action is None:
+        return f"SIGNATURES > {logfile} | No action needed."
+    response = getattr(pipeline.devops_plugin, match.action)(**match.arguments, logfile=str(logfile))
+    return f"SIGNATURES > {logfile} | {match.describe()}\nDEVOPS_ASSISTANT > {response}"
+
+
+async def process_log_file(pipeline: IncidentPipeline, logfile: Path, offset: int = 0) -> LogResult:
+    """Resolve one log file, from byte `offset` on, in an isolated group chat; errors are reported, not raised."""
+    result = LogResult(logfile.name)
+    start = time.perf_counter()
+    print(f"\nReady to process log file: {logfile.name}\n")
+
+    log_text = read_bounded(str(logfile), start=offset)
+    outcome = apply_signature_match(pipeline, logfile, log_text)
+    if outcome is not None:
+        print(outcome)
+        result.resolved_by = "signatures"
+        result.stopped_by = "no action needed" if outcome.endswith("No action needed.") else "resolved"
+        result.seconds = time.perf_counter() - start
+        return result
+
+    # The incident manager reads the log on each of its turns
+    chat = create_group_chat(pipeline.agent_incident, pipeline.agent_devops, pipeline.policy,
+                             limiter=pipeline.limiter, log_tokens=estimate_tokens(log_text))
+    pipeline.log_plugin.reset(logfile, offset)  # The new chat has only seen what was processed before
+    logfile_msg = ChatMessageContent(role=AuthorRole.USER, content=f"USER > {logfile}")
+
+    # Append the current log file to the chat
+    await chat.add_chat_message(logfile_msg)
+
+    try:
+        limiter = pipeline.limiter
+        for attempt in range(limiter.max_retries + 1):
             try:
-                print()
-
-                # Invoke a response from the agents
-
-                
+                # Invoke a response from the agents; each turn waits only as long as the budget requires
+                async for response in chat.invoke():
+                    if response is None or not response.name:
+                        continue
+                    result.turns += 1
+                    result.tokens += turn_tokens(response, chat.history.messages)
+                    print(f"{response.content}")
+                break
             except Exception as e:
-                print(f"Error during chat invocation: {e}")
-                # If TPM rate exceeded, wait 60 secs
-                if "Rate limit is exceeded" in str(e):
-                    print ("Waiting...")
-                    await asyncio.sleep(60)
-                    continue
-                else:
+                if not is_rate_limit_error(e) or attempt == limiter.max_retries:
+                    raise
+                limiter.back_off(e, attempt)
+                # Resume from the turns already in the history, within what is left of the turn budget
+                remaining = pipeline.policy.turn_budget - result.turns
+                if remaining <= 0:
                     break
-
+                chat.termination_strategy.maximum_iterations = remaining
+    except Exception as e:
+        print(f"Error during chat invocation for {logfile.name}: {e}")
+        result.error = str(e)
+    result.stopped_by = chat.termination_strategy.reason or "turn budget"
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def turn_tokens(response: ChatMessageContent, history) -> int:
+    """Tokens used by one agent turn: the usage reported by the service, or else an estimate."""
+    usage = (response.metadata or {}).get("usage")
+    total = getattr(usage, "total_tokens", None)
+    if total:
+        return total
+    return estimate_prompt_tokens(response.name, history)
+
+
+def estimate_prompt_tokens(agent_name: str, history) -> int:
+    """Estimated tokens for an agent's instructions plus the chat history."""
+    instructions = INCIDENT_MANAGER_INSTRUCTIONS if agent_name == INCIDENT_MANAGER else DEVOPS_ASSISTANT_INSTRUCTIONS
+    return estimate_tokens(instructions + "".join(message.content or "" for message in history))
+
+
+async def watch_logs(pipeline: IncidentPipeline, file_path: Path, state: ProcessedState,
+                     log_writer: BatchedLogWriter, concurrency: int):
+    """Process log files as they are added or appended to, until interrupted."""
+    watcher = LogWatcher(
+        file_path, state,
+        debounce=float(os.getenv("LOG_WATCH_DEBOUNCE", "1.0")),
+        poll_interval=float(os.getenv("LOG_WATCH_POLL_INTERVAL", "2.0")),
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+    in_flight = {}
+    results = []
+    start = time.perf_counter()
+
+    async def process(logfile, offset):
+        try:
+            async with semaphore:
+                # Only what was there at the start, plus our own remediation entries, is processed
+                # by this run; anything other writers append meanwhile is picked up by the recheck
+                end = os.path.getsize(logfile)
+                log_writer.track(str(logfile))
+                try:
+                    result = await process_log_file(pipeline, logfile, offset)
+                    log_writer.flush(str(logfile))
+                finally:
+                    written = log_writer.untrack(str(logfile))
+            results.append(result)
+            if not result.error:  # Failed files are retried when they next change
+                state.mark_done(logfile, processed_offset(end, written))
+                watcher.recheck(logfile)  # Entries other writers appended during the run are processed next
+        finally:
+            del in_flight[logfile]
+
+    print(f"Watching {file_path} for new log entries ({watcher.backend}). Press Ctrl+C to stop.")
+    try:
+        async for logfile, offset in watcher.changes():
+            if logfile not in in_flight:
+                in_flight[logfile] = asyncio.create_task(process(logfile, offset))
+    finally:
+        for task in list(in_flight.values()):
+            task.cancel()
+        print_summary(results, time.perf_counter() - start, concurrency)
+
+
+def processed_offset(end: int, written: list[tuple[int, int]]) -> int:
+    """Extend the processed offset over our own appends that directly follow it.
+
+    An entry another writer appended in between stops the extension, so it (and anything
+    after it) is processed again rather than skipped.
+    """
+    for start, stop in sorted(written):
+        if start != end:
+            break
+        end = stop
+    return end
+
+
+def print_summary(results, elapsed: float, concurrency: int):
+    print(f"\nProcessed {len(results)} log files in {elapsed:.1f}s (concurrency {concurrency}):")
+    for result in results:
+        status = f"error: {result.error}" if result.error else f"{result.resolved_by}: {result.stopped_by}"
+        print(f"  {result.filename:<20} turns={result.turns:<3} tokens={result.tokens:<7,} "
+              f"{result.seconds:6.1f}s  {status}")
+    print(f"  {'total':<20} turns={sum(r.turns for r in results):<3} tokens={sum(r.tokens for r in results):<7,}")
 
 
 # class for selection strategy
 class SelectionStrategy(SequentialSelectionStrategy):
     """A strategy for determining which agent should take the next turn in the chat."""
+
+    limiter: RateLimiter | None = None  # Charged once for every agent turn
+    log_tokens: int = 0  # Estimated tokens of the log the incident manager reads on its turns
     
     # Select the next agent that should take the next turn in the chat
+    async def select_agent(self, agents, history):
+        """"Check which agent should take the next turn in the chat."""
 
+        # The Incident Manager should go after the User or the Devops Assistant
+        if (history[-1].name == DEVOPS_ASSISTANT or history[-1].role == AuthorRole.USER):
+            agent_name = INCIDENT_MANAGER
+        else:
+            # Otherwise it is the Devops Assistant's turn
+            agent_name = DEVOPS_ASSISTANT
+        agent = next((agent for agent in agents if agent.name == agent_name), None)
+
+        if self.limiter is not None:
+            tokens = estimate_prompt_tokens(agent_name, history)
+            if agent_name == INCIDENT_MANAGER:
+                tokens += self.log_tokens
+            await self.limiter.acquire(tokens)
+        return agent
 
 
 # class for temination strategy
 class ApprovalTerminationStrategy(TerminationStrategy):
     """A strategy for determining when an agent should terminate."""
 
-    # End the chat if the agent has indicated there is no action needed
+    policy: ChatPolicy = ChatPolicy()
+    reason: str = ""  # Why the chat ended, if it ended before the turn budget ran out
 
+    # End the chat if the agent has indicated there is no action needed
+    async def should_agent_terminate(self, agent, history):
+        """Check if the agent should terminate."""
+        reason = self.policy.stop_reason(history[-1].content, from_incident_manager=agent.name == INCIDENT_MANAGER)
+        if reason:
+            self.reason = reason
+        return reason is not None
 
 
 
 # class for DevOps functions
 class DevopsPlugin:
     """A plugin that performs developer operation tasks."""
-    
+
+    def __init__(self, writer: BatchedLogWriter | None = None):
+        # Appends are queued and written in batches, in order, by a shared writer
+        self.writer = writer or BatchedLogWriter()
+
     def append_to_log_file(self, filepath: str, content: str) -> None:
-        with open(filepath, 'a', encoding='utf-8') as file:
-            file.write('\n' + textwrap.dedent(content).strip())
+        self.writer.append(filepath, '\n' + textwrap.dedent(content).strip())
 
     @kernel_function(description="A function that restarts the named service")
     def restart_service(self, service_name: str = "", logfile: str = "") -> str:
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         log_entries = [
-            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ALERT  DevopsAssistant: Multiple failures detected in {service_name}. Restarting service.",
-            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO  {service_name}: Restart initiated.",
-            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO  {service_name}: Service restarted successfully.",
+            f"[{timestamp}] ALERT  DevopsAssistant: Multiple failures detected in {service_name}. Restarting service.",
+            f"[{timestamp}] INFO  {service_name}: Restart initiated.",
+            f"[{timestamp}] INFO  {service_name}: Service restarted successfully.",
         ]
 
         log_message = "\n".join(log_entries)
@@ -149,10 +424,11 @@ class DevopsPlugin:
 
     @kernel_function(description="A function that rollsback the transaction")
     def rollback_transaction(self, logfile: str = "") -> str:
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         log_entries = [
-            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ALERT  DevopsAssistant: Transaction failure detected. Rolling back transaction batch.",
-            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO   TransactionProcessor: Rolling back transaction batch.",
-            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO   Transaction rollback completed successfully.",
+            f"[{timestamp}] ALERT  DevopsAssistant: Transaction failure detected. Rolling back transaction batch.",
+            f"[{timestamp}] INFO   TransactionProcessor: Rolling back transaction batch.",
+            f"[{timestamp}] INFO   Transaction rollback completed successfully.",
         ]
 
         log_message = "\n".join(log_entries)
@@ -162,10 +438,11 @@ class DevopsPlugin:
 
     @kernel_function(description="A function that redeploys the named resource")
     def redeploy_resource(self, resource_name: str = "", logfile: str = "") -> str:
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         log_entries = [
-            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ALERT  DevopsAssistant: Resource deployment failure detected in '{resource_name}'. Redeploying resource.",
-            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO   DeploymentManager: Redeployment request submitted.",
-            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO   DeploymentManager: Service successfully redeployed, resource '{resource_name}' created successfully.",
+            f"[{timestamp}] ALERT  DevopsAssistant: Resource deployment failure detected in '{resource_name}'. Redeploying resource.",
+            f"[{timestamp}] INFO   DeploymentManager: Redeployment request submitted.",
+            f"[{timestamp}] INFO   DeploymentManager: Service successfully redeployed, resource '{resource_name}' created successfully.",
         ]
 
         log_message = "\n".join(log_entries)
@@ -175,10 +452,11 @@ class DevopsPlugin:
 
     @kernel_function(description="A function that increases the quota")
     def increase_quota(self, logfile: str = "") -> str:
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         log_entries = [
-            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ALERT  DevopsAssistant: High request volume detected. Increasing quota.",
-            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO   APIManager: Quota increase request submitted.",
-            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO   APIManager: Quota successfully increased to 150% of previous limit.",
+            f"[{timestamp}] ALERT  DevopsAssistant: High request volume detected. Increasing quota.",
+            f"[{timestamp}] INFO   APIManager: Quota increase request submitted.",
+            f"[{timestamp}] INFO   APIManager: Quota successfully increased to 150% of previous limit.",
         ]
 
         log_message = "\n".join(log_entries)
@@ -188,9 +466,10 @@ class DevopsPlugin:
 
     @kernel_function(description="A function that escalates the issue")
     def escalate_issue(self, logfile: str = "") -> str:
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         log_entries = [
-            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ALERT  DevopsAssistant: Cannot resolve issue.",
-            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ALERT  DevopsAssistant: Requesting escalation.",
+            f"[{timestamp}] ALERT  DevopsAssistant: Cannot resolve issue.",
+            f"[{timestamp}] ALERT  DevopsAssistant: Requesting escalation.",
         ]
         
         log_message = "\n".join(log_entries)
@@ -203,10 +482,62 @@ class DevopsPlugin:
 class LogFilePlugin:
     """A plugin that reads and writes log files."""
 
-    @kernel_function(description="Accesses the given file path string and returns the file contents as a string")
+    def __init__(self, index: LogIndex | None = None, logs_directory: str | Path = "",
+                 max_bytes: int = DEFAULT_MAX_BYTES, writer: BatchedLogWriter | None = None):
+        # Queued DevopsPlugin entries are flushed before a file is read
+        self.writer = writer
+        # Bytes of each log file already returned to the chat working on it
+        self.offsets = {}
+        # Larger reads are collapsed into templates, or an excerpt of the WARNING/ERROR entries
+        self.max_bytes = max_bytes
+        self.index = index or LogIndex()
+        self.logs_directory = logs_directory
+
+    def reset(self, filepath: str, offset: int = 0) -> None:
+        """Forget what was read from a file, so the next read returns it from byte `offset` on."""
+        if offset:
+            self.offsets[str(Path(filepath))] = offset
+        else:
+            self.offsets.pop(str(Path(filepath)), None)
+
+    @kernel_function(description="Accesses the given file path string and returns the file contents as a string. "
+                                 "Later calls for the same file return only the entries appended since the previous call")
     def read_log_file(self, filepath: str = "") -> str:
-        with open(filepath, 'r', encoding='utf-8') as file:
-            return file.read()
+        if self.writer:
+            self.writer.flush(filepath)
+        key = str(Path(filepath))
+        offset = self.offsets.get(key)
+        size = os.path.getsize(filepath)
+        self.offsets[key] = size
+        # Return everything on the first read, or if the file was truncated or replaced
+        if offset is None or offset > size:
+            return summarize_log(filepath, max_bytes=self.max_bytes)
+        if offset == size:
+            return f"[{filepath}: no new entries since the last read]"
+        appended = summarize_log(filepath, start=offset, max_bytes=self.max_bytes).strip('\n')
+        if size - offset > TEMPLATE_MIN_BYTES:
+            return appended  # Already a template summary or excerpt with its own header
+        lines = appended.count('\n') + 1
+        return f"[{filepath}: {lines} new line(s) appended since the last read]\n{appended}"
+
+    @kernel_function(description="Searches the structured entries of all log files, for example ERROR entries for one "
+                                 "component in the last 10 minutes. Every filter is optional; since_minutes counts back "
+                                 "from the newest matching entry")
+    def query_logs(self, level: str = "", component: str = "", since_minutes: float = 0,
+                   filepath: str = "", limit: int = 50) -> str:
+        # Pick up any files or lines written since the last query
+        if self.writer:
+            self.writer.flush()
+        if filepath:
+            self.index.ingest_file(filepath)
+        if self.logs_directory:
+            self.index.ingest_directory(self.logs_directory)
+        records = self.index.query(level=level, component=component, since_minutes=since_minutes,
+                                   file=filepath, limit=limit)
+        if not records:
+            return "No matching log entries."
+        return "\n".join(f"[{r.timestamp}] {r.level}  {r.component + ': ' if r.component else ''}{r.message}"
+                         for r in records)
 
 
 # Start the app
@@ -0,0 +1,155 @@
+# Compares group chat turn policies on the sample logs with local fake agents, so no model
+# deployment is needed. Each policy is run over the same copies of the logs and seeds.
+# Usage: python bench_chat_policy.py [trials] [miss_rate]
+#   miss_rate is how often the fake incident manager fails to notice a resolution and
+#   asks for the same action again, as real models sometimes do (default 0.2).
+import random
+import re
+import shutil
+import sys
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from chat_policy import ChatPolicy
+from log_signatures import RESOLUTIONS
+from rate_limiter import estimate_tokens
+
+INCIDENT_MANAGER = "INCIDENT_MANAGER"
+DEVOPS_ASSISTANT = "DEVOPS_ASSISTANT"
+# Modeled latency of one agent turn: a fixed overhead plus generation at this rate
+TURN_OVERHEAD_SECONDS = 1.5
+TOKENS_PER_SECOND = 400
+INSTRUCTION_TOKENS = {INCIDENT_MANAGER: 260, DEVOPS_ASSISTANT: 90}
+
+POLICIES = {
+    "lab default (confirm, 10 turns)": ChatPolicy(turn_budget=10, stop_on_resolution=False),
+    "confirm, 6 turns": ChatPolicy(turn_budget=6, stop_on_resolution=False),
+    "stop on resolution, 6 turns": ChatPolicy(turn_budget=6, stop_on_resolution=True),
+    "stop on resolution, 3 turns": ChatPolicy(turn_budget=3, stop_on_resolution=True),
+}
+
+# What the fake DevOps assistant writes to the log and answers, as DevopsPlugin does
+ACTIONS = {
+    "restart_service": ("INFO  {service_name}: Service restarted successfully.",
+                        "Service {service_name} restarted successfully."),
+    "rollback_transaction": ("INFO   Transaction rollback completed successfully.",
+                             "Transaction rolled back successfully."),
+    "redeploy_resource": ("INFO   DeploymentManager: Service successfully redeployed, resource '{resource_name}' created successfully.",
+                          "Resource '{resource_name}' redeployed successfully."),
+    "increase_quota": ("INFO   APIManager: Quota successfully increased to 150% of previous limit.",
+                       "Successfully increased quota."),
+    "escalate_issue": ("ALERT  DevopsAssistant: Requesting escalation.", "Submitted escalation request."),
+}
+
+
+# The action the incident manager recommends for each sample log, as in the lab's expected output.
+# The local SignatureMatcher is not used here: by default every log goes to the agents.
+RECOMMENDATIONS = {
+    "log1.log": ("restart_service", {"service_name": "ServiceX"}),
+    "log2.log": ("rollback_transaction", {}),
+    "log3.log": ("increase_quota", {}),
+    "log4.log": ("redeploy_resource", {"resource_name": "ResourceX"}),
+}
+
+
+@dataclass
+class ChatStats:
+    turns: int = 0
+    tokens: int = 0
+    seconds: float = 0.0
+    stopped_by: str = ""
+
+
+class FakeAgents:
+    """Deterministic stand-ins for the incident manager and DevOps assistant."""
+
+    def __init__(self, rng: random.Random, miss_rate: float):
+        self.rng = rng
+        self.miss_rate = miss_rate
+        self.offsets = {}
+        self.last_action = None
+
+    def incident_manager(self, logfile: Path) -> tuple[str, int]:
+        """Read the new part of the log and recommend an action; returns the response and tool output size."""
+        with open(logfile, encoding="utf-8") as file:
+            file.seek(self.offsets.get(logfile, 0))
+            text = file.read()
+            self.offsets[logfile] = file.tell()
+        resolved = any(re.search(marker, text, re.IGNORECASE) for marker in RESOLUTIONS)
+        if resolved and self.last_action and self.rng.random() < self.miss_rate:
+            action = self.last_action  # Missed the resolution and asks again
+        elif resolved:
+            action = None
+        else:
+            # A log without a known recommendation is escalated
+            action = RECOMMENDATIONS.get(logfile.name, ("escalate_issue", {}))
+        self.last_action = action
+        if action is None:
+            return f"{INCIDENT_MANAGER} > {logfile} | No action needed.", estimate_tokens(text)
+        name, arguments = action
+        return f"{INCIDENT_MANAGER} > {logfile} | {name}({arguments})", estimate_tokens(text)
+
+    def devops_assistant(self, logfile: Path) -> str:
+        name, arguments = self.last_action
+        entry, response = ACTIONS[name]
+        with open(logfile, "a", encoding="utf-8") as file:
+            file.write(f"\n[{datetime.now():%Y-%m-%d %H:%M:%S}] " + entry.format(**arguments))
+        return f"{DEVOPS_ASSISTANT} > " + response.format(**arguments)
+
+
+def run_chat(logfile: Path, policy: ChatPolicy, agents: FakeAgents) -> ChatStats:
+    """Run one log's chat the way AgentGroupChat does: select, respond, check termination."""
+    stats = ChatStats()
+    history = [("USER", f"USER > {logfile}")]
+    for _ in range(policy.turn_budget):
+        speaker = INCIDENT_MANAGER if history[-1][0] in ("USER", DEVOPS_ASSISTANT) else DEVOPS_ASSISTANT
+        if speaker == INCIDENT_MANAGER:
+            content, tool_tokens = agents.incident_manager(logfile)
+        else:
+            content, tool_tokens = agents.devops_assistant(logfile), 0
+        history.append((speaker, content))
+        prompt = INSTRUCTION_TOKENS[speaker] + tool_tokens + sum(estimate_tokens(text) for _, text in history)
+        completion = estimate_tokens(content)
+        stats.turns += 1
+        stats.tokens += prompt + completion
+        stats.seconds += TURN_OVERHEAD_SECONDS + completion / TOKENS_PER_SECOND
+        reason = policy.stop_reason(content, from_incident_manager=speaker == INCIDENT_MANAGER)
+        if reason:
+            stats.stopped_by = reason
+            return stats
+    stats.stopped_by = "turn budget"
+    return stats
+
+
+def main():
+    trials = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    miss_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    samples = Path(__file__).parent / "sample_logs"
+
+    print(f"{trials} trial(s) over {len(list(samples.iterdir()))} sample logs, miss rate {miss_rate:.0%}; "
+          f"per-log means (seconds are modeled, not measured)\n")
+    print(f"{'policy':<34}{'turns':>7}{'tokens':>9}{'seconds':>9}  outcomes")
+    for label, policy in POLICIES.items():
+        results = []
+        for trial in range(trials):
+            rng = random.Random(trial)
+            directory = Path(tempfile.mkdtemp(prefix="bench_chat_"))
+            try:
+                shutil.copytree(samples, directory, dirs_exist_ok=True)
+                for logfile in sorted(directory.iterdir()):
+                    results.append(run_chat(logfile, policy, FakeAgents(rng, miss_rate)))
+            finally:
+                shutil.rmtree(directory)
+        outcomes = {}
+        for stats in results:
+            outcomes[stats.stopped_by] = outcomes.get(stats.stopped_by, 0) + 1
+        count = len(results)
+        print(f"{label:<34}{sum(r.turns for r in results) / count:>7.2f}{sum(r.tokens for r in results) / count:>9,.0f}"
+              f"{sum(r.seconds for r in results) / count:>9.2f}  "
+              + ", ".join(f"{reason} {n / count:.0%}" for reason, n in sorted(outcomes.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Benchmarks bulk ingestion and query latency of LogIndex on a large synthetic log.
+# Usage: python bench_log_index.py [size_mb] [directory]
+#   e.g. python bench_log_index.py 2048 /tmp/bench_logs   (about 2 GB of logs)
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from log_index import LogIndex
+
+COMPONENTS = ["ServiceX", "TransactionProcessor", "APIManager", "ResourceManager", "DeploymentManager"]
+LEVELS = ["INFO"] * 16 + ["WARNING"] * 3 + ["ERROR"]
+MESSAGES = [
+    "Processing request ID {n}.",
+    "Response time exceeding threshold ({n}ms)",
+    "Connection timeout with DatabaseY",
+    "Processing transaction ID {n}.",
+    "Request rate nearing quota limit ({n}% used).",
+]
+
+
+def generate_logs(directory: Path, size_mb: int, files: int = 4):
+    """Write `files` log files totalling about `size_mb` megabytes."""
+    rng = random.Random(42)
+    target = size_mb * 1024 * 1024 // files
+    for i in range(files):
+        timestamp = datetime(2025, 2, 21, 10, 0, 0)
+        with open(directory / f"bench{i}.log", "w", encoding="utf-8") as file:
+            written = 0
+            while written < target:
+                lines = []
+                for _ in range(10_000):
+                    timestamp += timedelta(seconds=rng.randint(0, 2))
+                    message = rng.choice(MESSAGES).format(n=rng.randint(1, 999_999))
+                    lines.append(f"[{timestamp:%Y-%m-%d %H:%M:%S}] {rng.choice(LEVELS)}  "
+                                 f"{rng.choice(COMPONENTS)}: {message}\n")
+                chunk = "".join(lines)
+                file.write(chunk)
+                written += len(chunk)
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    directory = Path(sys.argv[2]) if len(sys.argv) > 2 else Path(tempfile.mkdtemp(prefix="bench_logs_"))
+    directory.mkdir(parents=True, exist_ok=True)
+
+    if not any(directory.glob("*.log")):
+        print(f"Generating {size_mb} MB of logs in {directory}...")
+        generate_logs(directory, size_mb)
+    total_mb = sum(path.stat().st_size for path in directory.glob("*.log")) / 1024 / 1024
+
+    db_path = directory / "bench_index.db"
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+    index = LogIndex(db_path)
+
+    start = time.perf_counter()
+    records = index.ingest_directory(directory)
+    seconds = time.perf_counter() - start
+    print(f"Ingested {records:,} records ({total_mb:,.0f} MB) in {seconds:.1f}s: "
+          f"{records / seconds:,.0f} records/s, {total_mb / seconds:,.1f} MB/s")
+
+    start = time.perf_counter()
+    index.ingest_directory(directory)
+    print(f"Incremental re-ingest with no new data: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    queries = {
+        "ERRORs for ServiceX in the last 10 minutes": dict(level="ERROR", component="ServiceX", since_minutes=10),
+        "WARNINGs in the last 60 minutes": dict(level="WARNING", since_minutes=60),
+        "latest 50 APIManager entries": dict(component="APIManager"),
+        "ERRORs in one file, last 30 minutes": dict(level="ERROR", file=str(directory / "bench0.log"), since_minutes=30),
+    }
+    for label, query in queries.items():
+        timings = []
+        for _ in range(20):
+            start = time.perf_counter()
+            rows = index.query(**query)
+            timings.append(time.perf_counter() - start)
+        print(f"{label:<45} {len(rows):>3} rows  median {statistics.median(timings) * 1000:7.2f} ms  "
+              f"max {max(timings) * 1000:7.2f} ms")
+
+    print(f"Index size: {os.path.getsize(db_path) / 1024 / 1024:,.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import re
+from dataclasses import dataclass
+
+NO_ACTION = re.compile(r"no action needed", re.IGNORECASE)
+# DevopsPlugin responses that mean the log's incident has been dealt with
+DEVOPS_OUTCOMES = {
+    "resolved": re.compile(r"restarted successfully|rolled back successfully|redeployed successfully"
+                           r"|successfully increased quota", re.IGNORECASE),
+    "escalated": re.compile(r"submitted escalation request", re.IGNORECASE),
+}
+
+
+@dataclass
+class ChatPolicy:
+    """How many turns a log's group chat may take, and what ends it early.
+
+    `turn_budget` is a hard limit on agent turns per log. The incident manager saying
+    "No action needed" always ends the chat. With `stop_on_resolution`, a successful
+    or escalated DevOps action ends it too, instead of spending another incident
+    manager turn to read the log and confirm it.
+    """
+    turn_budget: int = 6
+    stop_on_resolution: bool = True
+
+    def stop_reason(self, content: str, from_incident_manager: bool) -> str | None:
+        """Why the chat should stop after this response, or None to carry on."""
+        if from_incident_manager:
+            return "no action needed" if NO_ACTION.search(content) else None
+        if self.stop_on_resolution:
+            for reason, pattern in DEVOPS_OUTCOMES.items():
+                if pattern.search(content):
+                    return reason
+        return None
@@ -0,0 +1,102 @@
+import mmap
+import os
+import re
+from collections import deque
+
+# Levels worth showing to the agents, with their surrounding context. The pattern is not
+# anchored at the line start because that makes the scan an order of magnitude slower;
+# matches are checked against the start of their line instead.
+SEVERE_LEVEL = re.compile(rb"\][ \t]+(?:WARNING|ERROR|CRITICAL|ALERT)\b")
+DEFAULT_MAX_BYTES = int(os.getenv("LOG_EXCERPT_BYTES", "16000"))
+# Longest slice of a single window that is kept, so one huge line cannot use the whole budget
+MAX_WINDOW_BYTES = 2000
+
+
+def _line_start(mm, position: int, lower: int) -> int:
+    return max(mm.rfind(b"\n", lower, position) + 1, lower)
+
+
+def _line_end(mm, position: int, upper: int) -> int:
+    end = mm.find(b"\n", position, upper)
+    return upper if end == -1 else end + 1
+
+
+def _window(mm, position: int, start: int, end: int, context_lines: int) -> tuple[int, int]:
+    """Byte range of the line at `position` plus `context_lines` lines on each side."""
+    first = _line_start(mm, position, start)
+    for _ in range(context_lines):
+        if first <= start:
+            break
+        first = _line_start(mm, first - 1, start)
+    last = _line_end(mm, position, end)
+    for _ in range(context_lines):
+        if last >= end:
+            break
+        last = _line_end(mm, last, end)
+    return first, last
+
+
+def excerpt_log(filepath: str, start: int = 0, end: int | None = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                context_lines: int = 2) -> str:
+    """Return WARNING/ERROR lines of a file with context, within a byte budget.
+
+    The file is memory-mapped and scanned in place, and only the byte offsets of the
+    most recent windows that fit the budget are kept. Memory use stays constant
+    whatever the file size.
+    """
+    size = os.path.getsize(filepath)
+    end = size if end is None else min(end, size)
+    if end <= start:
+        return ""
+
+    with open(filepath, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        windows = deque()  # (first, last) byte ranges, newest last
+        kept_bytes = 0
+        hits = 0
+        dropped = 0
+        if hasattr(mmap, "MADV_SEQUENTIAL"):
+            mm.madvise(mmap.MADV_SEQUENTIAL)  # Let the kernel drop pages behind the scan
+        for match in SEVERE_LEVEL.finditer(mm, start, end):
+            line_start = _line_start(mm, match.start(), start)
+            if mm[line_start:line_start + 1] != b"[" or mm.find(b"]", line_start, match.start()) != -1:
+                continue  # The level is not in this line's header
+            hits += 1
+            first, last = _window(mm, match.start(), start, end, context_lines)
+            if windows and first <= windows[-1][1]:
+                # Overlaps the previous window: extend it instead of adding a new one
+                previous_first, previous_last = windows.pop()
+                kept_bytes -= min(previous_last - previous_first, MAX_WINDOW_BYTES)
+                first = previous_first
+                last = max(last, previous_last)
+            windows.append((first, last))
+            kept_bytes += min(last - first, MAX_WINDOW_BYTES)
+            while kept_bytes > max_bytes and len(windows) > 1:
+                old_first, old_last = windows.popleft()
+                kept_bytes -= min(old_last - old_first, MAX_WINDOW_BYTES)
+                dropped += 1
+
+        header = (f"[excerpt of {filepath}: bytes {start:,}-{end:,} of {size:,}, {hits:,} WARNING/ERROR line(s)"
+                  + (f", {dropped:,} earlier window(s) omitted" if dropped else "") + "]")
+        parts = [header]
+        previous_last = start
+        for first, last in windows:
+            if first > previous_last:
+                parts.append("...")
+            text = mm[first:min(last, first + MAX_WINDOW_BYTES)].decode("utf-8", errors="replace").rstrip("\n")
+            parts.append(text)
+            previous_last = last
+        if not windows:
+            parts.append("No WARNING or ERROR entries.")
+        elif previous_last < end:
+            parts.append("...")
+    return "\n".join(parts)
+
+
+def read_bounded(filepath: str, start: int = 0, max_bytes: int = DEFAULT_MAX_BYTES) -> str:
+    """Return the file from `start` in full if it fits the budget, otherwise an excerpt."""
+    size = os.path.getsize(filepath)
+    if size - start > max_bytes:
+        return excerpt_log(filepath, start=start, end=size, max_bytes=max_bytes)
+    with open(filepath, "rb") as file:
+        file.seek(start)
+        return file.read(size - start).decode("utf-8", errors="replace")
@@ -0,0 +1,181 @@
+import os
+import re
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+# [YYYY-MM-DD HH:MM:SS] LEVEL  Component: message   (the component is optional)
+RECORD_PATTERN = re.compile(
+    r"^\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\][ \t]+([A-Z]+)[ \t]+(?:([\w.-]+):[ \t]*)?([^\r\n]*)",
+    re.MULTILINE,
+)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+CHUNK_SIZE = 4 * 1024 * 1024
+# Above this much unindexed data, secondary indexes are rebuilt once instead of updated per row
+BULK_THRESHOLD = 64 * 1024 * 1024
+INDEXES = {
+    "records_level": "records (level, timestamp)",
+    "records_component": "records (component, timestamp)",
+    "records_file": "records (file, timestamp)",
+}
+
+
+class LogRecord(NamedTuple):
+    timestamp: str
+    level: str
+    component: str
+    message: str
+
+
+def parse_line(line: str) -> LogRecord | None:
+    """Parse one log line, or return None if it is not in the standard format."""
+    match = RECORD_PATTERN.match(line)
+    if match is None:
+        return None
+    timestamp, level, component, message = match.groups()
+    return LogRecord(timestamp, level, component or "", message.rstrip())
+
+
+def parse_log(lines) -> Iterator[LogRecord]:
+    """Stream structured records from an iterable of lines, skipping unparseable ones."""
+    for line in lines:
+        record = parse_line(line)
+        if record is not None:
+            yield record
+
+
+class LogIndex:
+    """A SQLite index of the records in every log file of a directory.
+
+    Files are ingested incrementally: the index remembers how many bytes of each
+    file it has read, and the file's inode, so only appended data is parsed on the
+    next ingest. A trailing line without a newline waits for the next ingest. Records
+    are indexed by level, component and timestamp for fast filtered queries.
+    """
+
+    def __init__(self, db_path: str | Path = ":memory:"):
+        self.db = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.db.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS records (
+                file TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                level TEXT NOT NULL,
+                component TEXT NOT NULL,
+                message TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                offset INTEGER NOT NULL,
+                latest TEXT,
+                inode INTEGER
+            );
+        """)
+        # Databases created before the inode column was added
+        if "inode" not in {row[1] for row in self.db.execute("PRAGMA table_info(files)")}:
+            self.db.execute("ALTER TABLE files ADD COLUMN inode INTEGER")
+        self._create_indexes()
+
+    def _create_indexes(self):
+        for name, columns in INDEXES.items():
+            self.db.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {columns}")
+
+    def _drop_indexes(self):
+        for name in INDEXES:
+            self.db.execute(f"DROP INDEX IF EXISTS {name}")
+
+    def _offset(self, path: str) -> int:
+        return self._state(path)[0]
+
+    def _state(self, path: str) -> tuple[int, int | None]:
+        row = self.db.execute("SELECT offset, inode FROM files WHERE path = ?", (path,)).fetchone()
+        return row if row else (0, None)
+
+    def ingest_file(self, path: str | Path) -> int:
+        """Index the lines appended to a file since the last ingest; returns the record count."""
+        path = str(Path(path))
+        offset, indexed_inode = self._state(path)
+        count = 0
+        latest = None
+        with open(path, "rb") as file, self.db:
+            inode = os.fstat(file.fileno()).st_ino
+            size = file.seek(0, 2)
+            if size < offset or indexed_inode not in (None, inode):
+                # Truncated or replaced (even by a larger file): index it again from the start
+                self.db.execute("DELETE FROM records WHERE file = ?", (path,))
+                self.db.execute("DELETE FROM files WHERE path = ?", (path,))
+                offset = 0
+            file.seek(offset)
+            pending = b""
+            while True:
+                chunk = file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                # Keep the trailing partial line for the next chunk, or the next ingest at EOF
+                data = pending + chunk
+                cut = data.rfind(b"\n") + 1
+                data, pending = data[:cut], data[cut:]
+                rows = RECORD_PATTERN.findall(data.decode("utf-8", errors="replace"))
+                if rows:
+                    self.db.executemany(
+                        "INSERT INTO records VALUES (?, ?, ?, ?, ?)",
+                        [(path, timestamp, level, component, message) for timestamp, level, component, message in rows],
+                    )
+                    count += len(rows)
+                    latest = max(latest or "", max(row[0] for row in rows))
+            self.db.execute(
+                "INSERT INTO files VALUES (?, ?, ?, ?) ON CONFLICT (path) DO UPDATE SET offset = excluded.offset, "
+                "latest = MAX(COALESCE(files.latest, ''), COALESCE(excluded.latest, '')), inode = excluded.inode",
+                (path, file.tell() - len(pending), latest, inode),
+            )
+        return count
+
+    def ingest_directory(self, directory: str | Path, pattern: str = "*.log") -> int:
+        paths = sorted(Path(directory).glob(pattern))
+        unindexed = sum(max(path.stat().st_size - self._offset(str(path)), 0) for path in paths)
+        bulk = unindexed > BULK_THRESHOLD
+        if bulk:
+            self._drop_indexes()
+        try:
+            return sum(self.ingest_file(path) for path in paths)
+        finally:
+            if bulk:
+                self._create_indexes()
+
+    def query(self, level: str = "", component: str = "", since_minutes: float = 0,
+              file: str = "", limit: int = 50) -> list[LogRecord]:
+        """Return matching records, oldest first.
+
+        `since_minutes` is measured back from the newest record in scope, so it works
+        for historical logs as well as live ones.
+        """
+        conditions, params = [], []
+        if component:
+            conditions.append("component = ?")
+            params.append(component)
+        if file:
+            conditions.append("file = ?")
+            params.append(str(Path(file)))
+        if since_minutes:
+            if conditions:
+                scope = " AND ".join(conditions)
+                latest = self.db.execute(f"SELECT MAX(timestamp) FROM records WHERE {scope}", params).fetchone()[0]
+            else:
+                latest = self.db.execute("SELECT MAX(latest) FROM files").fetchone()[0]
+            if latest is None:
+                return []
+            since = datetime.strptime(latest, TIMESTAMP_FORMAT) - timedelta(minutes=since_minutes)
+            conditions.append("timestamp >= ?")
+            params.append(since.strftime(TIMESTAMP_FORMAT))
+        if level:
+            conditions.append("level = ?")
+            params.append(level.upper())
+
+        where = " AND ".join(conditions) or "1"
+        rows = self.db.execute(
+            f"SELECT timestamp, level, component, message FROM records WHERE {where} "
+            f"ORDER BY timestamp DESC LIMIT ?", (*params, limit)
+        ).fetchall()
+        return [LogRecord(*row) for row in reversed(rows)]
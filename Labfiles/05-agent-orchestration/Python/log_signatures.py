@@ -0,0 +1,117 @@
+import re
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True)
+class Signature:
+    """A known log pattern that is evidence for one DevopsPlugin action."""
+    name: str
+    action: str
+    pattern: str
+    weight: float
+
+
+# Patterns are matched case-insensitively against the message part of each log line
+SIGNATURES = [
+    Signature("connection_timeout", "restart_service", r"connection timeout", 0.6),
+    Signature("connection_retry_failed", "restart_service", r"connection retry failed", 0.4),
+    Signature("critical_failure", "restart_service", r"critical failure", 0.8),
+    Signature("integrity_check_failed", "rollback_transaction", r"integrity check failed", 0.9),
+    Signature("recovery_failed", "rollback_transaction", r"recovery attempt failed", 0.3),
+    Signature("quota_exhaustion", "increase_quota", r"quota exhaustion", 0.9),
+    Signature("request_limit_exceeded", "increase_quota", r"request limit exceeded", 0.6),
+    Signature("quota_nearing", "increase_quota", r"nearing quota limit", 0.3),
+    Signature("missing_dependencies", "redeploy_resource", r"missing dependenc(?:y|ies)", 0.9),
+    Signature("dependency_resolution", "redeploy_resource", r"dependency resolution unsuccessful", 0.6),
+    Signature("resource_creation_failed", "redeploy_resource", r"resource creation failed", 0.4),
+]
+
+# Lines written by DevopsPlugin once an action has been applied
+RESOLUTIONS = [
+    r"service restarted successfully",
+    r"transaction rollback completed successfully",
+    r"quota successfully increased",
+    r"successfully redeployed",
+    r"requesting escalation",
+]
+
+# Actions that need a target name taken from the log
+REQUIRED_ARGUMENTS = {"restart_service": "service_name", "redeploy_resource": "resource_name"}
+
+LINE_PATTERN = re.compile(r"^\[[^\]]*\]\s+\w+\s+(?:(?P<component>[\w.-]+):\s*)?(?P<message>.*)$", re.MULTILINE)
+RESOURCE_PATTERN = re.compile(r"'([^']+)'")
+
+
+@dataclass
+class SignatureMatch:
+    """The action suggested by the log content and how confident the matcher is."""
+    action: str | None
+    confidence: float
+    arguments: dict = field(default_factory=dict)
+    evidence: list = field(default_factory=list)
+
+    def describe(self) -> str:
+        if self.action is None:
+            return f"no action needed (confidence {self.confidence:.2f})"
+        args = ", ".join(f"{k}={v}" for k, v in self.arguments.items())
+        return f"{self.action}({args}) (confidence {self.confidence:.2f}, matched {', '.join(self.evidence)})"
+
+
+class SignatureMatcher:
+    """Maps log content to a DevopsPlugin action in a single pass over the text.
+
+    All signatures and resolution markers are compiled into one alternation of named
+    groups, so each line is scanned once however many signatures there are. Evidence
+    for an action is combined as a noisy-or of its signature weights, and the
+    confidence is discounted when other actions are also supported by the log.
+    """
+
+    def __init__(self, signatures=SIGNATURES, resolutions=RESOLUTIONS):
+        self.signatures = {f"s{i}": signature for i, signature in enumerate(signatures)}
+        groups = [f"(?P<{key}>{signature.pattern})" for key, signature in self.signatures.items()]
+        groups += [f"(?P<r{i}>{pattern})" for i, pattern in enumerate(resolutions)]
+        self.pattern = re.compile("|".join(groups), re.IGNORECASE)
+
+    def match(self, content: str) -> SignatureMatch:
+        matched = {}  # signature -> component of the latest line it matched
+        resolved = False
+        for line in LINE_PATTERN.finditer(content):
+            message = line.group("message")
+            for hit in self.pattern.finditer(message):
+                key = hit.lastgroup
+                if key.startswith("r"):
+                    # Problems reported before a remediation have been dealt with
+                    matched.clear()
+                    resolved = True
+                else:
+                    matched[self.signatures[key]] = line.group("component")
+
+        if not matched:
+            return SignatureMatch(None, 1.0 if resolved else 0.0)
+
+        evidence = {}
+        for signature in matched:
+            evidence[signature.action] = 1 - (1 - evidence.get(signature.action, 0.0)) * (1 - signature.weight)
+        action = max(evidence, key=evidence.get)
+        confidence = evidence[action] * evidence[action] / sum(evidence.values())
+
+        signatures = [signature for signature in matched if signature.action == action]
+        arguments = self._arguments(action, signatures, matched, content)
+        if action in REQUIRED_ARGUMENTS and REQUIRED_ARGUMENTS[action] not in arguments:
+            confidence /= 2  # Without a target name the action cannot be applied as-is
+        return SignatureMatch(
+            action=action,
+            confidence=round(confidence, 3),
+            arguments=arguments,
+            evidence=[signature.name for signature in signatures],
+        )
+
+    @staticmethod
+    def _arguments(action, signatures, matched, content):
+        if action == "restart_service":
+            components = [matched[signature] for signature in signatures if matched[signature]]
+            return {"service_name": components[-1]} if components else {}
+        if action == "redeploy_resource":
+            resources = RESOURCE_PATTERN.findall(content)
+            return {"resource_name": resources[-1]} if resources else {}
+        return {}
@@ -0,0 +1,124 @@
+import os
+import re
+
+from log_excerpt import DEFAULT_MAX_BYTES, excerpt_log
+
+WILDCARD = "<*>"
+HEADER = re.compile(r"^\[(?P<timestamp>[^\]]*)\]\s+(?P<rest>.*)$")
+HAS_DIGIT = re.compile(r"\d")
+# Ranges up to this size are passed through unchanged; there is little to collapse
+MIN_BYTES = int(os.getenv("LOG_TEMPLATE_MIN_BYTES", "4096"))
+# Mining reads every line, so larger ranges go straight to the mmap excerpt instead
+MAX_SCAN_BYTES = int(os.getenv("LOG_TEMPLATE_MAX_SCAN_BYTES", str(256 * 1024 * 1024)))
+
+
+class LogCluster:
+    """Lines that share one template, with counts, time span and example parameters."""
+
+    def __init__(self, tokens: list[str], timestamp: str, max_examples: int):
+        self.template = [WILDCARD if HAS_DIGIT.search(token) else token for token in tokens]
+        self.count = 0
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.examples = []
+        self.max_examples = max_examples
+
+    def similarity(self, tokens: list[str]) -> float:
+        same = sum(1 for a, b in zip(self.template, tokens) if a == b or a == WILDCARD)
+        return same / len(tokens)
+
+    def add(self, tokens: list[str], timestamp: str):
+        self.template = [a if a == b else WILDCARD for a, b in zip(self.template, tokens)]
+        self.count += 1
+        if timestamp:
+            self.first_seen = self.first_seen or timestamp
+            self.last_seen = timestamp
+        if len(self.examples) < self.max_examples:
+            parameters = tuple(b for a, b in zip(self.template, tokens) if a == WILDCARD)
+            if parameters and parameters not in self.examples:
+                self.examples.append(parameters)
+
+    def render(self) -> str:
+        span = self.first_seen if self.first_seen == self.last_seen else f"{self.first_seen} .. {self.last_seen}"
+        line = f"[{span}] x{self.count} {' '.join(self.template)}"
+        if self.examples and WILDCARD in self.template:
+            line += "  e.g. " + "; ".join(", ".join(example) for example in self.examples)
+        return line
+
+
+class TemplateMiner:
+    """An online Drain-style log template miner.
+
+    Lines are routed through a fixed-depth tree keyed on their token count and
+    first few tokens (tokens containing digits route as wildcards), then joined to
+    the most similar cluster in the leaf, or start a new cluster. Memory is bounded
+    by `max_clusters`; lines that would need more clusters are only counted.
+    """
+
+    def __init__(self, depth: int = 3, similarity: float = 0.5, max_children: int = 100,
+                 max_clusters: int = 2000, max_examples: int = 3):
+        self.depth = depth
+        self.similarity = similarity
+        self.max_children = max_children
+        self.max_clusters = max_clusters
+        self.max_examples = max_examples
+        self.root = {}
+        self.clusters = []  # In order of first appearance
+        self.lines = 0
+        self.unclustered = 0
+
+    def add(self, line: str) -> LogCluster | None:
+        line = line.strip()
+        if not line:
+            return None
+        self.lines += 1
+        match = HEADER.match(line)
+        timestamp, text = (match["timestamp"], match["rest"]) if match else ("", line)
+        tokens = text.split()
+
+        node = self.root.setdefault(len(tokens), {})
+        for token in tokens[:self.depth]:
+            key = WILDCARD if HAS_DIGIT.search(token) else token
+            if key not in node and len(node) >= self.max_children:
+                key = WILDCARD
+            node = node.setdefault(key, {})
+        leaf = node.setdefault(None, [])
+
+        best = max(leaf, key=lambda cluster: cluster.similarity(tokens), default=None)
+        if best is None or best.similarity(tokens) < self.similarity:
+            if len(self.clusters) >= self.max_clusters:
+                self.unclustered += 1
+                return None
+            best = LogCluster(tokens, timestamp, self.max_examples)
+            leaf.append(best)
+            self.clusters.append(best)
+        best.add(tokens, timestamp)
+        return best
+
+    def render(self) -> str:
+        header = f"[{self.lines:,} log line(s) collapsed into {len(self.clusters):,} template(s)"
+        if self.unclustered:
+            header += f", {self.unclustered:,} line(s) over the template limit not shown"
+        return "\n".join([header + "]"] + [cluster.render() for cluster in self.clusters])
+
+
+def summarize_log(filepath: str, start: int = 0, max_bytes: int = DEFAULT_MAX_BYTES) -> str:
+    """Return a byte range of a log in the most compact form that keeps its anomalies.
+
+    Small ranges are returned verbatim. Larger ones are collapsed into templates, and if
+    even the templates exceed `max_bytes` (or the range is too large to mine), an excerpt
+    of the WARNING/ERROR windows is returned instead.
+    """
+    size = os.path.getsize(filepath)
+    with open(filepath, "rb") as file:
+        file.seek(start)
+        if size - start <= MIN_BYTES:
+            return file.read(size - start).decode("utf-8", errors="replace")
+        if size - start <= MAX_SCAN_BYTES:
+            miner = TemplateMiner()
+            for raw in file:
+                miner.add(raw.decode("utf-8", errors="replace"))
+            summary = miner.render()
+            if len(summary.encode("utf-8")) <= max_bytes:
+                return summary
+    return excerpt_log(filepath, start=start, end=size, max_bytes=max_bytes)
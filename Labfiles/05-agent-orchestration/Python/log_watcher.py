@@ -0,0 +1,197 @@
+import asyncio
+import fnmatch
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+
+try:
+    # Optional (Linux only): pip install inotify_simple. Without it the directory is polled.
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+
+class ProcessedState:
+    """Which log files have been processed, and up to which byte, persisted as JSON.
+
+    Each file is keyed by path and remembers its inode, so a file that is replaced
+    or truncated is processed again from the start. The sample files copied into the
+    logs directory are recorded too, so unchanged samples are not copied again.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        data = {}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable state file {self.path}: {e}")
+        self.files = data.get("files", {})
+        self.samples = data.get("samples", {})
+
+    def start_offset(self, filepath: str | Path) -> int | None:
+        """Byte offset to process the file from, or None if it has nothing new."""
+        stat = os.stat(filepath)
+        entry = self.files.get(str(Path(filepath)))
+        if entry is None or entry["inode"] != stat.st_ino or stat.st_size < entry["offset"]:
+            return 0
+        if stat.st_size == entry["offset"]:
+            return None
+        return entry["offset"]
+
+    def mark_done(self, filepath: str | Path, offset: int | None = None) -> None:
+        """Record the file as processed up to byte `offset` (by default, its current size)."""
+        stat = os.stat(filepath)
+        self.files[str(Path(filepath))] = {
+            "offset": stat.st_size if offset is None else min(offset, stat.st_size),
+            "inode": stat.st_ino,
+            "processed_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        self.save()
+
+    def forget(self, filepath: str | Path) -> None:
+        if self.files.pop(str(Path(filepath)), None) is not None:
+            self.save()
+
+    def save(self) -> None:
+        # Write a temporary file and rename it, so a crash never leaves a half-written state
+        temporary = self.path.with_suffix(self.path.suffix + ".tmp")
+        temporary.write_text(json.dumps({"files": self.files, "samples": self.samples}, indent=2), encoding="utf-8")
+        os.replace(temporary, self.path)
+
+
+def sync_samples(src_path: Path, file_path: Path, state: ProcessedState) -> int:
+    """Copy sample logs that are new or changed since they were last copied; returns the count.
+
+    A sample that has not changed is not copied again, even though its copy has since
+    had remediation entries appended, so a restart carries on where it left off.
+    """
+    file_path.mkdir(parents=True, exist_ok=True)
+    copied = 0
+    for sample in sorted(src_path.iterdir()):
+        if not sample.is_file():
+            continue
+        stat = sample.stat()
+        signature = [stat.st_size, stat.st_mtime_ns]
+        target = file_path / sample.name
+        if target.exists() and state.samples.get(sample.name) == signature:
+            continue
+        shutil.copy2(sample, target)
+        state.samples[sample.name] = signature
+        state.files.pop(str(target), None)  # The copy is a new file to process
+        copied += 1
+    state.save()
+    return copied
+
+
+class LogWatcher:
+    """Watches a directory and yields log files that are new or have grown.
+
+    Changes are picked up with inotify when `inotify_simple` is installed, otherwise by
+    polling every `poll_interval` seconds. A file is only yielded once it has had no
+    changes for `debounce` seconds, so a burst of writes is processed once, and only if
+    the state shows it has unprocessed bytes.
+    """
+
+    def __init__(self, directory: str | Path, state: ProcessedState, pattern: str = "*",
+                 debounce: float = 1.0, poll_interval: float = 2.0):
+        self.directory = Path(directory)
+        self.state = state
+        self.pattern = pattern
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.backend = "inotify" if INotify is not None else "polling"
+        self._pending = {}   # path -> monotonic time of its latest change
+        self._snapshot = {}  # Polling only: path -> (size, mtime)
+        self._inotify = None
+        self._event = asyncio.Event()
+
+    def recheck(self, filepath: str | Path) -> None:
+        """Look at a file again after the debounce delay, e.g. once it has been processed."""
+        self._pending[Path(filepath)] = time.monotonic()
+
+    async def changes(self):
+        """Yield (path, start_offset) for each file ready to be processed, forever."""
+        self._start()
+        try:
+            while True:
+                for item in self._ready():
+                    yield item
+                await self._wait()
+        finally:
+            self._stop()
+
+    def _start(self):
+        if self.backend == "inotify":
+            self._inotify = INotify()
+            self._inotify.add_watch(self.directory, flags.CREATE | flags.MODIFY | flags.CLOSE_WRITE
+                                    | flags.MOVED_TO | flags.DELETE | flags.MOVED_FROM)
+            asyncio.get_running_loop().add_reader(self._inotify.fileno(), self._event.set)
+        # Everything already in the directory is checked against the state on startup
+        snapshot = self._scan()
+        if self.backend == "polling":
+            self._snapshot = snapshot
+        now = time.monotonic() - self.debounce
+        for path in sorted(snapshot):
+            self._pending[path] = now
+
+    def _stop(self):
+        if self._inotify is not None:
+            asyncio.get_running_loop().remove_reader(self._inotify.fileno())
+            self._inotify.close()
+            self._inotify = None
+
+    def _scan(self) -> dict:
+        snapshot = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and fnmatch.fnmatch(entry.name, self.pattern):
+                    stat = entry.stat()
+                    snapshot[Path(entry.path)] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    async def _wait(self):
+        """Wait for changes, or until the earliest pending file has settled."""
+        if self.backend == "polling":
+            await asyncio.sleep(self.poll_interval if not self._pending else min(self.poll_interval, self.debounce))
+            snapshot = self._scan()
+            now = time.monotonic()
+            for path in snapshot.keys() | self._snapshot.keys():
+                if snapshot.get(path) != self._snapshot.get(path):
+                    self._pending[path] = now
+            self._snapshot = snapshot
+            return
+
+        timeout = None
+        if self._pending:
+            timeout = max(min(self._pending.values()) + self.debounce - time.monotonic(), 0)
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return
+        self._event.clear()
+        now = time.monotonic()
+        for event in self._inotify.read(timeout=0):
+            if event.mask & flags.Q_OVERFLOW:
+                # Events were lost: fall back to checking every file
+                for path in self._scan():
+                    self._pending[path] = now
+            elif event.name and fnmatch.fnmatch(event.name, self.pattern):
+                self._pending[self.directory / event.name] = now
+
+    def _ready(self):
+        now = time.monotonic()
+        for path, changed in list(self._pending.items()):
+            if now - changed < self.debounce:
+                continue
+            del self._pending[path]
+            if not path.is_file():
+                self.state.forget(path)
+                continue
+            start = self.state.start_offset(path)
+            if start is not None:
+                yield path, start
@@ -0,0 +1,154 @@
+import atexit
+import os
+import threading
+import time
+from collections import deque
+
+FSYNC_POLICIES = ("never", "batch", "interval")
+
+
+class BatchedLogWriter:
+    """Queues log appends per file and writes them in batches from a background thread.
+
+    `append` never blocks on disk I/O: entries go into a per-file queue, and one
+    writer thread coalesces everything queued for a file into a single write every
+    `flush_interval` seconds (or sooner when `max_batch` entries are waiting). A single
+    writer and FIFO queues keep each file's entries in the order they were appended,
+    however many chats write at once.
+
+    Durability is set by `fsync_policy`: "never" leaves flushing to the OS, "batch"
+    fsyncs after every batched write, and "interval" fsyncs each file at most once
+    per `fsync_interval` seconds. Under "interval", a file written since its last fsync
+    is fsynced once the interval has passed even if nothing else is written to it, and
+    every such file is fsynced when the writer is closed.
+    """
+
+    def __init__(self, flush_interval: float = 0.05, fsync_policy: str = "never",
+                 fsync_interval: float = 1.0, max_batch: int = 1000):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"fsync_policy must be one of {FSYNC_POLICIES}")
+        self.flush_interval = flush_interval
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.max_batch = max_batch
+        self.stats = {"entries": 0, "writes": 0, "fsyncs": 0}
+        self._pending = {}    # filepath -> deque of entries
+        self._queued = {}     # filepath -> entries appended so far
+        self._written = {}    # filepath -> entries written so far
+        self._last_fsync = {}
+        self._unsynced = set()  # "interval" policy: files written since their last fsync
+        self._tracked = {}    # filepath -> byte ranges written while the file is tracked
+        self._condition = threading.Condition()
+        self._closed = False
+        self._wake = False    # Write now instead of waiting for the flush interval
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def append(self, filepath: str, text: str) -> None:
+        """Queue `text` to be appended to `filepath`."""
+        key = os.path.abspath(filepath)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The log writer is closed.")
+            self._pending.setdefault(key, deque()).append(text)
+            self._queued[key] = self._queued.get(key, 0) + 1
+            if len(self._pending[key]) >= self.max_batch:
+                self._wake = True
+                self._condition.notify_all()
+
+    def flush(self, filepath: str | None = None) -> None:
+        """Block until everything queued so far (for one file, or all files) is written."""
+        keys = [os.path.abspath(filepath)] if filepath else None
+        with self._condition:
+            targets = {key: self._queued.get(key, 0) for key in (keys or list(self._queued))}
+            self._wake = True
+            self._condition.notify_all()
+            self._condition.wait_for(
+                lambda: all(self._written.get(key, 0) >= count for key, count in targets.items())
+                or not self._thread.is_alive()
+            )
+
+    def track(self, filepath: str) -> None:
+        """Start recording the byte ranges this writer appends to `filepath`."""
+        with self._condition:
+            self._tracked[os.path.abspath(filepath)] = []
+
+    def untrack(self, filepath: str) -> list[tuple[int, int]]:
+        """Stop recording for `filepath` and return the (start, end) byte ranges written since `track`."""
+        with self._condition:
+            return self._tracked.pop(os.path.abspath(filepath), [])
+
+    def close(self) -> None:
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._closed or self._wake, timeout=self.flush_interval)
+                batches = {key: entries for key, entries in self._pending.items() if entries}
+                self._pending = {}
+                self._wake = False
+                closed = self._closed
+            for key, entries in batches.items():
+                written = self._write(key, entries)
+                with self._condition:
+                    self._written[key] = self._written.get(key, 0) + len(entries)
+                    if written and key in self._tracked:
+                        self._tracked[key].append(written)
+                    self._condition.notify_all()
+            if self._unsynced:
+                self._sync_due(force=closed and not batches)
+            if closed and not batches:
+                return
+
+    def _write(self, filepath: str, entries: deque) -> tuple[int, int] | None:
+        """Append a batch; returns the byte range it was written to, or None if the write failed."""
+        try:
+            with open(filepath, 'a', encoding='utf-8') as file:
+                start = file.tell()
+                file.write(''.join(entries))
+                file.flush()
+                end = file.tell()
+                if self._should_fsync(filepath):
+                    os.fsync(file.fileno())
+                    self.stats["fsyncs"] += 1
+                    self._unsynced.discard(filepath)
+                elif self.fsync_policy == "interval":
+                    self._unsynced.add(filepath)
+            self.stats["writes"] += 1
+            self.stats["entries"] += len(entries)
+            return start, end
+        except OSError as e:
+            print(f"Could not write {len(entries)} log entries to {filepath}: {e}")
+            return None
+
+    def _sync_due(self, force: bool = False):
+        """Fsync files whose last write was not synced, once their interval has passed (or now, if forced)."""
+        now = time.monotonic()
+        for filepath in list(self._unsynced):
+            if not force and now - self._last_fsync.get(filepath, 0.0) < self.fsync_interval:
+                continue
+            try:
+                with open(filepath, 'a', encoding='utf-8') as file:
+                    os.fsync(file.fileno())
+                self.stats["fsyncs"] += 1
+            except OSError as e:
+                print(f"Could not fsync {filepath}: {e}")
+            self._last_fsync[filepath] = now
+            self._unsynced.discard(filepath)
+
+    def _should_fsync(self, filepath: str) -> bool:
+        if self.fsync_policy == "batch":
+            return True
+        if self.fsync_policy == "interval":
+            now = time.monotonic()
+            if now - self._last_fsync.get(filepath, 0.0) >= self.fsync_interval:
+                self._last_fsync[filepath] = now
+                return True
+        return False
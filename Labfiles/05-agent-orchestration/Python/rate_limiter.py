@@ -0,0 +1,112 @@
+import asyncio
+import random
+import re
+import time
+
+
+class TokenBucket:
+    """A bucket that refills continuously up to `capacity` units per minute."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.available = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if they are available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.available -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """A requests-per-minute and tokens-per-minute budget shared by every model call.
+
+    Each model call acquires one request and its estimated tokens before it is sent.
+    Callers are admitted as soon as both budgets allow. When the service still
+    reports a rate limit, the limiter honors the Retry-After delay (or falls back
+    to jittered exponential backoff) and pauses all callers until it has passed.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float,
+                 max_retries: int = 5, base_delay: float = 2.0, max_delay: float = 60.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.paused_until = 0.0
+        self.stats = {"admitted": 0, "rate_limited": 0, "waited_seconds": 0.0}
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int = 0):
+        """Wait until one request and `tokens` tokens fit in the budget, then spend them."""
+        start = time.monotonic()
+        async with self._lock:  # Admit callers in arrival order
+            while True:
+                delay = max(self.paused_until - time.monotonic(),
+                            self.requests.wait_time(1),
+                            self.tokens.wait_time(tokens))
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+        self.stats["admitted"] += 1
+        self.stats["waited_seconds"] += time.monotonic() - start
+
+    def pause(self, seconds: float):
+        """Hold back every caller for `seconds`, e.g. after the service returned 429."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def back_off(self, error: Exception, attempt: int) -> float:
+        """Pause every caller after a rate limit error, for as long as the service asked; returns the delay."""
+        self.stats["rate_limited"] += 1
+        delay = retry_after_seconds(error)
+        if delay is None:
+            # Full jitter keeps concurrent callers from retrying in lockstep
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        print(f"Rate limited, retrying in {delay:.1f}s...")
+        self.pause(delay)
+        return delay
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or "rate limit is exceeded" in str(error).lower()
+
+
+def retry_after_seconds(error: Exception):
+    """The delay requested by the service, from a Retry-After header or the error message."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or getattr(error, "headers", None) or {}
+    for name in ("retry-after-ms", "Retry-After-Ms"):
+        if name in headers:
+            try:
+                return float(headers[name]) / 1000
+            except ValueError:
+                pass
+    for name in ("retry-after", "Retry-After"):
+        if name in headers:
+            try:
+                return float(headers[name])
+            except ValueError:
+                pass
+    match = re.search(r"retry after (\d+(?:\.\d+)?) seconds?", str(error), re.IGNORECASE)
+    return float(match.group(1)) if match else None
+
+
+def estimate_tokens(text: str) -> int:
+    """A rough token count (about four characters per token) for budgeting."""
+    return len(text) // 4 + 1
@@ -1,7 +1,14 @@
 import os
+import sys
+from pathlib import Path
 from openai import OpenAI
 from dotenv import load_dotenv
 
+# 共享模块（模型响应缓存等）位于 Labfiles/common
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))
+from llm_cache import cached_client
+from tracing import span, traced_client
+
 # --- 1. 配置和初始化 (与之前相同) ---
 load_dotenv()
 api_key = os.getenv("OPENAI_API_KEY")
@@ -13,10 +20,11 @@ if not all([api_key, base_url, model_name]):
     exit()
 
 try:
-    client = OpenAI(
+    # 三个评估都是低温度调用，同一工单的重复评估直接使用持久化缓存中的响应
+    client = traced_client(cached_client(OpenAI(
         api_key=api_key,
         base_url=base_url,
-    )
+    )))
 except Exception as e:
     print(f"错误：无法初始化 OpenAI 客户端 - {e}")
     exit()
@@ -104,9 +112,10 @@ if __name__ == "__main__":
         print("开始处理代理线程...\n")
 
         # 依次调用各个代理函数
-        priority = get_priority_assessment(user_ticket)
-        team = get_team_assignment(user_ticket)
-        effort = get_effort_estimation(user_ticket)
+        with span("turn", agent="06-triage"):
+            priority = get_priority_assessment(user_ticket)
+            team = get_team_assignment(user_ticket)
+            effort = get_effort_estimation(user_ticket)
 
         # 打印用户输入
         print("MessageRole.USER:")
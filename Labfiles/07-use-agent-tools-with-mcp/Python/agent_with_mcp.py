@@ -1,23 +1,35 @@
 # agent_with_mcp.py (Corrected Version)
 
 import os
+import sys
 import json
 import requests
 import threading
 import uvicorn
 import time
-from fastapi import FastAPI
+from pathlib import Path
+from fastapi import FastAPI, Header, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 from openai import OpenAI
 from dotenv import load_dotenv
 
+# 共享模块（模型响应缓存等）位于 Labfiles/common
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))
+from llm_cache import cached_client
+from tracing import span, traced_client
+
+from tool_encoding import DEFAULT_ACCEPT, negotiate, encode_result, decode_to_tool_content
+from tool_limits import ToolLimiter, ToolRejected
+
 # --- 0. 全局配置和初始化 ---
 load_dotenv()
 
-client = OpenAI(
+# 对话调用每次都重新生成 (cache=False)，不使用响应缓存
+client = traced_client(cached_client(OpenAI(
     api_key=os.getenv("OPENAI_API_KEY"),
     base_url=os.getenv("OPENAI_BASE_URL"),
-)
+)))
 MODEL_NAME = os.getenv("OPENAI_MODEL_NAME", "gpt-4o-mini")
 MCP_SERVER_HOST = "127.0.0.1"
 MCP_SERVER_PORT = 8000
@@ -74,7 +86,15 @@ tools_registry = {
     },
 }
 
-# MCP 端点 (无变化)
+# --- 每个工具的并发/排队/超时限制 (可在注册表条目中用 "limits" 覆盖) ---
+DEFAULT_TOOL_LIMITS = {"max_concurrency": 4, "max_queue": 16, "queue_timeout": 2.0, "timeout": 10.0}
+
+tool_limiters = {
+    name: ToolLimiter(name, **{**DEFAULT_TOOL_LIMITS, **details.get("limits", {})})
+    for name, details in tools_registry.items()
+}
+
+# MCP 端点
 @app.get("/", summary="Tool Discovery Endpoint")
 def discover_tools_endpoint():
     return [details["schema"] for details in tools_registry.values()]
@@ -82,19 +102,34 @@ def discover_tools_endpoint():
 class ToolExecutionRequest(BaseModel):
     args: dict
 
+# 工具执行端点：按 Accept 头协商结果编码 (裸 JSON / MessagePack / 兼容的 JSON 外壳)
+# 工具在各自的线程池中执行，饱和时快速返回 429/503，超时返回 504
 @app.post("/tools/{tool_name}", summary="Tool Execution Endpoint")
-def execute_tool_endpoint(tool_name: str, request: ToolExecutionRequest):
-    if tool_name in tools_registry:
-        result = tools_registry[tool_name]["function"](**request.args)
-        return {"result": result}
-    return {"error": "Tool not found"}, 404
+async def execute_tool_endpoint(tool_name: str, request: ToolExecutionRequest, accept: str | None = Header(default=None)):
+    if tool_name not in tools_registry:
+        return JSONResponse(status_code=404, content={"error": "Tool not found"})
+    try:
+        result = await tool_limiters[tool_name].run(tools_registry[tool_name]["function"], **request.args)
+    except ToolRejected as e:
+        headers = {"Retry-After": "1"} if e.status_code in (429, 503) else None
+        return JSONResponse(status_code=e.status_code, content={"error": e.message}, headers=headers)
+    media_type = negotiate(accept)
+    return Response(content=encode_result(result, media_type), media_type=media_type)
+
+# 指标端点：每个工具的在途数量、拒绝次数、排队深度直方图和延迟直方图 (Prometheus 文本格式)
+@app.get("/metrics", summary="Tool Metrics Endpoint", response_class=PlainTextResponse)
+def metrics_endpoint():
+    lines = []
+    for limiter in tool_limiters.values():
+        lines.extend(limiter.metrics())
+    return "\n".join(lines) + "\n"
 
 def run_mcp_server():
     uvicorn.run(app, host=MCP_SERVER_HOST, port=MCP_SERVER_PORT, log_level="warning")
 
 
 # ==============================================================================
-# --- 2. 客户端逻辑 (无变化) ---
+# --- 2. 客户端逻辑 ---
 # ==============================================================================
 
 SYSTEM_PROMPT = """
@@ -123,12 +158,17 @@ def discover_tools_from_mcp(server_url: str):
         print(f"Error: Could not connect to MCP server. {e}")
         return None
 
-def execute_mcp_tool(server_url: str, tool_name: str, tool_args: dict):
+def execute_mcp_tool(server_url: str, tool_name: str, tool_args: dict) -> str:
+    """执行远程工具，返回可直接作为 tool 消息内容的 JSON 字符串。"""
     print(f"--> Requesting MCP server to execute tool: {tool_name}")
     url = f"{server_url}/tools/{tool_name}"
-    response = requests.post(url, json={"args": tool_args})
-    response.raise_for_status()
-    return response.json().get("result")
+    # 设置 AGENT_TRACE_FILE 时记录一个 span，包含 HTTP 往返和结果解码
+    with span("tool", tool=tool_name, args_bytes=len(json.dumps(tool_args))) as current:
+        response = requests.post(url, json={"args": tool_args}, headers={"Accept": DEFAULT_ACCEPT})
+        response.raise_for_status()
+        content = decode_to_tool_content(response.content, response.headers.get("Content-Type"))
+        current.set(status=response.status_code, result_bytes=len(content))
+        return content
 
 def run_client_conversation():
     openai_tools = discover_tools_from_mcp(MCP_SERVER_URL)
@@ -147,40 +187,41 @@ def run_client_conversation():
             print("Exiting...")
             break
         
-        messages.append({"role": "user", "content": user_input})
-
-        response = client.chat.completions.create(
-            model=MODEL_NAME, messages=messages, tools=openai_tools, tool_choice="auto"
-        )
-        response_message = response.choices[0].message
-
-        if response_message.tool_calls:
-            messages.append(response_message)
-            tool_outputs = []
-            for tool_call in response_message.tool_calls:
-                function_name = tool_call.function.name
-                function_args = json.loads(tool_call.function.arguments)
-                function_response = execute_mcp_tool(MCP_SERVER_URL, function_name, function_args)
-                tool_outputs.append({
-                    "tool_call_id": tool_call.id,
-                    "role": "tool",
-                    "name": function_name,
-                    "content": json.dumps(function_response),
-                })
+        with span("turn", agent="07-inventory"):
+            messages.append({"role": "user", "content": user_input})
+
+            response = client.chat.completions.create(
+                model=MODEL_NAME, messages=messages, tools=openai_tools, tool_choice="auto", cache=False
+            )
+            response_message = response.choices[0].message
+
+            if response_message.tool_calls:
+                messages.append(response_message)
+                tool_outputs = []
+                for tool_call in response_message.tool_calls:
+                    function_name = tool_call.function.name
+                    function_args = json.loads(tool_call.function.arguments)
+                    function_response = execute_mcp_tool(MCP_SERVER_URL, function_name, function_args)
+                    tool_outputs.append({
+                        "tool_call_id": tool_call.id,
+                        "role": "tool",
+                        "name": function_name,
+                        "content": function_response,
+                    })
             
-            messages.extend(tool_outputs)
+                messages.extend(tool_outputs)
             
-            second_response = client.chat.completions.create(model=MODEL_NAME, messages=messages)
-            final_answer = second_response.choices[0].message.content
-        else:
-            final_answer = response_message.content
+                second_response = client.chat.completions.create(model=MODEL_NAME, messages=messages, cache=False)
+                final_answer = second_response.choices[0].message.content
+            else:
+                final_answer = response_message.content
 
-        print(f"Agent > {final_answer}")
-        messages.append({"role": "assistant", "content": final_answer})
+            print(f"Agent > {final_answer}")
+            messages.append({"role": "assistant", "content": final_answer})
 
 
 # ==============================================================================
-# --- 3. 主程序入口 (无变化) ---
+# --- 3. 主程序入口 ---
 # ==============================================================================
 
 if __name__ == "__main__":
@@ -0,0 +1,70 @@
+# bench_mcp_pool.py
+# Compares spawning one stdio MCP server per chat with sharing a warm MCPSessionPool.
+# Every simulated chat makes several tool calls against a small inventory server.
+# Usage: python bench_mcp_pool.py [chats] [calls per chat] [pool size]
+
+import asyncio
+import sys
+import time
+from contextlib import AsyncExitStack
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from mcp_pool import MCPSessionPool
+
+# A server with one cheap tool, so the timings are dominated by spawn and transport cost
+SERVER_SOURCE = """
+from mcp.server.fastmcp import FastMCP
+
+mcp = FastMCP("Inventory")
+
+@mcp.tool()
+def get_inventory_levels() -> dict:
+    return {"Moisturizer": 6, "Shampoo": 8, "Body Spray": 28}
+
+mcp.run()
+"""
+
+
+async def per_chat_servers(server_params, chats, calls):
+    """The original client: every chat starts its own server and session."""
+    for _ in range(chats):
+        async with AsyncExitStack() as stack:
+            read, write = await stack.enter_async_context(stdio_client(server_params))
+            session = await stack.enter_async_context(ClientSession(read, write))
+            await session.initialize()
+            for _ in range(calls):
+                await session.call_tool("get_inventory_levels", {})
+
+
+async def pooled_servers(server_params, chats, calls, size):
+    """Every chat checks out the shared pool and calls the warm servers."""
+    async with MCPSessionPool(server_params, size=size) as pool:
+        for _ in range(chats):
+            session = pool.checkout()
+            for _ in range(calls):
+                await session.call_tool("get_inventory_levels", {})
+        return pool.report()
+
+
+async def main():
+    chats = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    size = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    server_params = StdioServerParameters(command=sys.executable, args=["-c", SERVER_SOURCE])
+
+    print(f"{chats} chats x {calls} tool calls\n")
+    start = time.perf_counter()
+    await per_chat_servers(server_params, chats, calls)
+    print(f"{'one server per chat':<24}{time.perf_counter() - start:>10.2f} s")
+
+    start = time.perf_counter()
+    report = await pooled_servers(server_params, chats, calls, size)
+    print(f"{f'pool of {size} servers':<24}{time.perf_counter() - start:>10.2f} s\n")
+    for key, value in report.items():
+        print(f"{key:<24}{value:>10}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,57 @@
+# bench_tool_encoding.py
+# 比较工具结果在不同编码下的序列化 CPU 时间和传输字节数。
+# 用法: python bench_tool_encoding.py [商品数量] [重复次数]
+
+import json
+import sys
+import time
+
+from tool_encoding import JSON, MSGPACK, RAW_JSON, ENCODERS, encode_result, decode_to_tool_content
+
+
+def make_inventory(n_products: int) -> dict:
+    """生成一个大型库存结果，结构与 get_inventory_levels 相同。"""
+    return {f"Product {i:07d}": (i * 7919) % 500 for i in range(n_products)}
+
+
+def legacy_round_trip(result) -> tuple[int, str]:
+    """原始路径：服务端 json 编码外壳，客户端 response.json() 解码后再 json.dumps。"""
+    body = json.dumps({"result": result}).encode("utf-8")
+    content = json.dumps(json.loads(body)["result"])
+    return len(body), content
+
+
+def negotiated_round_trip(result, media_type: str) -> tuple[int, str]:
+    """协商路径：服务端按媒体类型编码，客户端只解码一次 (裸 JSON 不解码)。"""
+    body = encode_result(result, media_type)
+    content = decode_to_tool_content(body, media_type)
+    return len(body), content
+
+
+def measure(label: str, func, repeat: int):
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        start = time.process_time()
+        size, _ = func()
+        best = min(best, time.process_time() - start)
+    print(f"{label:<40} {best * 1000:>10.2f} ms {size:>14,} bytes")
+
+
+def main():
+    n_products = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    result = make_inventory(n_products)
+
+    print(f"Inventory payload: {n_products:,} products, best of {repeat} runs (CPU time)\n")
+    print(f"{'path':<40} {'cpu':>13} {'wire':>20}")
+    measure("legacy json (encode + decode + encode)", lambda: legacy_round_trip(result), repeat)
+    for media_type in (JSON, RAW_JSON, MSGPACK):
+        if media_type in ENCODERS:
+            measure(media_type, lambda m=media_type: negotiated_round_trip(result, m), repeat)
+        else:
+            print(f"{media_type:<40} (not installed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ import asyncio
 import json
 from dotenv import load_dotenv
 from contextlib import AsyncExitStack
+from run_monitor import RunMonitor
+from mcp_pool import MCPSessionPool
 # Add references
 
 
@@ -21,6 +23,12 @@ async def connect_to_server(exit_stack: AsyncExitStack):
         env=None
     )
 
+    # Share a pool of warm servers across chats when MCP_POOL_SIZE is set
+    pool_size = int(os.getenv("MCP_POOL_SIZE", "0"))
+    if pool_size > 0:
+        pool = await exit_stack.enter_async_context(MCPSessionPool(server_params, size=pool_size))
+        return pool.checkout()
+
     # Start the MCP server
     
     # Create an MCP client session
@@ -58,26 +66,17 @@ async def chat_loop(session):
         # Invoke the prompt
 
 
-        # Monitor the run status
-        while run.status in ["queued", "in_progress", "requires_action"]:
-            time.sleep(1)
-            run = agents_client.runs.get(thread_id=thread.id, run_id=run.id)
-            tool_outputs = []
+        # Monitor the run status, running any tool calls the agent requests
+        async def handle_tool_call(tool_call):
+
+            # Retrieve the matching function tool
 
-            if run.status == "requires_action":
 
-                tool_calls = run.required_action.submit_tool_outputs.tool_calls
+            # Return the output text
 
-                for tool_call in tool_calls:
 
-                    # Retrieve the matching function tool
-                    
+        run = await RunMonitor(agents_client.runs, handle_tool_call).wait(thread.id, run)
 
-                    # Append the output text
-                    
-                
-                # Submit the tool call output
-                
         # Check for failure
         if run.status == "failed":
             print(f"Run failed: {run.last_error}")
@@ -97,6 +96,8 @@ async def main():
     try:
         session = await connect_to_server(exit_stack)
         await chat_loop(session)
+        if isinstance(session, MCPSessionPool):
+            print("MCP session pool:", session.report())
     finally:
         await exit_stack.aclose()
 
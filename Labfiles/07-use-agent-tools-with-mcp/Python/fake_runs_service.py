@@ -0,0 +1,118 @@
+# fake_runs_service.py
+# A local stand-in for `agents_client.runs` used to exercise RunMonitor without Azure.
+# Run it directly to compare the monitor with the original fixed 1-second polling loop:
+#   python fake_runs_service.py
+import asyncio
+import itertools
+import time
+from types import SimpleNamespace
+
+from run_monitor import RunMonitor
+
+
+class FakeRunsService:
+    """Simulates a run that is queued, works, asks for tool calls, then completes.
+
+    `schedule` is a list of (status, seconds) steps; a "requires_action" step waits until
+    tool outputs are submitted instead of using a fixed duration.
+    """
+
+    def __init__(self, schedule, tool_names=("get_inventory_levels",), streaming=False):
+        self.schedule = schedule
+        self.tool_names = tool_names
+        self.requests = 0
+        self.submitted = []
+        self._ids = itertools.count(1)
+        self._runs = {}
+        if streaming:
+            self.stream_events = self._stream_events
+
+    def create(self, thread_id, agent_id):
+        self.requests += 1
+        run_id = f"run_{next(self._ids)}"
+        self._runs[run_id] = {"step": 0, "step_started": time.perf_counter()}
+        return self._snapshot(run_id)
+
+    def get(self, thread_id, run_id):
+        self.requests += 1
+        return self._snapshot(run_id)
+
+    def submit_tool_outputs(self, thread_id, run_id, tool_outputs):
+        self.requests += 1
+        self.submitted.extend(tool_outputs)
+        self._advance(run_id)
+
+    async def _stream_events(self, thread_id, run_id):
+        state = self._runs[run_id]
+        last_status = None
+        while True:
+            run = self._snapshot(run_id)
+            if run.status != last_status:
+                last_status = run.status
+                yield run
+                if run.status in ("requires_action", "completed", "failed"):
+                    return
+            status, seconds = self.schedule[state["step"]]
+            remaining = state["step_started"] + seconds - time.perf_counter()
+            await asyncio.sleep(max(remaining, 0))
+
+    def _advance(self, run_id):
+        state = self._runs[run_id]
+        state["step"] += 1
+        state["step_started"] = time.perf_counter()
+
+    def _snapshot(self, run_id):
+        state = self._runs[run_id]
+        # Move through any timed steps that have already elapsed
+        while True:
+            status, seconds = self.schedule[state["step"]]
+            if status in ("requires_action", "completed", "failed"):
+                break
+            if time.perf_counter() - state["step_started"] < seconds:
+                break
+            self._advance(run_id)
+
+        required_action = None
+        if status == "requires_action":
+            tool_calls = [
+                SimpleNamespace(id=f"call_{state['step']}_{i}", function=SimpleNamespace(name=name, arguments="{}"))
+                for i, name in enumerate(self.tool_names)
+            ]
+            required_action = SimpleNamespace(submit_tool_outputs=SimpleNamespace(tool_calls=tool_calls))
+        return SimpleNamespace(id=run_id, status=status, required_action=required_action, last_error=None)
+
+
+SCHEDULE = [("queued", 0.2), ("in_progress", 0.6), ("requires_action", None), ("in_progress", 1.5), ("completed", None)]
+
+
+async def handle_tool_call(tool_call):
+    return '{"Moisturizer": 6}'
+
+
+async def fixed_polling(runs, thread_id, run):
+    """The loop originally used in client.py: sleep one second between every status check."""
+    while run.status in ["queued", "in_progress", "requires_action"]:
+        time.sleep(1)
+        run = runs.get(thread_id=thread_id, run_id=run.id)
+        if run.status == "requires_action":
+            tool_outputs = [{"tool_call_id": c.id, "output": await handle_tool_call(c)}
+                            for c in run.required_action.submit_tool_outputs.tool_calls]
+            runs.submit_tool_outputs(thread_id=thread_id, run_id=run.id, tool_outputs=tool_outputs)
+    return run
+
+
+async def main():
+    print(f"{'mode':<18}{'seconds':>10}{'requests':>10}{'status':>12}")
+    for mode in ("fixed 1s polling", "adaptive polling", "streamed events"):
+        runs = FakeRunsService(SCHEDULE, streaming=(mode == "streamed events"))
+        start = time.perf_counter()
+        run = runs.create(thread_id="thread_1", agent_id="agent_1")
+        if mode == "fixed 1s polling":
+            run = await fixed_polling(runs, "thread_1", run)
+        else:
+            run = await RunMonitor(runs, handle_tool_call).wait("thread_1", run)
+        print(f"{mode:<18}{time.perf_counter() - start:>10.2f}{runs.requests:>10}{run.status:>12}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,216 @@
+# mcp_pool.py
+import asyncio
+import statistics
+import time
+from contextlib import AsyncExitStack
+
+import anyio
+from mcp import ClientSession
+from mcp.client.stdio import stdio_client
+
+
+class _ServerSlot:
+    """One warm `server.py` process and the client session connected to it.
+
+    The stdio transport and session are entered and exited inside a single task,
+    which is what the MCP client's task groups require.
+    """
+
+    def __init__(self, index, server_params):
+        self.index = index
+        self.server_params = server_params
+        self.session = None
+        self.in_flight = 0
+        self.spawn_seconds = 0.0
+        self.ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._task = None
+        self.error = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name=f"mcp-server-{self.index}")
+
+    async def _run(self):
+        try:
+            async with AsyncExitStack() as stack:
+                start = time.perf_counter()
+                read, write = await stack.enter_async_context(stdio_client(self.server_params))
+                session = await stack.enter_async_context(ClientSession(read, write))
+                await session.initialize()
+                self.spawn_seconds = time.perf_counter() - start
+                self.session = session
+                self.ready.set()
+                await self._stop.wait()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.session = None
+            self.ready.set()
+
+    async def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+
+
+class MCPSessionPool:
+    """A pool of warm stdio MCP servers shared by every chat in the process.
+
+    Tool calls are spread over the servers by picking the session with the fewest
+    requests in flight; each session multiplexes its concurrent requests over one
+    stdio connection. A background task pings every server and restarts any that
+    stop answering. The pool exposes `list_tools` and `call_tool`, so it can be used
+    wherever a single `ClientSession` was used before.
+    """
+
+    def __init__(self, server_params, size=2, health_interval=15.0, ping_timeout=5.0):
+        self.server_params = server_params
+        self.size = size
+        self.health_interval = health_interval
+        self.ping_timeout = ping_timeout
+        self._slots = []
+        self._health_task = None
+        self.spawns = 0
+        self.restarts = 0
+        self.sessions_served = 0
+        self._spawn_seconds = []
+        self._call_seconds = []
+        self._fill_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        self._slots = [await self._spawn(i) for i in range(self.size)]
+        self._health_task = asyncio.create_task(self._health_loop(), name="mcp-pool-health")
+
+    async def close(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        await asyncio.gather(*(slot.stop() for slot in self._slots))
+
+    def checkout(self):
+        """Count a chat that reuses the pool's warm servers instead of spawning its own."""
+        self.sessions_served += 1
+        return self
+
+    async def list_tools(self):
+        return await self._healthy_slot().session.list_tools()
+
+    async def call_tool(self, name, arguments=None):
+        slot = self._healthy_slot()
+        start = time.perf_counter()
+        try:
+            try:
+                return await self._call(slot, name, arguments)
+            except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+                # The transport was closed before the request was written, so the server never
+                # saw it: replace the server and retry once
+                await self._restart(slot)
+                return await self._call(self._healthy_slot(), name, arguments)
+            except Exception:
+                # The tool may already have run, so don't replay it; just replace a dead server
+                if not await self._ping(slot):
+                    await self._restart(slot)
+                raise
+        finally:
+            self._call_seconds.append(time.perf_counter() - start)
+
+    def report(self):
+        """Spawn cost, per-call latency, and the spawn time saved once sessions reuse the servers."""
+        mean_spawn = statistics.fmean(self._spawn_seconds) if self._spawn_seconds else 0.0
+        calls = sorted(self._call_seconds)
+        report = {
+            "servers": self.size,
+            "spawns": self.spawns,
+            "restarts": self.restarts,
+            "mean_spawn_seconds": round(mean_spawn, 3),
+            "sessions_served": self.sessions_served,
+            "tool_calls": len(calls),
+        }
+        if self.sessions_served > self.spawns:
+            # Without the pool every chat spawns its own server
+            report["spawn_seconds_saved"] = round((self.sessions_served - self.spawns) * mean_spawn, 3)
+        if calls:
+            report["call_p50_ms"] = round(calls[len(calls) // 2] * 1000, 1)
+            report["call_p95_ms"] = round(calls[min(int(len(calls) * 0.95), len(calls) - 1)] * 1000, 1)
+        return report
+
+    async def _call(self, slot, name, arguments):
+        slot.in_flight += 1
+        try:
+            return await slot.session.call_tool(name, arguments)
+        finally:
+            slot.in_flight -= 1
+
+    async def _spawn(self, index):
+        slot = _ServerSlot(index, self.server_params)
+        slot.start()
+        try:
+            await slot.ready.wait()
+        except asyncio.CancelledError:
+            # Cancelled by close() while the health loop was refilling the pool
+            await slot.stop()
+            raise
+        if slot.session is None:
+            raise RuntimeError(f"MCP server {index} failed to start: {slot.error}")
+        self.spawns += 1
+        self._spawn_seconds.append(slot.spawn_seconds)
+        return slot
+
+    def _healthy_slot(self):
+        slots = [slot for slot in self._slots if slot.session is not None]
+        if not slots:
+            raise RuntimeError("No MCP servers are available.")
+        return min(slots, key=lambda slot: slot.in_flight)
+
+    async def _ping(self, slot):
+        if slot.session is None:
+            return False
+        try:
+            await asyncio.wait_for(slot.session.send_ping(), self.ping_timeout)
+            return True
+        except Exception:
+            return False
+
+    async def _restart(self, slot):
+        if slot in self._slots:  # Not already replaced by a concurrent caller
+            self._slots.remove(slot)
+            self.restarts += 1
+            await slot.stop()
+        await self._fill()
+
+    async def _fill(self):
+        async with self._fill_lock:
+            used = {slot.index for slot in self._slots}
+            for index in range(self.size):
+                if index not in used:
+                    self._slots.append(await self._spawn(index))
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            for slot in list(self._slots):
+                # A concurrent call_tool may have replaced the slot while we waited for the ping
+                if not await self._ping(slot) and slot in self._slots:
+                    print(f"MCP server {slot.index} is not responding, restarting it.")
+                    self._slots.remove(slot)
+                    self.restarts += 1
+                    await slot.stop()
+            # Also retries servers whose earlier restart failed
+            try:
+                await self._fill()
+            except RuntimeError as e:
+                print(e)
@@ -0,0 +1,86 @@
+# run_monitor.py
+import asyncio
+import time
+
+# Run states in which the agent service is still working on the run
+ACTIVE_STATES = ("queued", "in_progress", "requires_action")
+
+
+class RunMonitor:
+    """Waits for an agent run to finish, submitting tool outputs along the way.
+
+    If the runs service exposes a `stream_events(thread_id, run_id)` method that yields
+    run snapshots as the run changes state, the monitor consumes those events. Otherwise,
+    or when a stream closes before the run changes state, it polls `runs.get(...)`
+    adaptively: quickly at first, then backing off exponentially while the run stays in
+    the same state. Tool outputs are submitted once per tool call id.
+    """
+
+    def __init__(self, runs, handle_tool_call, initial_interval=0.05, max_interval=1.0, backoff=1.6):
+        self.runs = runs
+        self.handle_tool_call = handle_tool_call
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.stats = {"polls": 0, "events": 0, "tool_calls": 0, "seconds": 0.0}
+
+    async def wait(self, thread_id, run):
+        """Return the run once it has left the queued, in-progress and requires-action states."""
+        start = time.perf_counter()
+        try:
+            if hasattr(self.runs, "stream_events"):
+                return await self._consume_events(thread_id, run)
+            return await self._poll(thread_id, run)
+        finally:
+            self.stats["seconds"] += time.perf_counter() - start
+
+    async def _consume_events(self, thread_id, run):
+        submitted = set()
+        while run.status in ACTIVE_STATES:
+            if run.status == "requires_action":
+                await self._submit_tool_outputs(thread_id, run, submitted)
+            ended = False
+            async for snapshot in self.runs.stream_events(thread_id=thread_id, run_id=run.id):
+                self.stats["events"] += 1
+                run = snapshot
+                if run.status not in ("queued", "in_progress"):
+                    ended = True
+                    break
+            if not ended:
+                # The stream closed before the run changed state: the last snapshot may be
+                # stale, so refresh it and fall back to polling with backoff
+                run = self.runs.get(thread_id=thread_id, run_id=run.id)
+                return await self._poll(thread_id, run, submitted)
+        return run
+
+    async def _poll(self, thread_id, run, submitted=None):
+        submitted = set() if submitted is None else submitted
+        interval = self.initial_interval
+        last_status = None
+        while run.status in ACTIVE_STATES:
+            if run.status == "requires_action" and await self._submit_tool_outputs(thread_id, run, submitted):
+                interval = self.initial_interval
+            elif run.status == last_status:
+                interval = min(interval * self.backoff, self.max_interval)
+            else:
+                interval = self.initial_interval
+            last_status = run.status
+
+            await asyncio.sleep(interval)
+            self.stats["polls"] += 1
+            run = self.runs.get(thread_id=thread_id, run_id=run.id)
+        return run
+
+    async def _submit_tool_outputs(self, thread_id, run, submitted):
+        """Submit outputs for the tool calls not already answered; return False if there were none."""
+        tool_calls = [c for c in run.required_action.submit_tool_outputs.tool_calls if c.id not in submitted]
+        if not tool_calls:
+            return False
+        tool_outputs = []
+        for tool_call in tool_calls:
+            output = await self.handle_tool_call(tool_call)
+            tool_outputs.append({"tool_call_id": tool_call.id, "output": output})
+            self.stats["tool_calls"] += 1
+        self.runs.submit_tool_outputs(thread_id=thread_id, run_id=run.id, tool_outputs=tool_outputs)
+        submitted.update(c.id for c in tool_calls)
+        return True
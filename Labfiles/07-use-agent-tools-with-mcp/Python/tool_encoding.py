@@ -0,0 +1,106 @@
+# tool_encoding.py
+# 工具结果的编码协商：服务端按客户端的 Accept 头选择编码，客户端只解码一次。
+
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson 是可选依赖，缺失时退回标准库 json
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack 是可选依赖，缺失时不提供该编码
+    msgpack = None
+
+
+# 裸结果 JSON：不带 {"result": ...} 外壳，客户端可以把响应体原样作为 tool 消息内容转发
+RAW_JSON = "application/x-tool-result+json"
+MSGPACK = "application/msgpack"
+JSON = "application/json"
+
+# 客户端默认发送的 Accept 头：优先裸 JSON（零次解码），其次 MessagePack（体积最小）
+DEFAULT_ACCEPT = f"{RAW_JSON}, {MSGPACK};q=0.9, {JSON};q=0.5"
+
+
+def dumps_json(obj) -> bytes:
+    """把对象编码为紧凑的 UTF-8 JSON 字节串，优先使用 orjson。"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads_json(data: bytes):
+    """解码 JSON 字节串，优先使用 orjson。"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _encode_raw_json(result) -> bytes:
+    return dumps_json(result)
+
+
+def _encode_json(result) -> bytes:
+    return dumps_json({"result": result})
+
+
+def _encode_msgpack(result) -> bytes:
+    return msgpack.packb({"result": result}, use_bin_type=True)
+
+
+# 服务端支持的编码 (媒体类型 -> 编码函数)
+ENCODERS = {RAW_JSON: _encode_raw_json, JSON: _encode_json}
+if msgpack is not None:
+    ENCODERS[MSGPACK] = _encode_msgpack
+
+
+def negotiate(accept_header: str | None) -> str:
+    """
+    根据 Accept 头选择服务端支持且 q 值最高的媒体类型。
+
+    Args:
+        accept_header (str | None): 请求中的 Accept 头。
+
+    Returns:
+        str: 选中的媒体类型；无法匹配时返回 application/json，保持旧客户端兼容。
+    """
+    if not accept_header:
+        return JSON
+
+    candidates = []
+    for position, part in enumerate(accept_header.split(",")):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > 0 and media_type in ENCODERS:
+            # q 值相同时保持客户端给出的顺序
+            candidates.append((-quality, position, media_type))
+
+    return min(candidates)[2] if candidates else JSON
+
+
+def encode_result(result, media_type: str) -> bytes:
+    """按选定的媒体类型编码工具结果。"""
+    return ENCODERS[media_type](result)
+
+
+def decode_to_tool_content(body: bytes, content_type: str) -> str:
+    """
+    把服务端响应体转换为 OpenAI tool 消息所需的 JSON 字符串。
+
+    裸 JSON 直接转发，不做任何解码；其他编码只解码一次再编码为 JSON。
+    """
+    media_type = (content_type or JSON).split(";")[0].strip()
+    if media_type == RAW_JSON:
+        return body.decode("utf-8")
+    if media_type == MSGPACK and msgpack is not None:
+        result = msgpack.unpackb(body, raw=False)["result"]
+    else:
+        result = loads_json(body)["result"]
+    return dumps_json(result).decode("utf-8")
@@ -0,0 +1,126 @@
+# tool_limits.py
+# 每个工具独立的并发上限、排队深度和执行截止时间，以及可导出的运行指标。
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 延迟直方图的桶上界 (秒)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 排队深度直方图的桶上界 (调用进入队列时前面已排队的调用数)
+QUEUE_DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64)
+
+
+class ToolRejected(Exception):
+    """工具调用被拒绝或超时，status_code 即返回给客户端的 HTTP 状态码。"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+class Histogram:
+    """累积型直方图，输出格式与 Prometheus histogram 一致。"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+    def metrics(self, name: str, label: str) -> list[str]:
+        lines = [f'{name}_bucket{{{label},le="{upper}"}} {count}' for upper, count in zip(self.buckets, self.counts)]
+        lines.append(f'{name}_bucket{{{label},le="+Inf"}} {self.total}')
+        lines.append(f"{name}_sum{{{label}}} {self.sum:.6f}")
+        lines.append(f"{name}_count{{{label}}} {self.total}")
+        return lines
+
+
+class ToolLimiter:
+    """
+    为单个工具提供隔离的执行环境。
+
+    每个工具拥有自己的线程池 (大小即并发上限)，慢工具只会占满自己的线程池，
+    不会拖垮服务器的公共线程池。超过排队上限时立即返回 429；排队超过
+    queue_timeout 仍未开始执行返回 503；执行超过 timeout 返回 504。
+    """
+
+    def __init__(self, name: str, max_concurrency: int = 4, max_queue: int = 16,
+                 queue_timeout: float = 2.0, timeout: float = 10.0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"tool-{name}")
+        self.latency = Histogram()
+        self.queue_depth = Histogram(QUEUE_DEPTH_BUCKETS)
+        self.rejected = {429: 0, 503: 0, 504: 0}
+        self.queued = 0
+        self.running = 0
+        self._lock = threading.Lock()
+
+    def _call(self, func, kwargs):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        try:
+            return func(**kwargs)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def _reject(self, status_code: int, message: str):
+        with self._lock:
+            self.rejected[status_code] += 1
+        raise ToolRejected(status_code, message)
+
+    async def run(self, func, **kwargs):
+        """在该工具的线程池中执行 func，遵守并发、排队和截止时间限制。"""
+        with self._lock:
+            saturated = self.running >= self.max_concurrency and self.queued >= self.max_queue
+            if not saturated:
+                # 在入队时采样排队深度，抓取时的瞬时值会漏掉两次抓取之间的排队高峰
+                self.queue_depth.observe(self.queued)
+                self.queued += 1
+        if saturated:
+            self._reject(429, f"Tool '{self.name}' is saturated, retry later.")
+
+        start = time.perf_counter()
+        future = self.executor.submit(self._call, func, kwargs)
+        waiter = asyncio.wrap_future(future)
+        try:
+            if self.queue_timeout < self.timeout:
+                await asyncio.wait({waiter}, timeout=self.queue_timeout)
+                # cancel() 只会对尚未开始执行的任务成功
+                if future.cancel():
+                    with self._lock:
+                        self.queued -= 1
+                    self._reject(503, f"Tool '{self.name}' did not start within {self.queue_timeout}s.")
+            remaining = self.timeout - (time.perf_counter() - start)
+            try:
+                # shield: 超时后线程仍在运行，结果被丢弃，但线程池占用会如实反映在指标中
+                return await asyncio.wait_for(asyncio.shield(waiter), max(remaining, 0))
+            except asyncio.TimeoutError:
+                self._reject(504, f"Tool '{self.name}' exceeded its {self.timeout}s deadline.")
+        finally:
+            self.latency.observe(time.perf_counter() - start)
+
+    def metrics(self) -> list[str]:
+        """以 Prometheus 文本格式输出该工具的指标行。"""
+        label = f'tool="{self.name}"'
+        lines = [f"mcp_tool_in_flight{{{label}}} {self.running}"]
+        for status_code, count in self.rejected.items():
+            lines.append(f'mcp_tool_rejected_total{{{label},code="{status_code}"}} {count}')
+        lines.extend(self.queue_depth.metrics("mcp_tool_queue_depth", label))
+        lines.extend(self.latency.metrics("mcp_tool_latency_seconds", label))
+        return lines
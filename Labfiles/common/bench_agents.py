@@ -0,0 +1,226 @@
+# bench_agents.py - 用本地假模型服务器端到端驱动各实验的智能体，测量每轮延迟、模型往返次数和我们自己代码的开销
+#
+# 每个智能体作为子进程运行，按脚本在提示符出现时输入消息，记录从输入到下一个提示符（或进程退出）的时间。
+# 每轮前后读取假服务器的 /stats：请求数的差就是这一轮的模型往返次数，model_seconds 的差是模拟的模型耗时，
+# 这一轮的延迟减去模型耗时，就是我们的代码（工具、存储、索引、HTTP 客户端等）增加的开销。
+#
+# 用法: python bench_agents.py [每个智能体重复脚本的遍数] [模型延迟毫秒] [智能体...]
+#   例如 python bench_agents.py 3 200 03 04 06
+# 假服务器的延迟分布、token 速率和脚本可以用 FAKE_LATENCY_DIST / FAKE_TOKENS_PER_SECOND / FAKE_SCRIPT 设置，
+# 它们会传给假服务器。各智能体需要的依赖（openai、IPython、fastapi 等）必须已安装。
+
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from dataclasses import dataclass, field
+from pathlib import Path
+
+LABFILES = Path(__file__).resolve().parents[1]
+PORT = 8012
+SERVER_URL = f"http://127.0.0.1:{PORT}"
+# 等待一个提示符的最长时间（秒）
+TURN_TIMEOUT = 120
+
+
+@dataclass
+class Scenario:
+    script: Path
+    prompt: str                 # 提示符的正则表达式，出现即表示上一轮结束
+    inputs: list[str]           # 一遍脚本依次输入的消息，重复 rounds 遍
+    quit: str | None = None     # 结束会话的输入；None 表示输入一次后进程自行退出
+    single_turn: bool = False
+
+
+SCENARIOS = {
+    "02": Scenario(LABFILES / "02-build-ai-agent" / "Python" / "agent.py", r"你: ",
+                   ["What is 2 + 2?", "Summarize the numbers 1 to 10."], quit="exit"),
+    "03": Scenario(LABFILES / "03-ai-agent-functions" / "Python" / "agent.py", r"Enter a prompt \(or type 'quit' to exit\): ",
+                   ["Hi, can you help me?", "My laptop won't start.", "My email is alex@contoso.com"], quit="quit"),
+    "04": Scenario(LABFILES / "04-semantic-kernel" / "python" / "semantic-kernel.py",
+                   r"What would you like me to do with it\?\s*$", ["Submit an expense claim."], single_turn=True),
+    "06": Scenario(LABFILES / "06-build-multi-agent-solution" / "Python" / "agent_triage.py", r"请输入您遇到的问题: ",
+                   ["The checkout page returns a 500 error for every user.", "Users cannot reset their password."],
+                   quit="exit"),
+    "07": Scenario(LABFILES / "07-use-agent-tools-with-mcp" / "Python" / "agent_with_mcp.py", r"User > ",
+                   ["Which products need restocking?", "What are the best sellers?"], quit="quit"),
+}
+
+
+@dataclass
+class Turn:
+    seconds: float
+    round_trips: int
+    model_seconds: float
+
+    @property
+    def overhead(self) -> float:
+        return self.seconds - self.model_seconds
+
+
+@dataclass
+class AgentResult:
+    name: str
+    startup: float = 0.0
+    turns: list[Turn] = field(default_factory=list)
+    error: str = ""
+
+
+def server_stats() -> dict:
+    with urllib.request.urlopen(f"{SERVER_URL}/stats", timeout=5) as response:
+        return json.load(response)
+
+
+def start_fake_server(latency_ms: float) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, str(Path(__file__).parent / "fake_openai_server.py"), str(PORT), str(latency_ms)])
+    for _ in range(100):
+        try:
+            server_stats()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("The fake model server did not start.")
+
+
+class OutputReader:
+    """在后台读取子进程的输出，等待提示符出现。"""
+
+    def __init__(self, process: subprocess.Popen):
+        self.process = process
+        self.buffer = ""
+        self.position = 0   # 已经匹配过的输出位置
+        self.closed = False
+        self.condition = threading.Condition()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        while chunk := self.process.stdout.read1(4096):
+            with self.condition:
+                self.buffer += chunk.decode("utf-8", errors="replace")
+                self.condition.notify_all()
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def wait_for(self, pattern: re.Pattern, timeout: float = TURN_TIMEOUT) -> bool:
+        """等待新的输出中出现提示符；进程退出时返回 False。"""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                match = pattern.search(self.buffer, self.position)
+                if match:
+                    self.position = match.end()
+                    return True
+                if self.closed:
+                    return False
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No prompt after {timeout:.0f}s; last output: {self.tail()!r}")
+                self.condition.wait(min(remaining, 0.1))
+
+    def tail(self, size: int = 300) -> str:
+        return self.buffer[-size:].strip()
+
+
+def run_agent(name: str, scenario: Scenario, rounds: int, env: dict) -> AgentResult:
+    result = AgentResult(name)
+    pattern = re.compile(scenario.prompt, re.MULTILINE)
+    inputs = scenario.inputs[:1] if scenario.single_turn else scenario.inputs * rounds
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-u", str(scenario.script)], cwd=scenario.script.parent, env=env,
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    reader = OutputReader(process)
+    try:
+        if not reader.wait_for(pattern):
+            result.error = f"exited before the first prompt: {reader.tail()}"
+            return result
+        result.startup = time.perf_counter() - start
+        for text in inputs:
+            before = server_stats()
+            turn_start = time.perf_counter()
+            process.stdin.write(text.encode("utf-8") + b"\n")
+            process.stdin.flush()
+            if scenario.single_turn:
+                process.wait(timeout=TURN_TIMEOUT)
+            elif not reader.wait_for(pattern):
+                result.error = f"exited during a turn: {reader.tail()}"
+                return result
+            seconds = time.perf_counter() - turn_start
+            after = server_stats()
+            result.turns.append(Turn(seconds, after["requests"] - before["requests"],
+                                     after["model_seconds"] - before["model_seconds"]))
+        if scenario.quit is not None:
+            process.stdin.write(scenario.quit.encode("utf-8") + b"\n")
+            process.stdin.flush()
+            process.wait(timeout=TURN_TIMEOUT)
+    except (TimeoutError, subprocess.TimeoutExpired, OSError) as e:
+        result.error = f"{type(e).__name__}: {e}"
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+    return result
+
+
+def print_report(results: list[AgentResult], latency_ms: float):
+    print(f"\nfake model latency {latency_ms:.0f} ms ({os.getenv('FAKE_LATENCY_DIST', 'fixed')}), "
+          f"{os.getenv('FAKE_TOKENS_PER_SECOND', '0')} tokens/s\n")
+    print(f"{'agent':<7}{'startup s':>10}{'turns':>7}{'p50 ms':>9}{'p95 ms':>9}{'trips/turn':>12}"
+          f"{'model ms':>10}{'overhead ms':>13}{'p95 ovh ms':>12}")
+    for result in results:
+        if result.error and not result.turns:
+            print(f"{result.name:<7}failed: {result.error}")
+            continue
+        seconds = sorted(turn.seconds for turn in result.turns)
+        overheads = sorted(turn.overhead for turn in result.turns)
+        p95 = lambda values: values[min(len(values) - 1, int(len(values) * 0.95))]
+        print(f"{result.name:<7}{result.startup:>10.2f}{len(result.turns):>7}"
+              f"{statistics.median(seconds) * 1000:>9.0f}{p95(seconds) * 1000:>9.0f}"
+              f"{statistics.mean(turn.round_trips for turn in result.turns):>12.2f}"
+              f"{statistics.mean(turn.model_seconds for turn in result.turns) * 1000:>10.0f}"
+              f"{statistics.mean(overheads) * 1000:>13.1f}{p95(overheads) * 1000:>12.1f}")
+        if result.error:
+            print(f"{'':<7}stopped early: {result.error}")
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 200
+    names = sys.argv[3:] or list(SCENARIOS)
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_agents_"))
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": "fake",
+        "OPENAI_BASE_URL": f"{SERVER_URL}/v1",
+        "OPENAI_MODEL_NAME": "fake-model",
+        "PYTHONIOENCODING": "utf-8",
+        "TERM": os.getenv("TERM", "dumb"),
+        # 测量真实的往返：关闭响应缓存，并把各实验的状态文件放到临时目录
+        "LLM_CACHE": "0",
+        "TICKET_DB": str(workdir / "tickets.db"),
+        "POLICY_INDEX_DB": str(workdir / "policy_index.db"),
+    }
+    env.pop("SMTP_HOST", None)
+
+    server = start_fake_server(latency_ms)
+    try:
+        results = []
+        for name in names:
+            print(f"Running {name} ({SCENARIOS[name].script.name})...")
+            results.append(run_agent(name, SCENARIOS[name], rounds, env))
+        print_report(results, latency_ms)
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# bench_llm_cache.py - 测量响应缓存在重复请求较多的负载（例如 06 的工单评估）下省下的调用和延迟
+#
+# 用一个按固定延迟返回的替身代替模型，按 Zipf 分布重复发送工单评估请求（每张工单 3 个低温度调用），
+# 比较不使用缓存和使用缓存时的总耗时，并测量缓存查找本身的开销。
+# 用法: python bench_llm_cache.py [请求的工单数] [不同工单数] [模型延迟毫秒]
+
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from llm_cache import CachedClient, ResponseCache
+
+PROMPTS = ["priority", "team", "effort"]
+
+
+class FakeCompletions:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        content = f"Medium — assessment of {kwargs['messages'][-1]['content'][:40]}"
+        return {"id": f"chatcmpl-{self.calls}", "object": "chat.completion", "model": kwargs["model"],
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}]}
+
+
+def run(client, tickets: list[str]) -> float:
+    start = time.perf_counter()
+    for ticket in tickets:
+        for prompt in PROMPTS:
+            client.chat.completions.create(
+                model="fake-model",
+                messages=[{"role": "system", "content": f"Assess the {prompt} of this ticket."},
+                          {"role": "user", "content": ticket}],
+                temperature=0.2,
+            )
+    return time.perf_counter() - start
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    distinct = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    rng = random.Random(1)
+    weights = [1 / rank for rank in range(1, distinct + 1)]
+    tickets = rng.choices([f"Ticket {i}: the checkout page fails with error {i * 7}" for i in range(distinct)],
+                          weights, k=requests)
+
+    plain = FakeCompletions(latency_ms / 1000)
+    uncached = run(SimpleNamespace(chat=SimpleNamespace(completions=plain)), tickets)
+
+    cache = ResponseCache(Path(tempfile.mkdtemp(prefix="bench_llm_cache_")) / "llm_cache.db")
+    backend = FakeCompletions(latency_ms / 1000)
+    cached = run(CachedClient(SimpleNamespace(chat=SimpleNamespace(completions=backend)), cache), tickets)
+
+    # 全部命中时的耗时就是缓存查找本身的开销
+    hit_only = run(CachedClient(SimpleNamespace(chat=SimpleNamespace(completions=backend)), cache), tickets)
+
+    total = requests * len(PROMPTS)
+    print(f"{total} calls for {requests} tickets ({distinct} distinct), model latency {latency_ms:.0f} ms")
+    print(f"without cache: {plain.calls} model calls, {uncached:.2f}s")
+    print(f"with cache:    {backend.calls} model calls, {cached:.2f}s ({cached / uncached:.0%} of without)")
+    print(f"cache lookup overhead: {hit_only / total * 1000:.2f} ms per hit")
+    print(cache.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# bench_response_templates.py - 测量本地回复模板对 03 和 04 工具调用流程延迟的影响
+#
+# 启动本地假模型服务器（fake_openai_server.py），分别在开启和关闭回复模板的情况下，
+# 按实验脚本的流程（第一次调用 -> 执行工具 -> 最终回复）发送请求，比较每次请求的延迟。
+# 用法: python bench_response_templates.py [每种情况的请求数] [模型延迟毫秒]
+
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+from response_templates import finish_turn
+
+LABFILES = Path(__file__).resolve().parents[1]
+PORT = 8011
+
+
+def load_module(name: str, path: Path):
+    sys.path.insert(0, str(path.parent))
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def start_fake_server(latency_ms: float) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, str(Path(__file__).parent / "fake_openai_server.py"), str(PORT), str(latency_ms)])
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{PORT}/stats", timeout=1)
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("The fake model server did not start.")
+
+
+def run_request(client, model_name: str, flow: dict, use_templates: bool) -> tuple[float, int]:
+    """按实验脚本的流程处理一次请求，返回 (耗时秒数, 模型调用次数)。"""
+    messages = [{"role": "system", "content": flow["system_prompt"]}, {"role": "user", "content": flow["prompt"]}]
+    start = time.perf_counter()
+    response = client.chat.completions.create(model=model_name, messages=messages, tools=flow["tools"], tool_choice="auto")
+    response_message = response.choices[0].message
+    messages.append(response_message)
+    calls = []
+    for tool_call in response_message.tool_calls or []:
+        function_args = json.loads(tool_call.function.arguments)
+        function_response = flow["functions"][tool_call.function.name](**function_args)
+        calls.append((tool_call.function.name, function_args, function_response))
+        messages.append({"tool_call_id": tool_call.id, "role": "tool", "name": tool_call.function.name,
+                         "content": function_response})
+    _, model_called = finish_turn(client, model_name, messages, calls, flow["templates"], use_templates)
+    return time.perf_counter() - start, 1 + model_called
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    os.environ["OPENAI_API_KEY"] = "fake"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{PORT}/v1"
+    os.environ["OPENAI_MODEL_NAME"] = "fake-model"
+    from openai import OpenAI
+
+    support = load_module("support_agent", LABFILES / "03-ai-agent-functions" / "Python" / "agent.py")
+    expenses = load_module("expenses_agent", LABFILES / "04-semantic-kernel" / "python" / "semantic-kernel.py")
+    # 工具本身用返回相同文本的替身，避免写入工单数据库或打印邮件
+    flows = {
+        "03 support ticket": {
+            "system_prompt": support.system_prompt,
+            "prompt": "My laptop won't start. My email is alex@contoso.com",
+            "tools": support.tools,
+            "templates": support.response_templates,
+            "functions": {"create_support_ticket": lambda email, description: (
+                "Your support ticket has been submitted successfully! Your ticket ID is **T000001**.")},
+        },
+        "04 expense claim": {
+            "system_prompt": "Submit the expense claim by email.",
+            "prompt": "Submit an expense claim.",
+            # 只比较发送邮件这一步，不包括检索政策
+            "tools": [tool for tool in expenses.tools if tool["function"]["name"] == "send_email"],
+            "templates": expenses.response_templates,
+            "functions": {"send_email": lambda to, subject, body: "Expense claim email has been sent successfully."},
+        },
+    }
+
+    server = start_fake_server(latency_ms)
+    try:
+        client = OpenAI()
+        print(f"{requests} requests per case, fake model latency {latency_ms:.0f} ms\n")
+        print(f"{'flow':<20}{'templates':<11}{'calls':>6}{'mean ms':>9}{'p50 ms':>8}")
+        for label, flow in flows.items():
+            means = {}
+            for use_templates in (False, True):
+                results = [run_request(client, "fake-model", flow, use_templates) for _ in range(requests)]
+                timings = [seconds for seconds, _ in results]
+                means[use_templates] = statistics.mean(timings)
+                print(f"{label:<20}{'on' if use_templates else 'off':<11}"
+                      f"{statistics.mean(calls for _, calls in results):>6.1f}"
+                      f"{means[use_templates] * 1000:>9.0f}{statistics.median(timings) * 1000:>8.0f}")
+            print(f"{'':<20}latency with templates: {means[True] / means[False]:.0%} of without\n")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+# fake_openai_server.py - 本地的 OpenAI Chat Completions 兼容假服务器，用于压测和基准测试
+#
+# 不调用任何真实模型：按脚本或固定规则回复，并模拟模型延迟，使各实验的脚本无需 API key 即可测量。
+# 运行: python fake_openai_server.py [端口] [延迟毫秒]
+# 然后设置 OPENAI_BASE_URL=http://127.0.0.1:<端口>/v1 和任意的 OPENAI_API_KEY。
+#
+# 延迟模型：首个 token 的延迟按 FAKE_LATENCY_DIST 分布抽样（均值为 FAKE_LATENCY_MS），
+# 之后按 FAKE_TOKENS_PER_SECOND 的速率生成回复的 token（0 表示瞬间生成）。
+# 支持 stream=True 的 SSE 流式响应。
+#
+# FAKE_SCRIPT 可以指向一个 JSON 文件，按顺序列出脚本化的回复规则，先于内置规则匹配，例如:
+#     [{"match": "restock", "tool_calls": [{"name": "get_inventory_levels", "arguments": {}}]},
+#      {"role": "tool", "match": ".*", "content": "Here is what I found."}]
+# match 是对最后一条消息（默认为用户消息，role 为 "tool" 时匹配工具结果）的正则表达式。
+
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import sys
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+# 首个 token 的平均模拟延迟（毫秒）及其分布: fixed / uniform / exponential / lognormal
+LATENCY_MS = float(os.getenv("FAKE_LATENCY_MS", "300"))
+LATENCY_DIST = os.getenv("FAKE_LATENCY_DIST", "fixed")
+# lognormal 分布的 sigma；uniform 分布在均值的 ±(sigma × 100)% 范围内
+LATENCY_SIGMA = float(os.getenv("FAKE_LATENCY_SIGMA", "0.5"))
+# 回复 token 的生成速率（每秒 token 数），0 表示不模拟
+TOKENS_PER_SECOND = float(os.getenv("FAKE_TOKENS_PER_SECOND", "0"))
+SCRIPT_PATH = os.getenv("FAKE_SCRIPT")
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+
+app = FastAPI(title="Fake OpenAI Server")
+stats = {"requests": 0, "tool_calls": 0, "streamed": 0, "scripted": 0, "model_seconds": 0.0}
+
+
+def _load_script() -> list[dict]:
+    if not SCRIPT_PATH:
+        return []
+    with open(SCRIPT_PATH, encoding="utf-8") as file:
+        rules = json.load(file)
+    for rule in rules:
+        rule["pattern"] = re.compile(rule.get("match", ".*"), re.IGNORECASE | re.DOTALL)
+    return rules
+
+
+script = _load_script()
+
+
+def sample_latency() -> float:
+    """按配置的分布抽样首个 token 的延迟（秒），各分布的均值都是 LATENCY_MS。"""
+    mean = LATENCY_MS / 1000
+    if mean <= 0:
+        return 0.0
+    if LATENCY_DIST == "uniform":
+        return random.uniform(mean * (1 - LATENCY_SIGMA), mean * (1 + LATENCY_SIGMA))
+    if LATENCY_DIST == "exponential":
+        return random.expovariate(1 / mean)
+    if LATENCY_DIST == "lognormal":
+        # 均值为 mean 的对数正态分布: mu = ln(mean) - sigma^2 / 2
+        return random.lognormvariate(math.log(mean) - LATENCY_SIGMA ** 2 / 2, LATENCY_SIGMA)
+    return mean
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def _text(message: dict) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):  # 多段内容只取文本部分
+        content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def _support_ticket_arguments(messages: list[dict]) -> dict | None:
+    """在对话中找到电子邮件和问题描述后，返回 create_support_ticket 的参数。"""
+    user_texts = [_text(m) for m in messages if m.get("role") == "user"]
+    emails = [match for text in user_texts for match in EMAIL_PATTERN.findall(text)]
+    descriptions = [EMAIL_PATTERN.sub("", text).strip() for text in user_texts]
+    descriptions = [text for text in descriptions if len(text) >= 10]
+    if emails and descriptions:
+        return {"email": emails[-1], "description": descriptions[-1]}
+    return None
+
+
+def _scripted_reply(last: dict) -> dict | None:
+    role = last.get("role")
+    for rule in script:
+        if rule.get("role", "user") == role and rule["pattern"].search(_text(last)):
+            stats["scripted"] += 1
+            if rule.get("tool_calls"):
+                return _tool_calls([(call["name"], call.get("arguments", {})) for call in rule["tool_calls"]])
+            return {"role": "assistant", "content": rule.get("content", "")}
+    return None
+
+
+def reply(messages: list[dict], tools: list[dict]) -> dict:
+    """按规则生成一条助手消息：能调用工具就调用，工具返回后确认结果，否则追问。"""
+    last = messages[-1] if messages else {}
+    scripted = _scripted_reply(last)
+    if scripted is not None:
+        return scripted
+    if last.get("role") == "tool":
+        # 还有没调用过的工具（例如先检索政策再发送邮件）就继续调用，否则确认结果
+        pending = _next_uncalled_tool(messages, tools)
+        if pending is not None:
+            return pending
+        return {"role": "assistant", "content": f"Done. {_text(last)}"}
+
+    tool_names = {tool["function"]["name"] for tool in tools or []}
+    if "create_support_ticket" in tool_names:
+        arguments = _support_ticket_arguments(messages)
+        if arguments is None:
+            user_texts = " ".join(_text(m) for m in messages if m.get("role") == "user")
+            question = ("Please describe the problem you are having." if EMAIL_PATTERN.search(user_texts)
+                        else "What is your email address?")
+            return {"role": "assistant", "content": question}
+        return _tool_call("create_support_ticket", arguments)
+    if last.get("role") == "user":
+        pending = _next_uncalled_tool(messages, tools)
+        if pending is not None:
+            return pending
+    return {"role": "assistant", "content": f"You said: {_text(last)[:200]}"}
+
+
+def _next_uncalled_tool(messages: list[dict], tools: list[dict] | None) -> dict | None:
+    """其他工具：依次调用本轮（最后一条用户消息之后）还没有结果的工具，必填参数用示例值填充。"""
+    turn_start = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=0)
+    called = {m.get("name") for m in messages[turn_start:] if m.get("role") == "tool"}
+    for tool in sorted(tools or [], key=lambda tool: tool["function"]["name"]):
+        if tool["function"]["name"] not in called:
+            return _tool_call(tool["function"]["name"], _example_arguments(tool))
+    return None
+
+
+def _example_arguments(tool: dict) -> dict:
+    parameters = tool["function"].get("parameters") or {}
+    properties = parameters.get("properties", {})
+    examples = {"string": "example", "number": 1, "integer": 1, "boolean": True, "array": [], "object": {}}
+    return {name: examples.get(properties.get(name, {}).get("type"), "example")
+            for name in parameters.get("required", [])}
+
+
+def _tool_call(name: str, arguments: dict) -> dict:
+    return _tool_calls([(name, arguments)])
+
+
+def _tool_calls(calls: list[tuple[str, dict]]) -> dict:
+    stats["tool_calls"] += len(calls)
+    return {
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [{
+            "id": f"call_{uuid.uuid4().hex[:24]}",
+            "type": "function",
+            "function": {"name": name, "arguments": json.dumps(arguments, ensure_ascii=False)},
+        } for name, arguments in calls],
+    }
+
+
+def _usage(messages: list[dict], message: dict) -> dict:
+    prompt_tokens = sum(estimate_tokens(_text(m)) for m in messages)
+    completion_tokens = estimate_tokens(message.get("content") or json.dumps(message.get("tool_calls")))
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _generation_seconds(completion_tokens: int) -> float:
+    return completion_tokens / TOKENS_PER_SECOND if TOKENS_PER_SECOND > 0 else 0.0
+
+
+async def _stream(completion_id: str, model: str, message: dict, usage: dict, include_usage: bool):
+    """以 SSE 逐块发送回复：先等待首个 token 的延迟，再按 token 速率发送内容。"""
+    started = time.perf_counter()
+
+    def chunk(delta: dict, finish_reason: str | None = None, usage_field: dict | None = None) -> str:
+        body = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else []}
+        if usage_field is not None:
+            body["usage"] = usage_field
+        return f"data: {json.dumps(body, ensure_ascii=False)}\n\n"
+
+    try:
+        await asyncio.sleep(sample_latency())
+        yield chunk({"role": "assistant", "content": ""})
+        if message.get("tool_calls"):
+            await asyncio.sleep(_generation_seconds(usage["completion_tokens"]))
+            yield chunk({"tool_calls": [{"index": i, **call} for i, call in enumerate(message["tool_calls"])]})
+            finish_reason = "tool_calls"
+        else:
+            content = message.get("content") or ""
+            # 每块大约一个 token（4 个字符）
+            for start in range(0, len(content), 4):
+                await asyncio.sleep(_generation_seconds(1))
+                yield chunk({"content": content[start:start + 4]})
+            finish_reason = "stop"
+        yield chunk({}, finish_reason)
+        if include_usage:
+            yield chunk(None, usage_field=usage)
+        yield "data: [DONE]\n\n"
+    finally:
+        stats["model_seconds"] += time.perf_counter() - started
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    messages = body.get("messages", [])
+    message = reply(messages, body.get("tools"))
+    usage = _usage(messages, message)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    model = body.get("model") or "fake-model"
+    if body.get("stream"):
+        stats["streamed"] += 1
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+        return StreamingResponse(_stream(completion_id, model, message, usage, include_usage),
+                                 media_type="text/event-stream")
+
+    seconds = sample_latency() + _generation_seconds(usage["completion_tokens"])
+    await asyncio.sleep(seconds)
+    stats["model_seconds"] += seconds
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": message,
+            "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+        }],
+        "usage": usage,
+    }
+
+
+@app.get("/stats")
+def stats_endpoint():
+    return stats
+
+
+@app.post("/stats/reset")
+def reset_stats():
+    for key in stats:
+        stats[key] = 0.0 if key == "model_seconds" else 0
+    return stats
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8001
+    if len(sys.argv) > 2:
+        LATENCY_MS = float(sys.argv[2])
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
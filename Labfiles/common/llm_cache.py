@@ -0,0 +1,219 @@
+# llm_cache.py - 所有实验共享的持久化模型响应缓存
+#
+# 用 cached_client() 包装 OpenAI / AsyncOpenAI 客户端后，client.chat.completions.create(...)
+# 的响应会按 (模型, 消息, 工具, 采样参数等全部请求参数) 缓存在 SQLite 中，相同的请求直接返回
+# 缓存的响应，不再重复发送和计费。缓存总大小有上限，超出时按最近最少使用 (LRU) 淘汰。
+#
+# 默认只缓存确定性的调用：temperature 不高于 LLM_CACHE_MAX_TEMPERATURE（默认 0.3）的请求。
+# 未指定 temperature 的对话调用（默认采样）不缓存；传入 cache=True 可强制缓存，cache=False 可强制跳过。
+# stream=True 或 n>1 的调用总是跳过。设置 LLM_CACHE=0 可完全关闭缓存，此时包装器只去掉 cache 参数并直接转发。
+
+import atexit
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+# 默认所有实验共享 Labfiles/common 下的同一个缓存文件
+DEFAULT_DB_PATH = os.getenv("LLM_CACHE_DB") or str(Path(__file__).resolve().parent / "llm_cache.db")
+DEFAULT_MAX_BYTES = int(float(os.getenv("LLM_CACHE_MAX_MB", "64")) * 1024 * 1024)
+# 未指定 cache 时，temperature 不高于该值的调用才缓存
+MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.3"))
+# 当前线程/任务最近一次 create 是否命中缓存，供 tracing 区分缓存命中和真实的模型调用
+last_call_cached = contextvars.ContextVar("last_call_cached", default=False)
+# 不参与缓存键的请求参数（只影响传输，不影响模型输出）
+TRANSPORT_PARAMS = {"timeout", "extra_headers", "extra_query", "extra_body"}
+
+
+def _plain(value):
+    """把 ChatCompletionMessage 等 pydantic 对象转换为可序列化的普通数据。"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True)
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    return value
+
+
+def cache_key(kwargs: dict) -> str:
+    request = {key: _plain(value) for key, value in kwargs.items() if key not in TRANSPORT_PARAMS}
+    encoded = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _namespace(value):
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: _namespace(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [_namespace(item) for item in value]
+    return value
+
+
+def _to_response(data: dict):
+    """把缓存的 JSON 还原为 ChatCompletion 对象；没有 openai 包时退化为属性访问的命名空间。"""
+    try:
+        from openai.types.chat import ChatCompletion
+    except ImportError:
+        return _namespace(data)
+    return ChatCompletion.model_validate(data)
+
+
+class ResponseCache:
+    """SQLite 中的响应缓存，总大小超过 max_bytes 时按 LRU 淘汰。
+
+    每条记录保存响应 JSON、首次请求的耗时和最近一次使用时间；命中时把这次省下的耗时
+    计入统计。可以被多个线程、多个进程（多个实验脚本）同时使用。
+    """
+
+    def __init__(self, db_path: str | Path = DEFAULT_DB_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "bypassed": 0, "evictions": 0, "saved_seconds": 0.0}
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self.db.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                latency REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+        """)
+
+    def get(self, key: str):
+        with self.lock:
+            row = self.db.execute("SELECT response, latency FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            with self.db:
+                self.db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.stats["hits"] += 1
+            self.stats["saved_seconds"] += row[1]
+        return _to_response(json.loads(row[0]))
+
+    def put(self, key: str, response, latency: float):
+        data = response.model_dump_json() if hasattr(response, "model_dump_json") else json.dumps(_plain(response))
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                            (key, data, len(data), latency, time.time()))
+            self._evict()
+
+    def _evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # 一次淘汰到上限的 90%，避免之后每次写入都要淘汰
+        excess = total - int(self.max_bytes * 0.9)
+        freed, keys = 0, []
+        for key, size in self.db.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if freed >= excess:
+                break
+            keys.append((key,))
+            freed += size
+        self.db.executemany("DELETE FROM responses WHERE key = ?", keys)
+        self.stats["evictions"] += len(keys)
+
+    def summary(self) -> str:
+        stats = self.stats
+        lookups = stats["hits"] + stats["misses"]
+        rate = f"{stats['hits'] / lookups:.0%}" if lookups else "n/a"
+        return (f"LLM cache: {stats['hits']} hit(s), {stats['misses']} miss(es), {stats['bypassed']} bypassed, "
+                f"hit rate {rate}, {stats['saved_seconds']:.1f}s of model latency saved")
+
+
+def _cacheable(kwargs: dict, cache: bool | None) -> bool:
+    if kwargs.get("stream") or kwargs.get("n", 1) != 1:
+        return False
+    if cache is None:
+        temperature = kwargs.get("temperature")
+        return temperature is not None and temperature <= MAX_TEMPERATURE
+    return cache
+
+
+class _CachedCompletions:
+    def __init__(self, completions, cache: ResponseCache | None):
+        self._completions = completions
+        self._cache = cache
+
+    def _lookup(self, kwargs: dict, cache: bool | None) -> bool:
+        """是否走缓存；缓存关闭时总是直接转发。"""
+        if self._cache is None:
+            return False
+        if not _cacheable(kwargs, cache):
+            self._cache.stats["bypassed"] += 1
+            return False
+        return True
+
+    def create(self, *, cache: bool | None = None, **kwargs):
+        last_call_cached.set(False)
+        if not self._lookup(kwargs, cache):
+            return self._completions.create(**kwargs)
+        key = cache_key(kwargs)
+        response = self._cache.get(key)
+        last_call_cached.set(response is not None)
+        if response is None:
+            start = time.perf_counter()
+            response = self._completions.create(**kwargs)
+            self._cache.put(key, response, time.perf_counter() - start)
+        return response
+
+
+class _AsyncCachedCompletions(_CachedCompletions):
+    async def create(self, *, cache: bool | None = None, **kwargs):
+        last_call_cached.set(False)
+        if not self._lookup(kwargs, cache):
+            return await self._completions.create(**kwargs)
+        key = cache_key(kwargs)
+        response = self._cache.get(key)
+        last_call_cached.set(response is not None)
+        if response is None:
+            start = time.perf_counter()
+            response = await self._completions.create(**kwargs)
+            self._cache.put(key, response, time.perf_counter() - start)
+        return response
+
+
+class CachedClient:
+    """包装 OpenAI 客户端：chat.completions.create 走缓存，其余属性原样转发。
+
+    cache 为 None 时不缓存，只接受并去掉 cache 参数，调用方无需关心缓存是否开启。
+    """
+
+    def __init__(self, client, cache: ResponseCache | None, asynchronous: bool = False):
+        self._client = client
+        self.cache = cache
+        completions = (_AsyncCachedCompletions if asynchronous else _CachedCompletions)(client.chat.completions, cache)
+        self.chat = SimpleNamespace(completions=completions)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    """返回进程内共享的默认缓存，退出时打印统计。"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+            atexit.register(lambda: print(_default_cache.summary()) if sum(_default_cache.stats.values()) else None)
+    return _default_cache
+
+
+def cached_client(client, asynchronous: bool = False):
+    """用共享缓存包装客户端；LLM_CACHE=0 时不缓存，只转发。AsyncOpenAI 需要传入 asynchronous=True。"""
+    return CachedClient(client, get_cache() if ENABLED else None, asynchronous)
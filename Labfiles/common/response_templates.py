@@ -0,0 +1,55 @@
+# response_templates.py - 在本地渲染确定性工具调用后的最终回复，省去第二次模型调用
+#
+# 工具可以在 response_templates 映射中声明一个回复模板，例如:
+#     response_templates = {"send_email": "Email sent to {to} with subject \"{subject}\".\n\n{body}"}
+# 模板用 str.format 渲染，可用字段为工具的参数，以及工具的返回值 {result}。
+# 只要一次回复中所有的工具调用都有模板，就直接在本地拼出最终回复；否则仍请求模型总结。
+
+import os
+
+# 设置 RESPONSE_TEMPLATES=0 可关闭本地渲染，总是请求模型总结（用于对比）
+ENABLED = os.getenv("RESPONSE_TEMPLATES", "1") != "0"
+
+
+def render_response(templates: dict, calls: list[tuple[str, dict, str]]) -> str | None:
+    """用模板渲染 (函数名, 参数, 返回值) 列表的最终回复；任一调用无法渲染时返回 None。"""
+    if not calls:
+        return None
+    parts = []
+    for function_name, arguments, result in calls:
+        template = templates.get(function_name)
+        if template is None:
+            return None
+        try:
+            parts.append(template.format_map({**arguments, "result": result}))
+        except (KeyError, IndexError, ValueError):
+            return None  # 模板字段与本次参数不匹配，交给模型
+    return "\n\n".join(parts)
+
+
+def finish_turn(client, model_name: str, messages: list, calls: list[tuple[str, dict, str]],
+                templates: dict, use_templates: bool = ENABLED) -> tuple[str, bool]:
+    """返回工具调用之后的最终回复，以及是否为此调用了模型。
+
+    能用模板就在本地渲染，否则进行第二次模型调用。两种情况下最终回复都会追加到
+    messages 中，对话历史保持一致。
+    """
+    final_response = render_response(templates, calls) if use_templates else None
+    model_called = final_response is None
+    if model_called:
+        second_response = client.chat.completions.create(model=model_name, messages=messages)
+        final_response = second_response.choices[0].message.content
+    messages.append({"role": "assistant", "content": final_response})
+    return final_response, model_called
+
+
+async def finish_turn_async(client, model_name: str, messages: list, calls: list[tuple[str, dict, str]],
+                            templates: dict, use_templates: bool = ENABLED) -> tuple[str, bool]:
+    """finish_turn 的异步版本，用于 AsyncOpenAI 客户端。"""
+    final_response = render_response(templates, calls) if use_templates else None
+    model_called = final_response is None
+    if model_called:
+        second_response = await client.chat.completions.create(model=model_name, messages=messages)
+        final_response = second_response.choices[0].message.content
+    messages.append({"role": "assistant", "content": final_response})
+    return final_response, model_called
@@ -0,0 +1,258 @@
+# tracing.py - 为模型调用和工具调用记录耗时 span，写入本地 JSONL 文件，并汇总各阶段的延迟分位数
+#
+# 设置 AGENT_TRACE_FILE=traces.jsonl 后开启；未设置时所有函数都是空操作，不增加开销。
+# 每个 span 一行 JSON:
+#     {"trace_id", "span_id", "parent_id", "name", "start", "duration_ms", "attributes", "error"}
+# 一轮对话用 span("turn") 包起来，轮内的模型调用（traced_client）和工具调用（trace_tools）
+# 自动成为它的子 span；turn 的耗时减去子 span 的耗时，就是我们自己的代码（解析、序列化、打印等）的开销。
+# 被响应缓存（llm_cache）命中的调用带 cached=True，汇总时单独列出，不计入模型延迟和 token 用量。
+#
+# 汇总: python tracing.py summary [traces.jsonl]
+
+import atexit
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+try:
+    from llm_cache import last_call_cached
+except ImportError:
+    last_call_cached = None
+
+TRACE_FILE = os.getenv("AGENT_TRACE_FILE")
+ENABLED = bool(TRACE_FILE)
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "attributes", "error")
+
+    def __init__(self, name: str, parent: "Span | None", attributes: dict):
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.start = time.time()
+        self.attributes = attributes
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+
+class _NoopSpan:
+    def set(self, **attributes):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class JsonlSink:
+    """把 span 追加写入 JSONL 文件；多个线程共用一个文件句柄，按行缓冲写入。"""
+
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.file = open(path, "a", encoding="utf-8", buffering=1)
+        atexit.register(self.close)
+
+    def write(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self.lock:
+            if not self.file.closed:
+                self.file.write(line)
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+_sink = JsonlSink(TRACE_FILE) if ENABLED else None
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """记录一段代码的耗时；异常会记录在 span 上并继续抛出。"""
+    if not ENABLED:
+        yield _NOOP
+        return
+    current = Span(name, _current.get(), attributes)
+    token = _current.set(current)
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        _current.reset(token)
+        _sink.write({
+            "trace_id": current.trace_id,
+            "span_id": current.span_id,
+            "parent_id": current.parent_id,
+            "name": current.name,
+            "start": current.start,
+            "duration_ms": round(duration * 1000, 3),
+            "attributes": current.attributes,
+            "error": current.error,
+        })
+
+
+def _payload_size(value) -> int:
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if hasattr(value, "model_dump_json"):
+        return len(value.model_dump_json())
+    return len(json.dumps(value, ensure_ascii=False, default=lambda item: getattr(item, "__dict__", str(item))))
+
+
+def _record_response(current: Span, response):
+    if last_call_cached is not None and last_call_cached.get():
+        current.set(cached=True)
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        current.set(prompt_tokens=getattr(usage, "prompt_tokens", None),
+                    completion_tokens=getattr(usage, "completion_tokens", None))
+    choices = getattr(response, "choices", None) or []
+    if choices:
+        message = choices[0].message
+        current.set(finish_reason=getattr(choices[0], "finish_reason", None),
+                    tool_calls=len(getattr(message, "tool_calls", None) or []),
+                    response_bytes=len(getattr(message, "content", None) or "")
+                    + sum(len(call.function.arguments) for call in getattr(message, "tool_calls", None) or []))
+
+
+class _TracedCompletions:
+    def __init__(self, completions):
+        self._completions = completions
+
+    def create(self, **kwargs):
+        with span("llm", model=kwargs.get("model"), messages=len(kwargs.get("messages", [])),
+                  request_bytes=_payload_size(kwargs.get("messages", [])), tools=len(kwargs.get("tools") or [])) as current:
+            response = self._completions.create(**kwargs)
+            _record_response(current, response)
+            return response
+
+
+class _AsyncTracedCompletions(_TracedCompletions):
+    async def create(self, **kwargs):
+        with span("llm", model=kwargs.get("model"), messages=len(kwargs.get("messages", [])),
+                  request_bytes=_payload_size(kwargs.get("messages", [])), tools=len(kwargs.get("tools") or [])) as current:
+            response = await self._completions.create(**kwargs)
+            _record_response(current, response)
+            return response
+
+
+class TracedClient:
+    """包装客户端：每次 chat.completions.create 都记录一个 "llm" span，其余属性原样转发。"""
+
+    def __init__(self, client, asynchronous: bool = False):
+        self._client = client
+        completions = (_AsyncTracedCompletions if asynchronous else _TracedCompletions)(client.chat.completions)
+        self.chat = SimpleNamespace(completions=completions)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def traced_client(client, asynchronous: bool = False):
+    """未开启跟踪时原样返回客户端。AsyncOpenAI 需要传入 asynchronous=True。"""
+    return TracedClient(client, asynchronous) if ENABLED else client
+
+
+def traced_tool(name: str, function):
+    """包装一个工具函数：每次调用记录一个 "tool" span，带参数和结果的大小。"""
+    if not ENABLED:
+        return function
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with span("tool", tool=name, args_bytes=_payload_size([args, kwargs])) as current:
+            result = function(*args, **kwargs)
+            current.set(result_bytes=_payload_size(result))
+            return result
+
+    return wrapper
+
+
+def trace_tools(functions: dict) -> dict:
+    """包装工具映射中的每个函数。"""
+    return {name: traced_tool(name, function) for name, function in functions.items()}
+
+
+# --- 汇总 ---
+def _percentile(values: list[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(path: str) -> list[tuple]:
+    """按阶段汇总：llm（按模型，缓存命中单独列出）、tool（按工具名）、其他 span，以及 turn 中自身代码的开销。"""
+    durations = defaultdict(list)
+    errors = defaultdict(int)
+    tokens = {}
+    child_time = defaultdict(float)
+    spans = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                spans.append(json.loads(line))
+    for record in spans:
+        if record["parent_id"]:
+            child_time[record["parent_id"]] += record["duration_ms"]
+    for record in spans:
+        attributes = record.get("attributes") or {}
+        stage = record["name"]
+        if stage == "tool":
+            stage = f"tool:{attributes.get('tool')}"
+        elif stage == "llm" and attributes.get("cached"):
+            # 缓存命中没有请求模型，也没有计费的 token
+            stage = f"llm:{attributes.get('model')} (cached)"
+        elif stage == "llm":
+            stage = f"llm:{attributes.get('model')}"
+            prompt_tokens, completion_tokens = tokens.get(stage, (0, 0))
+            tokens[stage] = (prompt_tokens + (attributes.get("prompt_tokens") or 0),
+                             completion_tokens + (attributes.get("completion_tokens") or 0))
+        durations[stage].append(record["duration_ms"])
+        if record.get("error"):
+            errors[stage] += 1
+        if record["name"] == "turn":
+            # turn 中不属于任何模型或工具调用的时间
+            durations["turn:own code"].append(max(record["duration_ms"] - child_time[record["span_id"]], 0.0))
+    rows = []
+    for stage, values in sorted(durations.items()):
+        values.sort()
+        prompt_tokens, completion_tokens = tokens.get(stage, (0, 0))
+        rows.append((stage, len(values), _percentile(values, 0.5), _percentile(values, 0.95), _percentile(values, 0.99),
+                     values[-1], sum(values), errors[stage], prompt_tokens, completion_tokens))
+    return rows
+
+
+def print_summary(path: str):
+    rows = summarize(path)
+    print(f"{'stage':<32}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'total s':>9}"
+          f"{'errors':>8}{'tokens in/out':>16}")
+    for stage, count, p50, p95, p99, maximum, total, error_count, prompt_tokens, completion_tokens in rows:
+        token_text = f"{prompt_tokens:,}/{completion_tokens:,}" if prompt_tokens or completion_tokens else ""
+        print(f"{stage:<32}{count:>7}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}{maximum:>10.1f}{total / 1000:>9.2f}"
+              f"{error_count:>8}{token_text:>16}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "summary":
+        print("Usage: python tracing.py summary [traces.jsonl]")
+        sys.exit(1)
+    trace_path = sys.argv[2] if len(sys.argv) > 2 else TRACE_FILE
+    if not trace_path:
+        print("No trace file given and AGENT_TRACE_FILE is not set.")
+        sys.exit(1)
+    print_summary(trace_path)